@@ -0,0 +1,50 @@
+"""
+Amount (PKR) normalization, once per upload.
+
+amount_values() parses the amount column a single time (pd.to_numeric,
+unparseable cells as NaN, which totals skip), and pagination.plan_pages
+turns it into every total and subtotal the pages print with one segmented
+sum over the grouped rows. Amounts with at most two decimals (the usual
+case for currency) are summed exactly as integer cents, so a total is the
+exact decimal sum of its rows rather than a float accumulation; amounts
+with finer precision fall back to float sums.
+
+The annexure keeps its own, more lenient parser (annexure.parse_amount
+also reads text such as "1,234 PKR"), so its totals are unchanged.
+"""
+import numpy as np
+import pandas as pd
+
+CENTS = 100
+# Largest amount whose cents still fit exactly in a float64
+MAX_EXACT_AMOUNT = 2 ** 53 / CENTS
+
+
+def amount_values(df: pd.DataFrame, schema):
+    """Amount (PKR) of every row as floats (NaN where not numeric), or None without that column."""
+    if schema.amount_pkr is None:
+        return None
+    return pd.to_numeric(df.iloc[:, schema.amount_pkr], errors="coerce").to_numpy(dtype=float, na_value=float("nan"))
+
+
+def fixed_point(amounts) -> tuple:
+    """
+    (values, scale) to sum amounts with, NaN counting as 0: int64 cents and
+    100 when every amount is a whole number of cents, else the floats and 1.
+    Divide sums by scale.
+    """
+    values = np.asarray(amounts, dtype=float)
+    values = np.where(np.isnan(values), 0.0, values)
+    if not len(values) or not np.abs(values).max() < MAX_EXACT_AMOUNT:
+        return values, 1
+    cents = np.round(values * CENTS)
+    if not np.array_equal(cents / CENTS, values):
+        return values, 1
+    return cents.astype(np.int64), CENTS
+
+
+def segment_totals(values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """Sum of values[starts[i]:starts[i + 1]] for each i (the last runs to the end); starts must increase."""
+    if not len(starts):
+        return values[:0]
+    return np.add.reduceat(values, starts)
@@ -0,0 +1,134 @@
+"""
+Grouping for the Annexure of Periodic Billing.
+
+Rows are grouped by the last two characters of their challan, and each group
+collects its challans, amount total and the first-seen unique PO / In-Bound /
+GR / plant / date values. aggregate_annexure() does this column-wise (one
+factorize for the key, bulk amount parsing, drop_duplicates + groupby for
+the unique values) and returns the groups in print order: by smallest
+numeric challan, non-numeric last.
+
+Values are stringified exactly as the old df.iterrows() walk saw them,
+including its upcasting of all-numeric frames to float.
+"""
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+ANNEXURE_DATE_FORMAT = '%d/%m/%y'
+INFO_ROLES = (('po', 'po_numbers'), ('inbound', 'inbound_numbers'), ('gr', 'gr_numbers'), ('plant', 'plants'))
+
+
+def _map_values(series: pd.Series, fn) -> np.ndarray:
+    """fn(value) for every row, calling fn once per distinct value where that is safe."""
+    if series.dtype == object:
+        # 1, 1.0 and True hash alike but print differently: no de-duplication here
+        return series.map(fn).to_numpy(dtype=object)
+    codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    return np.array([fn(v) for v in uniques], dtype=object)[codes]
+
+
+def _text(value) -> str:
+    return str(value).strip()
+
+
+def parse_amount(value) -> float:
+    """Amount cell → float; blanks and unparseable text count as 0."""
+    if pd.isna(value):
+        return 0.0
+    try:
+        return float(str(value).replace(',', '').replace('PKR', '').strip())
+    except (ValueError, TypeError):
+        return 0.0
+
+
+def _amounts(series: pd.Series) -> np.ndarray:
+    if is_bool_dtype(series):
+        return np.zeros(len(series))       # str(True) never parses
+    if is_numeric_dtype(series):
+        return series.to_numpy(dtype=float, na_value=0.0)
+    return _map_values(series, parse_amount).astype(float)
+
+
+def _date_text(value) -> str:
+    """Display text for a date cell, '' when the cell is empty."""
+    if not (pd.notna(value) and str(value).strip()):
+        return ''
+    if hasattr(value, 'strftime'):
+        return value.strftime(ANNEXURE_DATE_FORMAT)
+    date_str = str(value).strip()
+    return date_str if len(date_str) >= 8 else str(value)
+
+
+def _challan_number(challan: str):
+    try:
+        return int(challan)
+    except (ValueError, TypeError):
+        return float('inf')   # non-numeric challans sort last
+
+
+def _first_unique(keys: np.ndarray, values: np.ndarray, n_groups: int, keep_empty: bool = False) -> list:
+    """Per group, the distinct values (non-empty unless keep_empty) in first-appearance order."""
+    pairs = pd.DataFrame({'key': keys, 'value': values})
+    if not keep_empty:
+        pairs = pairs[pairs['value'] != '']
+    pairs = pairs.drop_duplicates()
+    collected = pairs.groupby('key', sort=False)['value'].agg(list)
+    out = [[] for _ in range(n_groups)]
+    for key, group_values in collected.items():
+        out[key] = group_values
+    return out
+
+
+def aggregate_annexure(df: pd.DataFrame, col_mapping: dict) -> list:
+    """
+    Annexure groups in print order, each a dict with serial_numbers (unique,
+    first-seen order), total_amount, po_numbers, inbound_numbers, gr_numbers,
+    plants and dates.
+    """
+    # df.iterrows() upcast each row to the frame's common dtype (all-numeric → float64)
+    row_dtype = df.iloc[:0].to_numpy().dtype
+
+    def column(role, default):
+        name = col_mapping.get(role, '')
+        if name not in df.columns:
+            return None, default
+        series = df[name]
+        return (series if row_dtype == object else series.astype(row_dtype)), default
+
+    def texts(role, fn=_text, default=''):
+        series, default = column(role, default)
+        if series is None:
+            return np.full(len(df), fn(default), dtype=object)
+        return _map_values(series, fn)
+
+    # Group key: last two characters of the challan, computed once per distinct challan
+    challans = texts('challan')
+    challan_codes, distinct_challans = pd.factorize(challans)
+    endings = np.array([c[-2:] for c in distinct_challans], dtype=object)
+    codes, key_uniques = pd.factorize(endings[challan_codes])
+    n_groups = len(key_uniques)
+
+    amount_series, _ = column('amount', 0)
+    amounts = _amounts(amount_series) if amount_series is not None else np.zeros(len(df))
+    totals = np.bincount(codes, weights=amounts, minlength=n_groups)   # row order, like += per row
+
+    serial_numbers = _first_unique(codes, challans, n_groups, keep_empty=True)
+    info = {field: _first_unique(codes, texts(role), n_groups) for role, field in INFO_ROLES}
+    dates = _first_unique(codes, texts('date', _date_text), n_groups)
+
+    groups = []
+    for g in range(n_groups):
+        groups.append({
+            'serial_numbers': serial_numbers[g],
+            'total_amount': float(totals[g]),
+            'po_numbers': info['po_numbers'][g],
+            'inbound_numbers': info['inbound_numbers'][g],
+            'gr_numbers': info['gr_numbers'][g],
+            'plants': info['plants'][g],
+            'dates': dates[g],
+        })
+    min_challans = [min(map(_challan_number, group['serial_numbers']), default=float('inf')) for group in groups]
+    # Stable sort keeps first-appearance order between equal minimums
+    order = sorted(range(n_groups), key=min_challans.__getitem__)
+    return [groups[g] for g in order]
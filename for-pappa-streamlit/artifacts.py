@@ -0,0 +1,95 @@
+"""
+Run artifacts (page PDFs, combined PDF, annexure, ZIP) in spooled temp files.
+
+SpooledArtifacts appends every named file to one SpooledTemporaryFile: it
+stays in memory up to SPOOL_MAX_BYTES and rolls over to disk beyond that, so
+a run holds one copy of its output whatever the page count, with a single
+file handle. The ZIP is assembled member by member from the spool with
+ZIP_STORED: the page content streams are already compressed, so deflating
+again costs CPU and only shaves the PDFs' plain-text object tables.
+"""
+import tempfile
+import threading
+import zipfile
+
+SPOOL_MAX_BYTES = 4 * 1024 * 1024
+CHUNK_BYTES = 1024 * 1024
+
+COMBINED_PDF_NAME = "all_pages_combined.pdf"
+ZIP_NAME = "combined_pdfs.zip"
+ANNEXURE_PDF_NAME = "Annexure_Periodic_Billing.pdf"
+XLSX_WORKBOOK_NAME = "serial_groups.xlsx"     # one sheet per group (xlsx_export.WORKBOOK)
+
+
+class SpooledArtifacts:
+    """Named byte blobs in one spooled temp file."""
+
+    def __init__(self, max_size: int = SPOOL_MAX_BYTES):
+        self._file = tempfile.SpooledTemporaryFile(max_size=max_size)
+        self._index = {}          # name -> (offset, length)
+        self._end = 0
+        self._lock = threading.Lock()
+
+    def add(self, name: str, data: bytes):
+        with self._lock:
+            self._file.seek(self._end)
+            self._file.write(data)
+            self._index[name] = (self._end, len(data))
+            self._end += len(data)
+
+    def __contains__(self, name) -> bool:
+        return name in self._index
+
+    @property
+    def names(self) -> list:
+        return list(self._index)
+
+    @property
+    def nbytes(self) -> int:
+        return self._end
+
+    @property
+    def on_disk(self) -> bool:
+        return self._file._rolled
+
+    def size(self, name: str) -> int:
+        return self._index[name][1]
+
+    def chunks(self, name: str, chunk_size: int = CHUNK_BYTES):
+        """Yield one artifact's bytes in chunks."""
+        offset, remaining = self._index[name]
+        while remaining:
+            with self._lock:
+                self._file.seek(offset)
+                chunk = self._file.read(min(chunk_size, remaining))
+            offset += len(chunk)
+            remaining -= len(chunk)
+            yield chunk
+
+    def read(self, name: str) -> bytes:
+        return b"".join(self.chunks(name))
+
+    def close(self):
+        self._file.close()
+
+
+def spooled_zip(store: SpooledArtifacts, members, max_size: int = SPOOL_MAX_BYTES):
+    """
+    ZIP (stored, not deflated) of (arcname, artifact name) pairs, streamed from
+    store into a new spooled temp file, returned rewound.
+    """
+    out = tempfile.SpooledTemporaryFile(max_size=max_size)
+    with zipfile.ZipFile(out, mode="w", compression=zipfile.ZIP_STORED) as zf:
+        for arcname, name in members:
+            with zf.open(arcname, mode="w") as member:
+                for chunk in store.chunks(name):
+                    member.write(chunk)
+    out.seek(0)
+    return out
+
+
+def zip_files(dest, members):
+    """Write a stored ZIP of (arcname, path) pairs to dest; zipfile streams each file."""
+    with zipfile.ZipFile(dest, mode="w", compression=zipfile.ZIP_STORED) as zf:
+        for arcname, path in members:
+            zf.write(path, arcname)
@@ -0,0 +1,251 @@
+"""
+Headless batch run of the grouped-PDF and annexure generators.
+
+    python batch.py exports/ more/*.xlsx -o out/ [--workers 4] [--annexure]
+                    [--upload] [--upload-workers 8] [--serial-column Del.Challan]
+                    [--backend canvas] [--pdf-profile reportlab] [--annexure-date 2025-01-31]
+
+Each workbook is processed on a worker process and written to
+out/<workbook name>/ (see output_names for inputs sharing a name): one PDF per page, the combined PDF, a ZIP of the page
+PDFs and, with --annexure, the annexure. PDFs are written with the compact
+profile (compressed and byte-for-byte reproducible, see pdf_profile.py)
+unless --pdf-profile says otherwise; every annexure of a batch is dated
+--annexure-date (default: the day the batch starts). With --upload the parent uploads
+the page PDFs and annexures through one UploadPool as workbooks finish, so
+upload concurrency stays bounded however many workers render. A JSON
+summary with per-file timings is printed and saved to out/summary.json.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+from pathlib import Path
+
+from artifacts import ANNEXURE_PDF_NAME, COMBINED_PDF_NAME, ZIP_NAME, zip_files
+from invoice_pdf import BACKENDS, PLATYPUS, build_annexure_pdf
+from pdf_profile import DEFAULT_PROFILE, PROFILES, use as use_pdf_profile
+from pipeline import PageRenderer, SerialColumnNotFound, load_workbook, page_file_name
+
+
+def expand_inputs(inputs) -> list:
+    """Workbook paths from files, directories (their *.xlsx) and glob patterns, de-duplicated."""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            matches = glob.glob(os.path.join(item, "*.xlsx"))
+        elif glob.has_magic(item):
+            matches = glob.glob(item)
+        else:
+            matches = [item]
+        # Skip Excel's "~$name.xlsx" lock files
+        paths.extend(p for p in sorted(matches) if not os.path.basename(p).startswith("~$"))
+    return list(dict.fromkeys(paths))
+
+
+def output_names(paths) -> list:
+    """
+    Output folder name per workbook: its stem, or, when inputs share a stem
+    (x/a.xlsx and y/a.xlsx), its path from their common folder (x_a, y_a).
+    A numeric suffix settles anything still taken. Names are compared
+    case-insensitively, as the filesystem may.
+    """
+    names = [Path(p).stem for p in paths]
+    by_stem = {}
+    for i, name in enumerate(names):
+        by_stem.setdefault(name.lower(), []).append(i)
+    for shared in by_stem.values():
+        if len(shared) < 2:
+            continue
+        stems = [os.path.splitext(os.path.abspath(paths[i]))[0] for i in shared]
+        root = os.path.commonpath([os.path.dirname(stem) for stem in stems])
+        for i, stem in zip(shared, stems):
+            names[i] = os.path.relpath(stem, root).replace(os.sep, "_")
+
+    unique, taken = [], set()
+    for name in names:
+        candidate, n = name, 1
+        while candidate.lower() in taken:
+            n += 1
+            candidate = f"{name}_{n}"
+        taken.add(candidate.lower())
+        unique.append(candidate)
+    return unique
+
+
+def name_collisions(paths, names) -> list:
+    """'x/a.xlsx -> x_a' lines for the inputs that could not keep their own stem."""
+    return [f"{path} -> {name}" for path, name in zip(paths, names) if name != Path(path).stem]
+
+
+def process_file(path: str, dest: str, serial_column: str = "Del.Challan", annexure: bool = False,
+                 backend: str = PLATYPUS, annexure_date: date = None) -> dict:
+    """Render one workbook into the folder dest and report what was written and how long it took."""
+    start = time.perf_counter()
+    summary = {"file": path, "status": "ok", "seconds": {}}
+    seconds = summary["seconds"]
+    try:
+        book = load_workbook(path, serial_column)
+        seconds["read"] = time.perf_counter() - start
+
+        dest = Path(dest)
+        dest.mkdir(parents=True, exist_ok=True)
+        step = time.perf_counter()
+        renderer = PageRenderer(book, backend=backend)
+        pages = []
+        for page_idx, page_serials, pdf_bytes in renderer:
+            name = page_file_name(page_idx + 1, [group['serial'] for group in page_serials])
+            (dest / name).write_bytes(pdf_bytes)
+            pages.append(name)
+        if pages:
+            (dest / COMBINED_PDF_NAME).write_bytes(renderer.combined_pdf())
+            # The ZIP is streamed from the page files just written
+            zip_files(dest / ZIP_NAME, [(name, dest / name) for name in pages])
+        seconds["pages"] = time.perf_counter() - step
+
+        if annexure:
+            step = time.perf_counter()
+            annexure_pdf = build_annexure_pdf(book.df, header_map=book.header_map, schema=book.schema,
+                                              billing_date=annexure_date)
+            (dest / ANNEXURE_PDF_NAME).write_bytes(annexure_pdf)
+            seconds["annexure"] = time.perf_counter() - step
+
+        summary.update(
+            rows=len(book.df),
+            groups=len(book.plan.groups),
+            pages=book.plan.num_pages,
+            output_dir=str(dest),
+            page_pdfs=pages,
+            annexure_pdf=ANNEXURE_PDF_NAME if annexure else None,
+        )
+    except SerialColumnNotFound as e:
+        summary.update(status="error", error=f"Column '{e.serial_column}' not found. "
+                                             f"Available columns: {', '.join(e.columns.astype(str))}")
+    except Exception as e:
+        summary.update(status="error", error=f"{type(e).__name__}: {e}")
+    seconds["total"] = time.perf_counter() - start
+    return summary
+
+
+def _upload_file(path: Path, public_id: str):
+    from cloud import upload_raw_to_cloudinary
+    return upload_raw_to_cloudinary(path.read_bytes(), public_id=public_id)
+
+
+def _queue_uploads(uploads, file_idx: int, summary: dict, user_id: str):
+    """Submit a finished workbook's page PDFs (and annexure) to the upload pool."""
+    dest = Path(summary["output_dir"])
+    timestamp = int(time.time() * 1000)
+    names = list(summary["page_pdfs"]) + ([summary["annexure_pdf"]] if summary["annexure_pdf"] else [])
+    for name in names:
+        page_id = "Annexure_Billing" if name == ANNEXURE_PDF_NAME else name[:-len(".pdf")]
+        uploads.submit((file_idx, name), _upload_file, dest / name, public_id=f"{user_id}_{timestamp}_{page_id}")
+
+
+def run_batch(paths, out_dir: str, workers: int = None, serial_column: str = "Del.Challan",
+              annexure: bool = False, upload: bool = False, upload_workers: int = 4, log=None,
+              backend: str = PLATYPUS, pdf_profile: str = DEFAULT_PROFILE, annexure_date: date = None) -> dict:
+    """Process every workbook on a process pool; returns the JSON-ready summary."""
+    start = time.perf_counter()
+    annexure_date = annexure_date or date.today()
+    workers = max(1, min(workers or os.cpu_count() or 1, len(paths) or 1))
+    summaries = [None] * len(paths)
+    names = output_names(paths)
+    collisions = name_collisions(paths, names)
+    if log and collisions:
+        log(f"{len(collisions)} workbook(s) share a name with another input; their folders in {out_dir}:\n  "
+            + "\n  ".join(collisions))
+
+    uploads = None
+    if upload:
+        from cloud import configure_cloudinary
+        from uploads import UploadPool
+        configure_cloudinary()
+        uploads = UploadPool(max_workers=upload_workers)
+    user_id = os.getenv("USER") or os.getenv("USERNAME") or "user"
+
+    use_pdf_profile(pdf_profile)
+    with ProcessPoolExecutor(max_workers=workers, initializer=use_pdf_profile, initargs=(pdf_profile,)) as pool:
+        futures = {pool.submit(process_file, path, os.path.join(out_dir, name), serial_column, annexure, backend,
+                               annexure_date): i
+                   for i, (path, name) in enumerate(zip(paths, names))}
+        for future in as_completed(futures):
+            i = futures[future]
+            summary = summaries[i] = future.result()
+            if log:
+                detail = f"{summary['pages']} pages" if summary["status"] == "ok" else summary["error"]
+                log(f"[{sum(s is not None for s in summaries)}/{len(paths)}] {summary['file']}: "
+                    f"{summary['status']} in {summary['seconds']['total']:.2f}s ({detail})")
+            if uploads is not None and summary["status"] == "ok":
+                _queue_uploads(uploads, i, summary, user_id)
+
+    if uploads is not None:
+        if log and uploads.pending:
+            log(f"Waiting for {uploads.pending} upload(s)...")
+        from uploads import summarize
+        results = uploads.results()
+        uploads.close()
+        for i, summary in enumerate(summaries):
+            mine = [r for r in results if r.key[0] == i]
+            if summary["status"] != "ok":
+                continue
+            stats = summarize(mine)
+            summary["uploads"] = {
+                "files": stats["files"],
+                "failed": stats["failed"],
+                "retried": stats["retried"],
+                "seconds": stats["total_seconds"],
+                "urls": {r.key[1]: r.url for r in mine if r.ok},
+                "errors": {r.key[1]: str(r.error) for r in mine if not r.ok},
+            }
+
+    ok = [s for s in summaries if s["status"] == "ok"]
+    return {
+        "files": summaries,
+        "processed": len(ok),
+        "failed": len(summaries) - len(ok),
+        "pages": sum(s["pages"] for s in ok),
+        "workers": workers,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Render grouped invoice PDFs for many XLSX workbooks.")
+    parser.add_argument("inputs", nargs="+", help="XLSX files, directories or glob patterns")
+    parser.add_argument("-o", "--output", required=True, help="output directory")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--serial-column", default="Del.Challan")
+    parser.add_argument("--annexure", action="store_true", help="also write the Annexure of Periodic Billing")
+    parser.add_argument("--upload", action="store_true", help="upload PDFs to Cloudinary (CLOUDINARY_* env vars)")
+    parser.add_argument("--upload-workers", type=int, default=4, help="concurrent uploads")
+    parser.add_argument("--backend", choices=BACKENDS, default=PLATYPUS,
+                        help="page renderer: platypus tables or the faster direct canvas")
+    parser.add_argument("--pdf-profile", choices=PROFILES, default=DEFAULT_PROFILE,
+                        help="compact: compressed, identical bytes for identical input (see pdf_profile.py)")
+    parser.add_argument("--annexure-date", type=date.fromisoformat, default=None, metavar="YYYY-MM-DD",
+                        help="date printed on the annexures (default: today)")
+    args = parser.parse_args(argv)
+
+    paths = expand_inputs(args.inputs)
+    if not paths:
+        parser.error("no .xlsx files found")
+    os.makedirs(args.output, exist_ok=True)
+
+    def log(message):
+        print(message, file=sys.stderr, flush=True)
+
+    summary = run_batch(paths, args.output, workers=args.workers, serial_column=args.serial_column,
+                        annexure=args.annexure, upload=args.upload, upload_workers=args.upload_workers, log=log,
+                        backend=args.backend, pdf_profile=args.pdf_profile, annexure_date=args.annexure_date)
+    text = json.dumps(summary, indent=2)
+    Path(args.output, "summary.json").write_text(text)
+    print(text)
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""
+How often the Amount (PKR) column is parsed per upload, and what it costs:
+counts the pd.to_numeric calls (and their time) made by load_workbook,
+PageRenderer over every page and dataframe_to_pdf_buffer, then checks each
+page's total row against a per-group pd.to_numeric(...).sum().
+
+    python benchmarks/bench_amounts.py [rows ...]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+import invoice_pdf  # noqa: E402
+from pipeline import PageRenderer, load_workbook  # noqa: E402
+from synthetic import make_invoice_frame  # noqa: E402
+
+
+class CountCalls:
+    """Wrap pd.to_numeric, counting calls and time spent in them."""
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self._to_numeric = pd.to_numeric
+
+    def __call__(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._to_numeric(*args, **kwargs)
+        finally:
+            self.calls += 1
+            self.seconds += time.perf_counter() - start
+
+    def __enter__(self):
+        pd.to_numeric = self
+        return self
+
+    def __exit__(self, *exc):
+        pd.to_numeric = self._to_numeric
+
+
+def expected_totals(book):
+    """Each page's last total row, summed group by group the way the builders used to."""
+    amount_col = book.schema.amount_pkr
+    plan = book.plan
+    for page_idx in range(plan.num_pages):
+        last = plan.page_offsets[page_idx + 1] - 1
+        rows = plan.groups.rows_of(plan.piece_group[last])[:plan.piece_stop[last]]
+        yield f"{pd.to_numeric(book.df.iloc[rows, amount_col], errors='coerce').sum():,.2f}"
+
+
+def main(row_counts):
+    for n_rows in row_counts:
+        df = make_invoice_frame(n_rows)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "invoice.xlsx")
+            df.to_excel(path, index=False)
+
+            start = time.perf_counter()
+            with CountCalls() as parses:
+                book = load_workbook(path)
+                renderer = PageRenderer(book)
+                pages = [page_serials for _, page_serials, _ in renderer]
+                renderer.combined_pdf()
+                invoice_pdf.dataframe_to_pdf_buffer(book.df.head(20), book.header_map, book.schema)
+            elapsed = time.perf_counter() - start
+
+        printed = (invoice_pdf.build_page_table(p, book.header_map, book.schema, renderer.col_widths)
+                   ._cellvalues[-1][book.schema.amount_pkr] for p in pages)
+        mismatches = sum(a != b for a, b in zip(printed, expected_totals(book)))
+        print(f"{n_rows} rows, {book.plan.num_pages} pages: {parses.calls} pd.to_numeric calls "
+              f"({parses.seconds * 1000:.0f} ms of {elapsed:.1f}s), {mismatches} page totals differ")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [1_000, 10_000])
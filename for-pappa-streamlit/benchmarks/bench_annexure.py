@@ -0,0 +1,91 @@
+"""
+Annexure grouping: the old df.iterrows() walk vs annexure.aggregate_annexure,
+checking both produce the same groups in the same order.
+
+    python benchmarks/bench_annexure.py [rows ...]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+import invoice_pdf  # noqa: E402
+from annexure import aggregate_annexure  # noqa: E402
+from synthetic import make_invoice_frame  # noqa: E402
+
+
+def legacy_groups(df, col_mapping):
+    """The grouping loop build_annexure_pdf used to run, condensed."""
+    serial_groups = {}
+    for _, row in df.iterrows():
+        serial_num = str(row.get(col_mapping.get('challan', ''), '')).strip()
+        serial_ending = serial_num[-2:] if len(serial_num) >= 2 else serial_num
+        amount_value = row.get(col_mapping.get('amount', ''), 0)
+        if pd.isna(amount_value):
+            amount = 0.0
+        else:
+            try:
+                amount = float(str(amount_value).replace(',', '').replace('PKR', '').strip())
+            except (ValueError, TypeError):
+                amount = 0.0
+        group = serial_groups.setdefault(serial_ending, {
+            'serial_numbers': [], 'total_amount': 0.0, 'po_numbers': [], 'inbound_numbers': [],
+            'gr_numbers': [], 'plants': [], 'dates': [],
+        })
+        group['serial_numbers'].append(serial_num)
+        group['total_amount'] += amount
+        for role, field in (('po', 'po_numbers'), ('inbound', 'inbound_numbers'), ('gr', 'gr_numbers'),
+                            ('plant', 'plants')):
+            value = str(row.get(col_mapping.get(role, ''), '')).strip()
+            if value and value not in group[field]:
+                group[field].append(value)
+        date_val = row.get(col_mapping.get('date', ''), '')
+        if pd.notna(date_val) and str(date_val).strip():
+            if hasattr(date_val, 'strftime'):
+                date_str = date_val.strftime('%d/%m/%y')
+            else:
+                date_str = str(date_val).strip()
+                date_str = date_str if len(date_str) >= 8 else str(date_val)
+            if date_str and date_str not in group['dates']:
+                group['dates'].append(date_str)
+
+    def get_min_challan(serial_ending):
+        numbers = []
+        for challan in serial_groups[serial_ending]['serial_numbers']:
+            try:
+                numbers.append(int(challan))
+            except (ValueError, TypeError):
+                numbers.append(float('inf'))
+        return min(numbers) if numbers else float('inf')
+
+    return [serial_groups[k] for k in sorted(serial_groups, key=get_min_challan)]
+
+
+def main(row_counts):
+    for n_rows in row_counts:
+        df = make_invoice_frame(n_rows)
+        col_mapping = invoice_pdf.resolve_column_schema(df.columns).annexure_columns
+
+        start = time.perf_counter()
+        old = legacy_groups(df, col_mapping)
+        old_s = time.perf_counter() - start
+        start = time.perf_counter()
+        new = aggregate_annexure(df, col_mapping)
+        new_s = time.perf_counter() - start
+
+        for o, n in zip(old, new, strict=True):
+            o['serial_numbers'] = list(dict.fromkeys(o['serial_numbers']))
+            assert o == n, "aggregation differs from the iterrows walk"
+
+        start = time.perf_counter()
+        invoice_pdf.build_annexure_pdf(df)
+        pdf_s = time.perf_counter() - start
+        print(f"{n_rows:>7} rows, {len(new)} groups: iterrows {old_s:.3f}s, aggregate {new_s:.3f}s "
+              f"({old_s / new_s:.0f}x); whole annexure PDF now {pdf_s:.3f}s")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [10_000, 100_000])
@@ -0,0 +1,99 @@
+"""
+Peak memory of a large in-app run: the old artifact handling (every page PDF
+kept as bytes, every table kept for the combined PDF, a deflated ZIP built in
+memory) vs the streaming PageRenderer writing into a SpooledArtifacts store
+and a stored ZIP spooled from it. Each mode runs in its own process so the
+peak RSS (ru_maxrss) is its own.
+
+    python benchmarks/bench_artifacts.py [pages]
+"""
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import invoice_pdf  # noqa: E402
+from artifacts import COMBINED_PDF_NAME  # noqa: E402
+from pagination import group_by_serial, plan_pages  # noqa: E402
+from pipeline import PageRenderer, Workbook, page_file_name  # noqa: E402
+from run_cache import RunArtifacts  # noqa: E402
+from synthetic import make_invoice_frame  # noqa: E402
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def make_book(n_pages) -> Workbook:
+    # ~10 rows per page with the default group sizes
+    df = make_invoice_frame(n_pages * 10)
+    plan = plan_pages(group_by_serial(df, "Del.Challan"))
+    return Workbook(df=df, serial_column="Del.Challan", plan=plan,
+                    header_map=invoice_pdf.get_robust_header_map(df.columns),
+                    schema=invoice_pdf.resolve_column_schema(df.columns))
+
+
+def old_run(book):
+    """What process_upload held before: bytes per page, all tables, combined bytes, deflated ZIP bytes."""
+    tables, pages = [], []
+    for page_idx, page_serials in enumerate(book.plan.iter_page_groups(book.df)):
+        table = invoice_pdf.build_page_table(page_serials, header_map=book.header_map, schema=book.schema)
+        tables.append(table)
+        pages.append((page_file_name(page_idx + 1, [g['serial'] for g in page_serials]),
+                      invoice_pdf.tables_to_pdf([table])))
+    combined = invoice_pdf.tables_to_pdf(tables)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, pdf_bytes in pages:
+            zf.writestr(name, pdf_bytes)
+    zip_bytes = buffer.getvalue()
+    return {"pages": len(pages), "combined_bytes": len(combined), "zip_bytes": len(zip_bytes), "on_disk": False}
+
+
+def new_run(book):
+    run = RunArtifacts(key=("bench",), timestamp=0)
+    renderer = PageRenderer(book)
+    names = []
+    for page_idx, page_serials, pdf_bytes in renderer:
+        name = page_file_name(page_idx + 1, [g['serial'] for g in page_serials])
+        run.files.add(name, pdf_bytes)
+        names.append(name)
+    run.files.add(COMBINED_PDF_NAME, renderer.combined_pdf())
+    run.zip_members = [(name, name) for name in names]
+    result = {"pages": len(names), "combined_bytes": run.files.size(COMBINED_PDF_NAME),
+              "zip_bytes": len(run.zip_bytes()), "on_disk": run.files.on_disk}
+    run.close()
+    return result
+
+
+def measure(mode, n_pages):
+    book = make_book(n_pages)
+    before = peak_rss_mb()
+    start = time.perf_counter()
+    result = (old_run if mode == "old" else new_run)(book)
+    result.update(seconds=time.perf_counter() - start, peak_mb=peak_rss_mb(), setup_mb=before)
+    print(json.dumps(result))
+
+
+def main(n_pages):
+    for mode in ("old", "new"):
+        out = subprocess.run([sys.executable, __file__, "--mode", mode, str(n_pages)],
+                             check=True, capture_output=True, text=True).stdout
+        r = json.loads(out)
+        print(f"{mode}: {r['pages']} pages in {r['seconds']:.1f}s, peak RSS {r['peak_mb']:.0f} MB "
+              f"(+{r['peak_mb'] - r['setup_mb']:.0f} MB over setup), combined {r['combined_bytes'] / 1e6:.1f} MB, "
+              f"ZIP {r['zip_bytes'] / 1e6:.1f} MB, spooled to disk: {r['on_disk']}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--mode":
+        measure(sys.argv[2], int(sys.argv[3]))
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,45 @@
+"""
+Pages per second of each page renderer (invoice_pdf.BACKENDS) on a
+synthetic workbook: PageRenderer over every page plus the combined
+document, in-process, the way a serial run renders.
+
+    python benchmarks/bench_canvas_backend.py [rows ...]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import invoice_pdf  # noqa: E402
+from pipeline import PageRenderer, load_workbook  # noqa: E402
+from synthetic import make_invoice_frame  # noqa: E402
+
+
+def render(book, backend):
+    start = time.perf_counter()
+    renderer = PageRenderer(book, backend=backend)
+    size = sum(len(pdf_bytes) for _, _, pdf_bytes in renderer)
+    size += len(renderer.combined_pdf())
+    return time.perf_counter() - start, size
+
+
+def main(row_counts):
+    print(f"{'rows':>7} {'pages':>6} {'backend':>9} {'seconds':>8} {'pages/s':>8} {'MB':>6}")
+    for n_rows in row_counts:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "invoice.xlsx")
+            make_invoice_frame(n_rows).to_excel(path, index=False)
+            book = load_workbook(path)
+        n_pages = book.plan.num_pages
+        baseline = None
+        for backend in invoice_pdf.BACKENDS:
+            seconds, size = render(book, backend)
+            baseline = baseline or seconds
+            print(f"{n_rows:>7} {n_pages:>6} {backend:>9} {seconds:>8.2f} {n_pages / seconds:>8.0f} "
+                  f"{size / 1e6:>6.1f}" + (f"  ({baseline / seconds:.1f}x)" if seconds != baseline else ""))
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [1_000, 10_000])
@@ -0,0 +1,77 @@
+"""
+Page rendering with ReportLab auto-sized columns (stringWidth on every cell
+of every page) vs fixed widths planned once per upload by
+invoice_pdf.plan_table_widths. Checks that the plan equals the widest
+auto-sized width of each column over all pages.
+
+    python benchmarks/bench_column_widths.py [pages ...]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+import invoice_pdf  # noqa: E402
+from formatting import format_cells  # noqa: E402
+from pagination import group_by_serial, plan_pages  # noqa: E402
+from synthetic import make_invoice_frame  # noqa: E402
+
+
+def render(pages, header_map, schema, col_widths=None):
+    """Per-page PDFs plus the combined document, laying each page out once (as PageRenderer does)."""
+    tables = [invoice_pdf.build_page_table(p, header_map, schema, col_widths) for p in pages]
+    per_page = [invoice_pdf.tables_to_pdf([t]) for t in tables]
+    return per_page, invoice_pdf.tables_to_pdf(tables)
+
+
+def layout(pages, header_map, schema, col_widths=None):
+    """Build and wrap every page table without drawing: the part column sizing affects."""
+    for p in pages:
+        invoice_pdf.build_page_table(p, header_map, schema, col_widths).wrap(0, 0)
+
+
+def main(page_counts):
+    for n_pages in page_counts:
+        # ~10 rows per page with the default group sizes
+        df = make_invoice_frame(n_pages * 10)
+        schema = invoice_pdf.resolve_column_schema(df.columns)
+        header_map = invoice_pdf.get_robust_header_map(df.columns)
+        amounts = invoice_pdf.amount_values(df, schema)
+        plan = plan_pages(group_by_serial(df, "Del.Challan"), amounts=amounts)
+        cells = format_cells(df, schema)
+        pages = list(plan.iter_page_groups(df, cells))
+
+        start = time.perf_counter()
+        render(pages, header_map, schema)
+        auto_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        col_widths = invoice_pdf.plan_table_widths(df, cells, plan, header_map, schema, amounts)
+        plan_s = time.perf_counter() - start
+        render(pages, header_map, schema, col_widths)
+        fixed_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        layout(pages, header_map, schema)
+        auto_layout_s = time.perf_counter() - start
+        start = time.perf_counter()
+        layout(pages, header_map, schema, col_widths)
+        fixed_layout_s = time.perf_counter() - start
+
+        auto_widths = None
+        for p in pages:
+            table = invoice_pdf.build_page_table(p, header_map, schema)
+            table.wrap(0, 0)
+            auto_widths = table._colWidths if auto_widths is None else np.maximum(auto_widths, table._colWidths)
+        assert list(auto_widths) == list(col_widths), (list(auto_widths), col_widths)
+
+        print(f"{len(pages)} pages: auto-sized {auto_s:.2f}s, planned widths {fixed_s:.2f}s "
+              f"(plan {plan_s * 1000:.0f} ms, {auto_s / fixed_s:.2f}x); layout only: "
+              f"{auto_layout_s:.2f}s vs {fixed_layout_s:.2f}s ({auto_layout_s / fixed_layout_s:.1f}x)")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [100, 1000])
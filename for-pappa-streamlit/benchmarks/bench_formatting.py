@@ -0,0 +1,59 @@
+"""
+Cell formatting: iterrows + per-cell format_cell_value + truncation loops vs formatting.format_cells.
+
+    python benchmarks/bench_formatting.py [rows]
+"""
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from column_schema import resolve_column_schema  # noqa: E402
+from formatting import format_rows  # noqa: E402
+from synthetic import make_invoice_frame  # noqa: E402
+
+
+def format_cell_value(value, column_name):
+    """The per-cell formatter the builders used before formatting.py."""
+    if pd.isna(value):
+        return ""
+    col_clean = str(column_name).lower().strip()
+    if ("date" in col_clean or "rec" in col_clean) and hasattr(value, 'strftime'):
+        return value.strftime('%Y-%m-%d')
+    return str(value)
+
+
+def legacy_rows(df, part_name_col_idx, max_cell_len=80):
+    data = [[format_cell_value(row[col], col) for col in df.columns] for _, row in df.iterrows()]
+    for r in range(len(data)):
+        for cidx in range(len(data[r])):
+            val = str(data[r][cidx]) if data[r][cidx] is not None else ""
+            data[r][cidx] = (val[: max_cell_len - 1] + "…") if len(val) > max_cell_len else val
+    for row in data:
+        for cidx, cell in enumerate(row):
+            if cidx == part_name_col_idx and len(cell) > 12:
+                row[cidx] = cell[:8] + ".."
+    return data
+
+
+def main(n_rows):
+    df = make_invoice_frame(n_rows)
+    schema = resolve_column_schema(df.columns)
+
+    start = time.perf_counter()
+    old = legacy_rows(df, schema.part_name)
+    legacy_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    new = format_rows(df, schema)
+    new_s = time.perf_counter() - start
+
+    assert new == old
+    print(f"{n_rows} rows: iterrows {legacy_s:.2f}s, column-wise {new_s:.3f}s ({legacy_s / new_s:.0f}x)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,69 @@
+"""
+XLSX ingest: the old pd.read_excel(uploaded) call vs ingest.read_invoice,
+for the regular flow (every column) and the annexure (pruned columns), with
+each available engine. Reports wall time, peak traced memory and the size
+of the resulting frame.
+
+    python benchmarks/bench_ingest.py [rows]
+"""
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+import ingest  # noqa: E402
+from synthetic import make_invoice_frame  # noqa: E402
+
+
+def old_read(raw):
+    df = pd.read_excel(io.BytesIO(raw))
+    df.columns = df.columns.str.strip()
+    return df
+
+
+def measure(read, raw):
+    start = time.perf_counter()
+    df = read(raw)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    read(raw)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, df.memory_usage(deep=True).sum()
+
+
+def main(n_rows):
+    buf = io.BytesIO()
+    make_invoice_frame(n_rows).to_excel(buf, index=False)
+    raw = buf.getvalue()
+
+    start = time.perf_counter()
+    columns = ingest.read_header(io.BytesIO(raw))
+    print(f"{n_rows} rows, {len(raw) / 1e6:.1f} MB: header only {time.perf_counter() - start:.3f}s")
+    serial = ingest.find_column(columns, "Del.Challan")
+    annexure_cols = ingest.annexure_usecols(columns, serial)
+
+    cases = [("read_excel (old)", old_read)]
+    engines = ["openpyxl"] + (["calamine"] if ingest.excel_engine() == "calamine" else [])
+    for engine in engines:
+        cases.append((f"{engine}, all columns",
+                      lambda r, e=engine: ingest.read_invoice(io.BytesIO(r), serial_column=serial, engine=e)))
+        cases.append((f"{engine}, annexure columns",
+                      lambda r, e=engine: ingest.read_invoice(io.BytesIO(r), usecols=annexure_cols,
+                                                              serial_column=serial, engine=e)))
+
+    base = None
+    for name, read in cases:
+        elapsed, peak, frame_bytes = measure(read, raw)
+        base = base or elapsed
+        print(f"  {name:<28} {elapsed:6.2f}s ({base / elapsed:4.1f}x)  peak {peak / 1e6:6.0f} MB  "
+              f"frame {frame_bytes / 1e6:5.1f} MB")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000)
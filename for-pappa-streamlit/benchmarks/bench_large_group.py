@@ -0,0 +1,58 @@
+"""
+One delivery challan with 20,000 rows: the workbook goes through
+load_workbook and PageRenderer like an upload, and dataframe_to_pdf_buffer
+gets the same frame. Reports pages/s and peak RSS; the page budget, the
+carried subtotals and the totals of split groups are checked by
+tests/test_pagination.py.
+
+    python benchmarks/bench_large_group.py [rows]
+"""
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import invoice_pdf  # noqa: E402
+from pipeline import PageRenderer, load_workbook  # noqa: E402
+from synthetic import make_invoice_frame  # noqa: E402
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main(n_rows):
+    df = make_invoice_frame(n_rows)
+    df["Del.Challan"] = 100001
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "single_challan.xlsx")
+        df.to_excel(path, index=False)
+
+        start = time.perf_counter()
+        book = load_workbook(path)
+        read_s = time.perf_counter() - start
+        print(f"{n_rows} rows, 1 challan: read + plan {read_s:.1f}s, {book.plan.num_pages} pages "
+              f"(peak RSS {peak_rss_mb():.0f} MB)")
+
+        # Page by page, as the app does: data rows + header, total and brought-forward rows fit
+        start = time.perf_counter()
+        renderer = PageRenderer(book)
+        for _ in renderer:
+            pass
+        combined = renderer.combined_pdf()
+        pages_s = time.perf_counter() - start
+        print(f"  PageRenderer: {pages_s:.1f}s ({book.plan.num_pages / pages_s:.0f} pages/s), "
+              f"combined {len(combined) / 1e6:.1f} MB, peak RSS {peak_rss_mb():.0f} MB")
+
+        start = time.perf_counter()
+        pdf = invoice_pdf.dataframe_to_pdf_buffer(book.df, book.header_map, book.schema)
+        print(f"  dataframe_to_pdf_buffer: {time.perf_counter() - start:.1f}s, "
+              f"{pdf.count(b'/Type /Page') - pdf.count(b'/Type /Pages')} pages, "
+              f"peak RSS {peak_rss_mb():.0f} MB")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
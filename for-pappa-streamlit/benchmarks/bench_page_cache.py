@@ -0,0 +1,61 @@
+"""
+Re-uploading an edited workbook with the page cache (page_cache.py): a full
+render into an empty cache, then the same workbook with a few amounts
+corrected, against rendering it without the cache. Checks that the reused
+pages are byte-identical to a fresh render.
+
+    python benchmarks/bench_page_cache.py [pages] [edited rows]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+from reportlab import rl_config  # noqa: E402
+
+from page_cache import PageCache  # noqa: E402
+from pipeline import PageRenderer, load_workbook  # noqa: E402
+from synthetic import make_invoice_frame  # noqa: E402
+
+
+def render(path, page_cache=None):
+    start = time.perf_counter()
+    renderer = PageRenderer(load_workbook(path), page_cache=page_cache)
+    pages = [pdf_bytes for _, _, pdf_bytes in renderer]
+    combined = renderer.combined_pdf()
+    return time.perf_counter() - start, pages, combined, renderer
+
+
+def main(n_pages, n_edits):
+    rl_config.invariant = 1   # byte-comparable output
+    # ~10 rows per page with the default group sizes
+    df = make_invoice_frame(n_pages * 10)
+    edited = df.copy()
+    rows = np.random.default_rng(1).choice(len(df), n_edits, replace=False)
+    # Small corrections, so the planned column widths stay the same
+    edited.loc[edited.index[rows], "Amount (PKR)"] = edited["Amount (PKR)"].iloc[rows] - 1
+
+    with tempfile.TemporaryDirectory() as tmp:
+        original_path, edited_path = os.path.join(tmp, "original.xlsx"), os.path.join(tmp, "edited.xlsx")
+        df.to_excel(original_path, index=False)
+        edited.to_excel(edited_path, index=False)
+        cache = PageCache(os.path.join(tmp, "cache"))
+
+        cold_s, _, _, renderer = render(original_path, cache)
+        print(f"{len(renderer.page_fps)} pages, first upload: {cold_s:.2f}s ({renderer.rebuilt} rendered)")
+
+        plain_s, plain_pages, plain_combined, _ = render(edited_path)
+        warm_s, pages, combined, renderer = render(edited_path, cache)
+        assert pages == plain_pages and combined == plain_combined
+        print(f"{n_edits} row(s) edited: {renderer.reused} pages reused, {renderer.rebuilt} rebuilt; "
+              f"{warm_s:.2f}s vs {plain_s:.2f}s without the cache ({plain_s / warm_s:.1f}x)")
+
+        same_s, _, _, renderer = render(edited_path, cache)
+        print(f"unchanged re-upload: {same_s:.2f}s ({renderer.reused} reused, combined from the cache)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000, int(sys.argv[2]) if len(sys.argv) > 2 else 10)
@@ -0,0 +1,55 @@
+"""
+Combined-document size and write time with the repeated page furniture
+drawn on every page vs defined once as form XObjects (grid_canvas), for
+each page renderer at 100 and 1,000 pages. Pages are laid out once per
+backend; the timings are drawing plus saving the document.
+
+    python benchmarks/bench_page_forms.py [pages ...]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import invoice_pdf  # noqa: E402
+from formatting import format_cells  # noqa: E402
+from pagination import group_by_serial, plan_pages  # noqa: E402
+from synthetic import make_invoice_frame  # noqa: E402
+
+
+def count_forms(pdf_bytes: bytes) -> int:
+    return pdf_bytes.count(b"/Subtype /Form")
+
+
+def write(tables, shared_forms: bool):
+    start = time.perf_counter()
+    pdf_bytes = invoice_pdf.tables_to_pdf(tables, shared_forms=shared_forms)
+    return time.perf_counter() - start, pdf_bytes
+
+
+def main(page_counts):
+    # About ten rows a page
+    df = make_invoice_frame(max(page_counts) * 12)
+    schema = invoice_pdf.resolve_column_schema(df.columns)
+    header_map = invoice_pdf.get_robust_header_map(df.columns)
+    cells = format_cells(df, schema)
+    plan = plan_pages(group_by_serial(df, "Del.Challan"), amounts=invoice_pdf.amount_values(df, schema))
+    col_widths = invoice_pdf.plan_table_widths(df, cells, plan, header_map, schema)
+    all_pages = list(plan.iter_page_groups(df, cells))
+
+    print(f"{'pages':>6} {'backend':>9} {'forms':>6} {'KB':>7} {'seconds':>8} {'pages/s':>8} {'size':>6} {'time':>6}")
+    for n_pages in page_counts:
+        pages = all_pages[:n_pages]
+        for backend in invoice_pdf.BACKENDS:
+            tables = [invoice_pdf.build_page_table(p, header_map, schema, col_widths, backend) for p in pages]
+            plain_s, plain = write(tables, shared_forms=False)
+            forms_s, shared = write(tables, shared_forms=True)
+            print(f"{len(pages):>6} {backend:>9} {'-':>6} {len(plain) / 1024:>7.0f} {plain_s:>8.2f} "
+                  f"{len(pages) / plain_s:>8.0f}")
+            print(f"{len(pages):>6} {backend:>9} {count_forms(shared):>6} {len(shared) / 1024:>7.0f} {forms_s:>8.2f} "
+                  f"{len(pages) / forms_s:>8.0f} {len(shared) / len(plain) - 1:>+6.0%} {forms_s / plain_s - 1:>+6.0%}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [100, 1_000])
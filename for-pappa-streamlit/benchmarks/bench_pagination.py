@@ -0,0 +1,62 @@
+"""
+Grouping + page planning: the old per-row dict loop vs pagination.plan_pages.
+
+    python benchmarks/bench_pagination.py [rows ...]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pagination import group_by_serial, plan_pages  # noqa: E402
+from synthetic import make_invoice_frame  # noqa: E402
+
+
+def legacy_plan(df, serial_column, max_rows_per_page=25):
+    """The grouping/pagination loop main() used before pagination.py."""
+    serial_values = df[serial_column].astype(str).fillna("").str.strip()
+    groups = {}
+    for idx, value in serial_values.items():
+        if value:
+            groups.setdefault(value, []).append(idx)
+
+    page_groups, current_page, current_page_rows = [], [], 0
+    for serial, row_indices in groups.items():
+        group_df = df.loc[row_indices].copy()
+        group_rows_needed = 1 + len(group_df) + 1
+        spacing_rows = 4 if current_page else 0
+        if current_page_rows + group_rows_needed + spacing_rows > max_rows_per_page and current_page:
+            page_groups.append(current_page)
+            current_page, current_page_rows, spacing_rows = [], 0, 0
+        current_page.append({'serial': serial, 'df': group_df, 'row_indices': row_indices})
+        current_page_rows += group_rows_needed + spacing_rows
+    if current_page:
+        page_groups.append(current_page)
+    return page_groups
+
+
+def best_of(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(row_counts):
+    print(f"{'rows':>8} {'pages':>7} {'legacy s':>10} {'planner s':>10} {'speedup':>8}")
+    for n in row_counts:
+        df = make_invoice_frame(n)
+        pages = len(legacy_plan(df, "Del.Challan"))
+        # The legacy loop never split groups taller than a page
+        plan = plan_pages(group_by_serial(df, "Del.Challan"), split=False)
+        assert plan.num_pages == pages
+        legacy = best_of(lambda: legacy_plan(df, "Del.Challan"), repeat=1)
+        planner = best_of(lambda: plan_pages(group_by_serial(df, "Del.Challan")))
+        print(f"{n:>8} {pages:>7} {legacy:>10.3f} {planner:>10.4f} {legacy / planner:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [5_000, 50_000])
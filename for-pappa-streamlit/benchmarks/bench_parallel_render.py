@@ -0,0 +1,63 @@
+"""
+Page rendering throughput, combined document included: PageRenderer in
+process vs on render_pool with 1..N workers. The timed work is every page's
+PDF plus the combined document, as a run produces them; the CPU time spent
+in this process (the combined document's share, which does not parallelize)
+is printed beside it. Runs in ReportLab
+invariant mode and checks every pool's pages and combined document are
+byte-for-byte the serial output.
+
+    python benchmarks/bench_parallel_render.py [pages] [max_workers] [backend]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reportlab import rl_config  # noqa: E402
+
+import invoice_pdf  # noqa: E402
+from pagination import group_by_serial, plan_pages  # noqa: E402
+from pipeline import PageRenderer, Workbook  # noqa: E402
+from render_pool import make_render_pool  # noqa: E402
+from synthetic import make_invoice_frame  # noqa: E402
+
+
+def render(book, pool, backend):
+    renderer = PageRenderer(book, pool=pool, backend=backend)
+    pages = [pdf_bytes for _, _, pdf_bytes in renderer]
+    return pages, renderer.combined_pdf()
+
+
+def main(n_pages, max_workers, backend):
+    rl_config.invariant = 1
+    df = make_invoice_frame(n_pages * 15)
+    plan = plan_pages(group_by_serial(df, "Del.Challan"))
+    book = Workbook(df=df, serial_column="Del.Challan", plan=plan,
+                    header_map=invoice_pdf.get_robust_header_map(df.columns),
+                    schema=invoice_pdf.resolve_column_schema(df.columns))
+
+    start = time.perf_counter()
+    serial = render(book, None, backend)
+    serial_s = time.perf_counter() - start
+    n = plan.num_pages
+    print(f"{n} pages + combined ({backend}), serial: {serial_s:.2f}s ({n / serial_s:.0f} pages/s)")
+
+    workers = 1
+    while workers <= max_workers:
+        pool = make_render_pool(workers)  # warm: start-up is not timed
+        start, cpu_start = time.perf_counter(), time.process_time()
+        parallel = render(book, pool, backend)
+        elapsed, cpu = time.perf_counter() - start, time.process_time() - cpu_start
+        pool.shutdown()
+        assert parallel == serial, "parallel output differs from serial"
+        print(f"{workers:>2} workers: {elapsed:.2f}s ({n / elapsed:.0f} pages/s, "
+              f"{serial_s / elapsed:.1f}x serial), {cpu:.2f}s CPU in this process")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 400,
+         int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 2),
+         sys.argv[3] if len(sys.argv) > 3 else invoice_pdf.PLATYPUS)
@@ -0,0 +1,79 @@
+"""
+PDF bytes and upload time of a typical batch (page PDFs, combined document
+and annexure of one workbook) per rendering profile (pdf_profile.py), plus
+ReportLab with page compression switched off for comparison.
+
+Every profile renders the batch twice, a second apart: "same bytes" counts
+the files whose SHA-256 matched between the two renders, i.e. the files a
+content-hash dedupe would not upload again for an unchanged re-run. Upload
+time is estimated for --mbps of upstream bandwidth plus --latency per file.
+
+    python benchmarks/bench_pdf_profile.py [--rows 2000] [--mbps 10] [--latency 0.3]
+"""
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import invoice_pdf  # noqa: E402
+import pdf_profile  # noqa: E402
+from pipeline import PageRenderer, load_workbook  # noqa: E402
+from synthetic import make_invoice_frame  # noqa: E402
+
+BILLING_DATE = date(2025, 1, 31)   # as a re-run on another day would pass it
+PROFILES = {"uncompressed": pdf_profile.PdfProfile(page_compression=False, invariant=False), **pdf_profile.PROFILES}
+
+
+def render_batch(book) -> dict:
+    """File name -> PDF bytes of the workbook's page PDFs, combined document and annexure."""
+    renderer = PageRenderer(book)
+    files = {f"page_{page_idx + 1}.pdf": pdf_bytes for page_idx, _, pdf_bytes in renderer}
+    files["combined.pdf"] = renderer.combined_pdf()
+    files["annexure.pdf"] = invoice_pdf.build_annexure_pdf(book.df, header_map=book.header_map, schema=book.schema,
+                                                           billing_date=BILLING_DATE)
+    return files
+
+
+def upload_seconds(files, mbps: float, latency: float) -> float:
+    return sum(len(data) * 8 / (mbps * 1e6) + latency for data in files)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--mbps", type=float, default=10.0, help="upstream bandwidth, Mbit/s")
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds per upload request")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "invoice.xlsx")
+        make_invoice_frame(args.rows).to_excel(path, index=False)
+        book = load_workbook(path)
+
+    print(f"{args.rows} rows, {book.plan.num_pages} pages + combined + annexure; "
+          f"uploads at {args.mbps:g} Mbit/s, {args.latency:g}s per file")
+    print(f"{'profile':>13} {'MB':>7} {'render s':>9} {'upload s':>9} {'same bytes':>11} {'re-run upload s':>16}")
+    baseline = None
+    for name, profile in PROFILES.items():
+        pdf_profile.use(profile)
+        start = time.perf_counter()
+        first = render_batch(book)
+        render_s = time.perf_counter() - start
+        time.sleep(1.1)     # ReportLab's timestamps have one-second resolution
+        second = render_batch(book)
+        same = [n for n in first if hashlib.sha256(first[n]).digest() == hashlib.sha256(second[n]).digest()]
+        size = sum(map(len, first.values()))
+        upload_s = upload_seconds(first.values(), args.mbps, args.latency)
+        rerun_s = upload_seconds([second[n] for n in second if n not in same], args.mbps, args.latency)
+        baseline = baseline or size
+        print(f"{name:>13} {size / 1e6:>7.2f} {render_s:>9.2f} {upload_s:>9.1f} {len(same):>5}/{len(first):<5} "
+              f"{rerun_s:>16.1f}  ({size / baseline - 1:+.0%} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Per-page PDFs + combined document: old flow (every page rendered twice more for
+the combined PDF) vs laying each page out once and reusing the tables.
+
+    python benchmarks/bench_render_pipeline.py [pages]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import invoice_pdf  # noqa: E402
+from pagination import group_by_serial, plan_pages  # noqa: E402
+from synthetic import make_invoice_frame  # noqa: E402
+
+
+def old_flow(pages, header_map, schema):
+    per_page = [invoice_pdf.build_single_page_pdf(p, header_map, schema=schema) for p in pages]
+    # build_multi_page_pdf used to call build_single_page_pdf per page and discard it
+    for p in pages:
+        invoice_pdf.build_single_page_pdf(p, header_map, schema=schema)
+    combined = invoice_pdf.build_multi_page_pdf(pages, header_map, schema=schema)
+    return per_page, combined
+
+
+def new_flow(pages, header_map, schema):
+    tables = [invoice_pdf.build_page_table(p, header_map, schema) for p in pages]
+    per_page = [invoice_pdf.tables_to_pdf([t]) for t in tables]
+    return per_page, invoice_pdf.tables_to_pdf(tables)
+
+
+def main(n_pages):
+    df = make_invoice_frame(n_pages * 15)
+    plan = plan_pages(group_by_serial(df, "Del.Challan"))
+    pages = [plan.page_groups(df, p) for p in range(min(n_pages, plan.num_pages))]
+    schema = invoice_pdf.resolve_column_schema(df.columns)
+    header_map = invoice_pdf.get_robust_header_map(df.columns)
+
+    timings = {}
+    for name, flow in (("old", old_flow), ("new", new_flow)):
+        start = time.perf_counter()
+        flow(pages, header_map, schema)
+        timings[name] = time.perf_counter() - start
+
+    print(f"{len(pages)} pages: old {timings['old']:.2f}s, new {timings['new']:.2f}s "
+          f"({timings['old'] / timings['new']:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
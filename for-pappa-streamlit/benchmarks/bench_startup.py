@@ -0,0 +1,88 @@
+"""
+Cold start of streamlit_app.py, each measurement in a fresh interpreter:
+
+    import       `python -X importtime -c "import streamlit_app"`: total and
+                 the slowest modules it imports directly
+    first render the app's first script run under streamlit.testing (no file
+                 uploaded) until the uploader is drawn
+
+    python benchmarks/bench_startup.py [--repeat 5] [--app-dir DIR]
+
+--app-dir points at another checkout of the app to compare against.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FIRST_RENDER = """
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+ready = time.perf_counter()
+sys.path.insert(0, {app_dir!r})
+at = AppTest.from_file({script!r}, default_timeout=120).run()
+done = time.perf_counter()
+print(json.dumps({{"harness": ready - start, "script": done - ready,
+                  "uploader": len(at.get("file_uploader")), "exceptions": [e.message for e in at.exception]}}))
+"""
+
+
+def app_env() -> dict:
+    """Placeholder Cloudinary credentials, so an app configuring the SDK at import time starts too."""
+    return {**os.environ, "CLOUDINARY_CLOUD_NAME": "bench", "CLOUDINARY_API_KEY": "bench",
+            "CLOUDINARY_API_SECRET": "bench"}
+
+
+def import_profile(app_dir: str) -> tuple:
+    """(total seconds, [(cumulative seconds, module)] for each module streamlit_app imports directly)."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import streamlit_app"], cwd=app_dir,
+                          env=app_env(), capture_output=True, text=True, check=True)
+    total, direct = 0.0, []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Names are indented two spaces per level of nesting
+        if name.strip() == "streamlit_app":
+            total = int(cumulative) / 1e6
+        elif name.startswith("   ") and not name.startswith("     "):
+            direct.append((int(cumulative) / 1e6, name.strip()))
+    return total, sorted(direct, reverse=True)
+
+
+def first_render(app_dir: str) -> dict:
+    code = FIRST_RENDER.format(app_dir=app_dir, script=os.path.join(app_dir, "streamlit_app.py"))
+    proc = subprocess.run([sys.executable, "-c", code], cwd=app_dir, env=app_env(),
+                          capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure streamlit_app.py cold start.")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per measurement (median is shown)")
+    parser.add_argument("--app-dir", default=APP_DIR)
+    parser.add_argument("--top", type=int, default=8, help="slowest imports to list")
+    args = parser.parse_args(argv)
+
+    profiles = [import_profile(args.app_dir) for _ in range(args.repeat)]
+    total = statistics.median(p[0] for p in profiles)
+    print(f"import streamlit_app: {total * 1000:.0f} ms (median of {args.repeat})")
+    for seconds, name in profiles[len(profiles) // 2][1][:args.top]:
+        print(f"  {seconds * 1000:7.0f} ms  {name}")
+
+    renders = [first_render(args.app_dir) for _ in range(args.repeat)]
+    if renders[0]["exceptions"] or not renders[0]["uploader"]:
+        print(f"first render failed: {renders[0]}")
+        return 1
+    print(f"first render: script {statistics.median(r['script'] for r in renders) * 1000:.0f} ms "
+          f"(+{statistics.median(r['harness'] for r in renders) * 1000:.0f} ms importing streamlit's test harness)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""
+page_style's LRU of compiled TableStyles on a 500-page job: lays out every
+page (build_page_table, as PageRenderer does) with the cache bypassed and
+with it, printing the layout signatures, hit rate and time per page, and
+checks that both draw the same PDF.
+
+    python benchmarks/bench_style_cache.py [pages]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reportlab import rl_config  # noqa: E402
+
+import invoice_pdf  # noqa: E402
+from formatting import format_cells  # noqa: E402
+from pagination import group_by_serial, plan_pages  # noqa: E402
+from synthetic import make_invoice_frame  # noqa: E402
+
+
+def lay_out(pages, book):
+    df, header_map, schema, col_widths = book
+    start = time.perf_counter()
+    tables = [invoice_pdf.build_page_table(p, header_map, schema, col_widths) for p in pages]
+    return time.perf_counter() - start, tables
+
+
+def main(n_pages):
+    rl_config.invariant = 1   # byte-comparable output
+    # ~10 rows per page with the default group sizes
+    df = make_invoice_frame(n_pages * 10)
+    schema = invoice_pdf.resolve_column_schema(df.columns)
+    header_map = invoice_pdf.get_robust_header_map(df.columns)
+    cells = format_cells(df, schema)
+    plan = plan_pages(group_by_serial(df, "Del.Challan"), amounts=invoice_pdf.amount_values(df, schema))
+    col_widths = invoice_pdf.plan_table_widths(df, cells, plan, header_map, schema)
+    pages = list(plan.iter_page_groups(df, cells))
+    book = (df, header_map, schema, col_widths)
+
+    cached = invoice_pdf.page_style
+    invoice_pdf.page_style = cached.__wrapped__
+    plain_s, plain_tables = lay_out(pages, book)
+    invoice_pdf.page_style = cached
+
+    cached.cache_clear()
+    cold_s, tables = lay_out(pages, book)
+    cold = cached.cache_info()
+    warm_s, _ = lay_out(pages, book)
+    warm = cached.cache_info()
+    assert invoice_pdf.tables_to_pdf(tables) == invoice_pdf.tables_to_pdf(plain_tables)
+
+    n = len(pages)
+    print(f"{n} pages, {cold.misses} layout signatures")
+    print(f"{'':>16} {'ms/page':>8} {'hit rate':>9}")
+    print(f"{'uncached':>16} {plain_s / n * 1000:>8.2f} {'-':>9}")
+    print(f"{'cached (cold)':>16} {cold_s / n * 1000:>8.2f} {cold.hits / n:>9.0%}")
+    print(f"{'cached (rerun)':>16} {warm_s / n * 1000:>8.2f} {(warm.hits - cold.hits) / n:>9.0%}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,76 @@
+"""
+Style-command counts and render time: per-cell BOX/ALIGN vs table_style.compile_table_style.
+
+    python benchmarks/bench_table_style.py [pages]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reportlab.lib import colors  # noqa: E402
+
+import invoice_pdf  # noqa: E402
+from pagination import group_by_serial, plan_pages  # noqa: E402
+from synthetic import make_invoice_frame  # noqa: E402
+
+
+def legacy_table_style(n_rows, n_cols, header_rows=(), total_rows=(), spacer_rows=(),
+                       column_aligns=None, total_border_cols=None, base_align="LEFT",
+                       weight=0.5, color=colors.black):
+    """The per-row ALIGN / per-cell BOX commands build_table emitted before the compiler."""
+    commands = []
+    for r in range(n_rows):
+        if r in header_rows or r in total_rows or r in spacer_rows:
+            continue
+        for c, align in (column_aligns or {}).items():
+            commands.append(("ALIGN", (c, r), (c, r), align))
+    for r in range(n_rows):
+        for c in range(n_cols):
+            if r in spacer_rows or (r in total_rows and c not in total_border_cols):
+                continue
+            commands.append(("BOX", (c, r), (c, r), weight, color))
+    return commands
+
+
+class CountingTableStyle(invoice_pdf.TableStyle):
+    commands = 0
+
+    def __init__(self, cmds=None, *args, **kwargs):
+        CountingTableStyle.commands += len(cmds or [])
+        super().__init__(cmds, *args, **kwargs)
+
+
+def run(pages, schema, header_map):
+    CountingTableStyle.commands = 0
+    start = time.perf_counter()
+    sizes = [len(invoice_pdf.build_single_page_pdf(p, header_map, schema=schema)) for p in pages]
+    return time.perf_counter() - start, CountingTableStyle.commands, sum(sizes)
+
+
+def main(n_pages):
+    df = make_invoice_frame(n_pages * 15)
+    plan = plan_pages(group_by_serial(df, "Del.Challan"))
+    pages = [plan.page_groups(df, p) for p in range(min(n_pages, plan.num_pages))]
+    schema = invoice_pdf.resolve_column_schema(df.columns)
+    header_map = invoice_pdf.get_robust_header_map(df.columns)
+    invoice_pdf.TableStyle = CountingTableStyle
+    # Count the commands of every page, not just the layouts page_style compiles
+    invoice_pdf.page_style = invoice_pdf.page_style.__wrapped__
+
+    compiled = invoice_pdf.compile_table_style
+    invoice_pdf.compile_table_style = legacy_table_style
+    legacy_s, legacy_cmds, legacy_bytes = run(pages, schema, header_map)
+    invoice_pdf.compile_table_style = compiled
+    new_s, new_cmds, new_bytes = run(pages, schema, header_map)
+
+    n = len(pages)
+    print(f"{n} pages")
+    print(f"{'':>10} {'cmds/page':>10} {'ms/page':>9} {'KB/page':>8}")
+    print(f"{'per-cell':>10} {legacy_cmds / n:>10.0f} {legacy_s / n * 1000:>9.2f} {legacy_bytes / n / 1024:>8.1f}")
+    print(f"{'compiled':>10} {new_cmds / n:>10.0f} {new_s / n * 1000:>9.2f} {new_bytes / n / 1024:>8.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
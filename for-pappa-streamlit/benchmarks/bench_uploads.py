@@ -0,0 +1,80 @@
+"""
+Upload throughput: one-at-a-time (the old page loop) vs UploadPool, through
+the real Cloudinary SDK against the local stand-in server.  A second run
+makes the stand-in fail a share of requests and checks every file still
+lands through retries.
+
+    python benchmarks/bench_uploads.py [files] [latency_s] [workers]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cloudinary  # noqa: E402
+import cloudinary.uploader  # noqa: E402
+
+from cloudinary_standin import StandinServer  # noqa: E402
+from uploads import UploadPool, summarize, upload_with_retry  # noqa: E402
+
+PAYLOAD = b"%PDF-1.4\n" + b"0" * 40_000  # about one rendered page
+
+
+def upload_pdf(file_bytes, public_id):
+    return cloudinary.uploader.upload(file_bytes, resource_type="raw", folder="processed-pdfs",
+                                      public_id=public_id, format="pdf", type="upload")
+
+
+def point_sdk_at(server):
+    cloudinary.config(cloud_name="bench", api_key="key", api_secret="secret", secure=True,
+                      upload_prefix=server.url)
+
+
+def run_serial(n_files):
+    return [upload_with_retry(upload_pdf, PAYLOAD, public_id=f"serial_{i}", key=i) for i in range(n_files)]
+
+
+def run_pool(n_files, workers, tag, retries=3, backoff=0.5):
+    with UploadPool(max_workers=workers, retries=retries, backoff=backoff) as uploads:
+        for i in range(n_files):
+            uploads.submit(i, upload_pdf, PAYLOAD, public_id=f"{tag}_{i}")
+        return uploads.results()
+
+
+def main(n_files, latency, workers):
+    server = StandinServer(latency=latency).start()
+    point_sdk_at(server)
+    try:
+        start = time.perf_counter()
+        serial = run_serial(n_files)
+        serial_s = time.perf_counter() - start
+        start = time.perf_counter()
+        pooled = run_pool(n_files, workers, "pool")
+        pooled_s = time.perf_counter() - start
+        assert all(r.ok for r in serial + pooled)
+        print(f"{n_files} files @ {latency * 1000:.0f}ms: serial {serial_s:.2f}s ({n_files / serial_s:.1f} files/s), "
+              f"{workers} workers {pooled_s:.2f}s ({n_files / pooled_s:.1f} files/s, {serial_s / pooled_s:.1f}x), "
+              f"max in flight {server.max_in_flight}")
+    finally:
+        server.stop()
+
+    # Every file fails twice before succeeding, plus 10% random failures
+    server = StandinServer(latency=latency, fail_rate=0.1, fail_first=2).start()
+    point_sdk_at(server)
+    try:
+        start = time.perf_counter()
+        flaky = run_pool(n_files, workers, "flaky", retries=5, backoff=0.05)
+        elapsed = time.perf_counter() - start
+        stats = summarize(flaky)
+        assert stats["failed"] == 0 and len(server.stored) == n_files
+        print(f"flaky server: {elapsed:.2f}s, {stats['retried']}/{stats['files']} retried, "
+              f"{stats['failed']} failed, {server.failures} 500s served, {len(server.stored)} stored")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100,
+         float(sys.argv[2]) if len(sys.argv) > 2 else 0.1,
+         int(sys.argv[3]) if len(sys.argv) > 3 else 8)
@@ -0,0 +1,84 @@
+"""
+Groups per second of the per-group XLSX export: the old path (a
+pd.ExcelWriter(engine="openpyxl") workbook per group) vs xlsx_export's
+streaming writers, a file per group and one workbook with a sheet per
+group, on XlsxExporter's own thread and on a process pool. Peak is the
+largest Python allocation while exporting (tracemalloc, exporter thread
+only).
+
+    python benchmarks/bench_xlsx_export.py [rows ...] [--workers 4]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+import xlsx_export  # noqa: E402
+from pagination import group_by_serial  # noqa: E402
+from synthetic import make_invoice_frame  # noqa: E402
+
+
+def legacy_export(df, groups):
+    """What upload_xlsx_to_cloudinary wrote for each group before xlsx_export."""
+    for g in range(len(groups)):
+        output = io.BytesIO()
+        with pd.ExcelWriter(output, engine="openpyxl") as writer:
+            df.iloc[groups.rows_of(g)].to_excel(writer, index=False, sheet_name="Sheet1")
+        yield output.getvalue()
+
+
+def export(df, groups, mode, engine, pool=None):
+    xlsx_export.writer_engine = lambda: engine
+    return (data for _, data, _ in xlsx_export.XlsxExporter(df, groups, mode, pool=pool).results())
+
+
+def measure(files, memory: bool = False):
+    """Seconds, total bytes and (with memory) peak allocation of draining files."""
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    size = sum(len(data) for data in files)
+    seconds = time.perf_counter() - start
+    peak = None
+    if memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return seconds, size, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("rows", type=int, nargs="*", default=[2_000, 20_000])
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    engines = ["openpyxl"] + (["xlsxwriter"] if xlsx_export.writer_engine() == "xlsxwriter" else [])
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        print(f"{'rows':>7} {'groups':>7} {'export':>30} {'groups/s':>9} {'x':>6} {'MB':>6} {'peak MB':>8}")
+        for n_rows in args.rows:
+            df = make_invoice_frame(n_rows)
+            groups = group_by_serial(df, "Del.Challan")
+            runs = [("pd.ExcelWriter per group", lambda: legacy_export(df, groups), True)]
+            for engine in engines:
+                for mode in xlsx_export.XLSX_MODES:
+                    runs.append((f"{engine} {mode}", lambda e=engine, m=mode: export(df, groups, m, e), True))
+                runs.append((f"{engine} per_group, {args.workers} procs",
+                             lambda e=engine: export(df, groups, xlsx_export.PER_GROUP, e, pool), False))
+            baseline = None
+            for label, files, memory in runs:
+                seconds, size, peak = measure(files(), memory)
+                baseline = baseline or seconds
+                peak_mb = f"{peak / 1e6:>8.1f}" if peak is not None else f"{'-':>8}"
+                print(f"{n_rows:>7} {len(groups):>7} {label:>30} {len(groups) / seconds:>9.0f} "
+                      f"{baseline / seconds:>6.1f} {size / 1e6:>6.1f} {peak_mb}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+Visual regression check for the direct-canvas page renderer and the shared
+page furniture forms: renders the same pages with platypus Tables drawn
+plainly (the reference) and as combined documents of both backends
+(invoice_pdf.BACKENDS, furniture as form XObjects), rasterizes every page
+with PyMuPDF and compares them pixel by pixel in grayscale.
+
+The PDFs are not byte-identical (touching line segments are merged into
+one path, which anti-aliases a little differently), so pixels alone only
+catch gross breakage: a missing cell border moves a few hundred pixels by
+less than the anti-aliasing noise allows. Every page is therefore checked
+twice:
+
+- its drawing, extracted with PyMuPDF, must equal the reference's: the same
+  stroked line segments (collinear pieces that touch merged into one, so a
+  GRID drawn as one path per line matches one drawn per cell), the same
+  non-white fills and the same words at the same positions;
+- its pixels must be close: no pixel differs by more than --max-diff and at
+  most --max-changed of them differ by more than a quarter of that.
+
+Exits 1 if any page fails; --save-diffs writes the failing pages side by
+side. tests/test_canvas_backend.py runs the same comparison on a smaller
+workbook.
+
+    pip install -r requirements-dev.txt
+    python benchmarks/check_canvas_backend.py [--rows 2000] [--dpi 100]
+"""
+import argparse
+import importlib.util
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+import invoice_pdf  # noqa: E402
+from formatting import format_cells  # noqa: E402
+from pagination import group_by_serial, plan_pages  # noqa: E402
+from synthetic import make_invoice_frame  # noqa: E402
+
+MAX_DIFF = 128          # largest allowed gray level difference
+MAX_CHANGED = 0.005     # fraction of a page's pixels allowed to differ by more than MAX_DIFF / 4
+PRECISION = 2           # decimals of a point that drawings are compared to
+WHITE = (1.0, 1.0, 1.0)
+
+
+def rasterize(pdf_bytes: bytes, dpi: int) -> list:
+    """Every page as a grayscale uint8 array."""
+    import pymupdf
+    pages = []
+    with pymupdf.open(stream=pdf_bytes, filetype="pdf") as doc:
+        for page in doc:
+            pixmap = page.get_pixmap(dpi=dpi, colorspace=pymupdf.csGRAY)
+            pages.append(np.frombuffer(pixmap.samples, np.uint8).reshape(pixmap.height, pixmap.width))
+    return pages
+
+
+def page_drawings(pdf_bytes: bytes) -> list:
+    """
+    Every page's drawing as (lines, fills, words): sorted stroked segments
+    (width, color, x0, y0, x1, y1) with touching collinear pieces merged,
+    sorted non-white fills (color, x0, y0, x1, y1), and words (x0, y0, text).
+    White fills are left out: platypus paints them under every cell, the
+    canvas backend leaves the page white. So are fully transparent strokes,
+    which platypus draws for borders styled away with colors.transparent.
+    """
+    import pymupdf
+    pages = []
+    with pymupdf.open(stream=pdf_bytes, filetype="pdf") as doc:
+        for page in doc:
+            strokes, fills = [], []
+            for path in page.get_drawings():
+                for item in path["items"]:
+                    if item[0] == "l":
+                        edges = [(item[1], item[2])]
+                    elif item[0] == "re":
+                        r = item[1]
+                        edges = [(r.tl, r.tr), (r.tr, r.br), (r.br, r.bl), (r.bl, r.tl)]
+                        if "f" in path["type"] and path["fill"] != WHITE and path.get("fill_opacity"):
+                            fills.append((path["fill"],) + tuple(round(v, PRECISION) for v in r))
+                    else:
+                        edges = []
+                    if "s" in path["type"] and path.get("stroke_opacity"):
+                        strokes += [(path["width"], path["color"], a.x, a.y, b.x, b.y) for a, b in edges]
+            words = sorted((round(w[0], PRECISION), round(w[1], PRECISION), w[4]) for w in page.get_text("words"))
+            pages.append((merge_segments(strokes), sorted(fills), words))
+    return pages
+
+
+def merge_segments(segments) -> list:
+    """Horizontal and vertical segments with the same width and color merged where they touch or overlap."""
+    runs, others = {}, []
+    for width, color, x0, y0, x1, y1 in segments:
+        x0, y0, x1, y1 = (round(v, PRECISION) for v in (x0, y0, x1, y1))
+        if y0 == y1:
+            runs.setdefault((width, color, "h", y0), []).append(sorted((x0, x1)))
+        elif x0 == x1:
+            runs.setdefault((width, color, "v", x0), []).append(sorted((y0, y1)))
+        else:
+            others.append((width, color) + min((x0, y0, x1, y1), (x1, y1, x0, y0)))
+    merged = []
+    for (width, color, axis, at), spans in runs.items():
+        spans.sort()
+        start, stop = spans[0]
+        for span_start, span_stop in spans[1:] + [(float("inf"), None)]:
+            if span_start > stop:
+                merged.append((width, color) + ((start, at, stop, at) if axis == "h" else (at, start, at, stop)))
+                start, stop = span_start, span_stop
+            else:
+                stop = max(stop, span_stop)
+    return sorted(merged + others)
+
+
+def drawing_differences(expected, actual) -> list:
+    """What differs between two pages' page_drawings(): a list of short descriptions, empty if nothing."""
+    differences = []
+    for kind, want, got in zip(("line", "fill", "word"), expected, actual):
+        missing, extra = set(want) - set(got), set(got) - set(want)
+        if missing or extra:
+            sample = sorted(missing or extra)[0]
+            differences.append(f"{len(missing)} {kind}(s) missing, {len(extra)} extra, e.g. {sample}")
+    return differences
+
+
+def render_all(n_rows: int, seed: int) -> dict:
+    df = make_invoice_frame(n_rows, seed=seed)
+    schema = invoice_pdf.resolve_column_schema(df.columns)
+    header_map = invoice_pdf.get_robust_header_map(df.columns)
+    cells = format_cells(df, schema)
+    plan = plan_pages(group_by_serial(df, "Del.Challan"), amounts=invoice_pdf.amount_values(df, schema))
+    col_widths = invoice_pdf.plan_table_widths(df, cells, plan, header_map, schema)
+    pages = list(plan.iter_page_groups(df, cells))
+    pdfs = {"plain": invoice_pdf.tables_to_pdf(invoice_pdf.build_page_table(p, header_map, schema, col_widths)
+                                               for p in pages)}
+    for backend in invoice_pdf.BACKENDS:
+        pdfs[backend] = invoice_pdf.build_multi_page_pdf(pages, header_map, schema, col_widths, backend)
+    return pdfs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dpi", type=int, default=100)
+    parser.add_argument("--max-diff", type=int, default=MAX_DIFF, help="largest allowed gray level difference")
+    parser.add_argument("--max-changed", type=float, default=MAX_CHANGED, help="fraction of pixels allowed to differ")
+    parser.add_argument("--save-diffs", metavar="DIR")
+    args = parser.parse_args()
+
+    if importlib.util.find_spec("pymupdf") is None:
+        sys.exit("PyMuPDF is needed to rasterize pages: pip install -r requirements-dev.txt")
+
+    pdfs = render_all(args.rows, args.seed)
+    plain = pdfs.pop("plain")
+    reference, reference_drawings = rasterize(plain, args.dpi), page_drawings(plain)
+    ok = True
+    for backend, pdf in pdfs.items():
+        ok &= compare_drawings(reference_drawings, page_drawings(pdf), backend)
+        ok &= compare(reference, rasterize(pdf, args.dpi), backend, len(pdf), args)
+    if not ok:
+        sys.exit(1)
+    print("OK")
+
+
+def page_difference(a, b, max_diff: int = MAX_DIFF):
+    """(largest gray level difference, fraction of pixels differing by more than max_diff / 4) of two pages."""
+    diff = np.abs(a.astype(np.int16) - b.astype(np.int16))
+    return int(diff.max()), float((diff > max_diff // 4).mean())
+
+
+def compare_drawings(reference, candidate, backend: str) -> bool:
+    """Print the pages whose lines, fills or words differ from the reference's; False if any do."""
+    failed = 0
+    for page_idx, (expected, actual) in enumerate(zip(reference, candidate)):
+        differences = drawing_differences(expected, actual)
+        if differences:
+            failed += 1
+            if failed <= 5:
+                print(f"{backend}: page {page_idx + 1}: {'; '.join(differences)}")
+    if failed:
+        print(f"{backend}: the drawing of {failed} page(s) differs")
+    return not failed
+
+
+def compare(reference, candidate, backend: str, size: int, args) -> bool:
+    """Print how far candidate's pages are from the reference's; False if any page fails."""
+    if len(reference) != len(candidate):
+        print(f"{backend}: page count differs: {len(reference)} vs {len(candidate)}")
+        return False
+
+    failed = []
+    worst_diff = worst_changed = 0
+    for page_idx, (a, b) in enumerate(zip(reference, candidate)):
+        if a.shape != b.shape:
+            failed.append(page_idx)
+            continue
+        largest, changed = page_difference(a, b, args.max_diff)
+        worst_diff, worst_changed = max(worst_diff, largest), max(worst_changed, changed)
+        if largest > args.max_diff or changed > args.max_changed:
+            failed.append(page_idx)
+            if args.save_diffs:
+                import pymupdf
+                os.makedirs(args.save_diffs, exist_ok=True)
+                diff = np.abs(a.astype(np.int16) - b.astype(np.int16)).astype(np.uint8)
+                side_by_side = np.ascontiguousarray(np.hstack([a, b, 255 - diff]))
+                pymupdf.Pixmap(pymupdf.csGRAY, side_by_side.shape[1], side_by_side.shape[0],
+                               side_by_side.tobytes(), False).save(
+                    os.path.join(args.save_diffs, f"{backend}_page_{page_idx + 1}.png"))
+
+    print(f"{backend}: {len(candidate)} pages at {args.dpi} dpi ({size / 1024:.0f} KB): largest pixel difference "
+          f"{worst_diff}, at most {worst_changed:.3%} of a page's pixels changed")
+    if failed:
+        print(f"{backend}: {len(failed)} page(s) differ: {', '.join(str(p + 1) for p in failed[:20])}")
+    return not failed
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Local stand-in for the Cloudinary upload endpoint.
+
+Accepts POST /v1_1/<cloud>/<resource_type>/upload with the SDK's multipart
+body and answers like Cloudinary does, with configurable latency and failure
+rate, so upload throughput and retry handling can be exercised offline.
+Point the SDK at it with cloudinary.config(upload_prefix=server.url), or set
+CLOUDINARY_UPLOAD_PREFIX for the app.
+
+    python benchmarks/cloudinary_standin.py --port 8765 --latency 0.05 --fail-rate 0.1
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_UPLOAD_PATH = re.compile(r"^/v1_1/(?P<cloud>[^/]+)/(?P<resource_type>[^/]+)/upload$")
+
+
+def _form_field(body: bytes, name: str) -> str:
+    match = re.search(rb'name="' + name.encode() + rb'"\r\n\r\n(.*?)\r\n', body, re.S)
+    return match.group(1).decode() if match else ""
+
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=0.0, fail_rate=0.0, fail_first=0, seed=0):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.fail_first = fail_first      # every public_id fails this many times before succeeding
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.attempts = {}                # public_id -> attempts seen
+        self.stored = {}                  # public_id -> bytes in the request body
+        self.failures = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        server = self.server
+        match = _UPLOAD_PATH.match(self.path)
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if not match:
+            return self._reply(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+        folder = _form_field(body, "folder")
+        public_id = "/".join(p for p in (folder, _form_field(body, "public_id")) if p)
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            attempt = server.attempts.get(public_id, 0) + 1
+            server.attempts[public_id] = attempt
+            fail = attempt <= server.fail_first or server.random.random() < server.fail_rate
+        try:
+            if server.latency:
+                time.sleep(server.latency)
+            if fail:
+                with server.lock:
+                    server.failures += 1
+                return self._reply(500, {"error": {"message": "General Error (stand-in)"}})
+            with server.lock:
+                server.stored[public_id] = len(body)
+            fmt = _form_field(body, "format")
+            resource_type = match.group("resource_type")
+            return self._reply(200, {
+                "public_id": public_id,
+                "resource_type": resource_type,
+                "format": fmt,
+                "bytes": len(body),
+                "secure_url": f"{server.url}/{match.group('cloud')}/{resource_type}/upload/{public_id}.{fmt}",
+            })
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per request")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of requests answered with 500")
+    parser.add_argument("--fail-first", type=int, default=0, help="failures per public_id before success")
+    args = parser.parse_args()
+    server = StandinServer(args.port, args.latency, args.fail_rate, args.fail_first)
+    print(f"Cloudinary stand-in on {server.url} (CLOUDINARY_UPLOAD_PREFIX={server.url})")
+    server.serve_forever()
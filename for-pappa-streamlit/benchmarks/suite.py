@@ -0,0 +1,226 @@
+"""
+End-to-end benchmark suite for the invoice PDF generator.
+
+For each synthetic workbook (row count x group size distribution x Part Name
+length) every stage is timed (best of --repeat runs), then run once more
+under tracemalloc for its peak Python allocation:
+
+    ingest        read_header + read_invoice of the .xlsx
+    grouping      group_by_serial
+    pagination    plan_pages (with amounts, so split groups carry subtotals)
+    single_page   build_single_page_pdf over the first --pages pages
+    multi_page    build_multi_page_pdf over the same pages
+    annexure      build_annexure_pdf of the whole frame
+    dataframe     dataframe_to_pdf_buffer of the first --frame-rows rows
+    zip           stored ZIP of the page PDFs, spooled (artifacts.py)
+
+    python benchmarks/suite.py --rows 1000 10000 --distribution geometric zipf -o results.json
+    python benchmarks/suite.py --rows 1000 10000 --compare results.json [--tolerance 0.25]
+
+Generated workbooks are cached in --cache-dir (writing a 500k-row workbook
+takes minutes). --compare exits 1 if any stage got slower or allocated more
+than the tolerance allows over the baseline file.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+import reportlab  # noqa: E402
+
+import invoice_pdf  # noqa: E402
+from artifacts import SpooledArtifacts, spooled_zip  # noqa: E402
+from formatting import format_cells  # noqa: E402
+from ingest import find_column, read_header, read_invoice  # noqa: E402
+from pagination import group_by_serial, plan_pages  # noqa: E402
+from synthetic import GROUP_SIZE_DISTRIBUTIONS, write_workbook  # noqa: E402
+
+SERIAL_COLUMN = "Del.Challan"
+
+# Differences below these are noise, whatever the ratio
+MIN_SECONDS_DELTA = 0.05
+MIN_BYTES_DELTA = 1024 * 1024
+
+
+def measure(fn, repeat: int = 1, memory: bool = True) -> dict:
+    """Best time of repeat fn() calls, then one more call under tracemalloc for its peak allocation."""
+    seconds = float("inf")
+    for _ in range(max(repeat, 1)):
+        start = time.perf_counter()
+        result = fn()
+        seconds = min(seconds, time.perf_counter() - start)
+    peak = None
+    if memory:
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {"seconds": seconds, "peak_bytes": peak, "result": result}
+
+
+def workbook_path(cache_dir: str, rows: int, distribution: str, name_words: int, seed: int) -> str:
+    path = os.path.join(cache_dir, f"invoice_{rows}_{distribution}_{name_words}w_{seed}.xlsx")
+    if not os.path.exists(path):
+        write_workbook(path + ".tmp.xlsx", rows, distribution=distribution, name_words=name_words, seed=seed)
+        os.replace(path + ".tmp.xlsx", path)
+    return path
+
+
+def run_case(path: str, n_pages: int, frame_rows: int, repeat: int = 1, memory: bool = True) -> dict:
+    """All stages for one workbook; returns {stage: {"seconds", "peak_bytes", "items"}}."""
+    raw = open(path, "rb").read()
+    stages = {}
+
+    def record(stage, fn, items=None):
+        m = measure(fn, repeat, memory)
+        stages[stage] = {"seconds": m["seconds"], "peak_bytes": m["peak_bytes"],
+                         "items": items(m["result"]) if items else None}
+        return m["result"]
+
+    def ingest():
+        source = io.BytesIO(raw)
+        columns = read_header(source)
+        return read_invoice(source, serial_column=find_column(columns, SERIAL_COLUMN))
+
+    df = record("ingest", ingest, len)
+    schema = invoice_pdf.resolve_column_schema(df.columns)
+    header_map = invoice_pdf.get_robust_header_map(df.columns)
+    amounts = invoice_pdf.amount_values(df, schema)
+
+    groups = record("grouping", lambda: group_by_serial(df, SERIAL_COLUMN), len)
+    plan = record("pagination", lambda: plan_pages(groups, amounts=amounts), lambda p: p.num_pages)
+
+    # Pages are laid out the way PageRenderer does: cells and widths planned once
+    cells = format_cells(df, schema)
+    col_widths = invoice_pdf.plan_table_widths(df, cells, plan, header_map, schema, amounts)
+    pages = [plan.page_groups(df, p, cells) for p in range(min(n_pages, plan.num_pages))]
+
+    page_pdfs = record("single_page", lambda: [invoice_pdf.build_single_page_pdf(p, header_map, schema, col_widths)
+                                               for p in pages], len)
+    record("multi_page", lambda: invoice_pdf.build_multi_page_pdf(pages, header_map, schema, col_widths),
+           lambda _: len(pages))
+    record("annexure", lambda: invoice_pdf.build_annexure_pdf(df, header_map, schema), lambda _: len(df))
+    frame = df.head(frame_rows)
+    record("dataframe", lambda: invoice_pdf.dataframe_to_pdf_buffer(frame, header_map, schema),
+           lambda _: len(frame))
+
+    def assemble_zip():
+        store = SpooledArtifacts()
+        names = [f"page_{i + 1}.pdf" for i in range(len(page_pdfs))]
+        for name, pdf_bytes in zip(names, page_pdfs):
+            store.add(name, pdf_bytes)
+        archive = spooled_zip(store, [(name, name) for name in names])
+        size = archive.seek(0, os.SEEK_END)
+        archive.close()
+        store.close()
+        return size
+
+    record("zip", assemble_zip, lambda size: len(page_pdfs))
+    return stages
+
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "pandas": pd.__version__,
+        "reportlab": reportlab.Version,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """(case, stage, metric, baseline, current) for every stage worse than baseline * (1 + tolerance)."""
+    regressions = []
+    for case, stages in results["cases"].items():
+        for stage, current in stages.items():
+            base = baseline.get("cases", {}).get(case, {}).get(stage)
+            if base is None:
+                continue
+            for metric, min_delta in (("seconds", MIN_SECONDS_DELTA), ("peak_bytes", MIN_BYTES_DELTA)):
+                old, new = base.get(metric), current.get(metric)
+                if old is None or new is None:
+                    continue
+                if new > old * (1 + tolerance) and new - old > min_delta:
+                    regressions.append((case, stage, metric, old, new))
+    return regressions
+
+
+def print_table(results: dict, baseline: dict = None):
+    print(f"{'case':<34} {'stage':<12} {'items':>7} {'seconds':>9} {'peak MB':>8}" + ("   vs baseline" if baseline else ""))
+    for case, stages in results["cases"].items():
+        for stage, m in stages.items():
+            peak = f"{m['peak_bytes'] / 1e6:8.1f}" if m["peak_bytes"] is not None else f"{'-':>8}"
+            line = f"{case:<34} {stage:<12} {m['items'] if m['items'] is not None else '':>7} {m['seconds']:9.3f} {peak}"
+            base = (baseline or {}).get("cases", {}).get(case, {}).get(stage)
+            if base:
+                line += f"   time {m['seconds'] / max(base['seconds'], 1e-9):5.2f}x"
+                if m["peak_bytes"] is not None and base.get("peak_bytes"):
+                    line += f", mem {m['peak_bytes'] / base['peak_bytes']:5.2f}x"
+            print(line)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the invoice PDF pipeline stage by stage.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000],
+                        help="workbook sizes (1k-500k rows)")
+    parser.add_argument("--distribution", nargs="+", default=["geometric"], choices=GROUP_SIZE_DISTRIBUTIONS,
+                        help="group size distributions")
+    parser.add_argument("--name-words", type=int, nargs="+", default=[2], help="Part Name lengths in words")
+    parser.add_argument("--pages", type=int, default=100, help="pages rendered by the page stages")
+    parser.add_argument("--frame-rows", type=int, default=2_000, help="rows given to dataframe_to_pdf_buffer")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage (best is kept)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--cache-dir", default=os.path.join(tempfile.gettempdir(), "invoice-bench"))
+    parser.add_argument("-o", "--output", help="write results JSON here")
+    parser.add_argument("--compare", help="baseline results JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown/growth (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.cache_dir, exist_ok=True)
+    results = {
+        "environment": environment(),
+        "settings": {"pages": args.pages, "frame_rows": args.frame_rows, "repeat": args.repeat, "seed": args.seed},
+        "cases": {},
+    }
+    for rows in args.rows:
+        for distribution in args.distribution:
+            for name_words in args.name_words:
+                case = f"rows={rows} {distribution} words={name_words}"
+                print(f"{case} ...", file=sys.stderr, flush=True)
+                path = workbook_path(args.cache_dir, rows, distribution, name_words, args.seed)
+                results["cases"][case] = run_case(path, args.pages, args.frame_rows, args.repeat,
+                                                  memory=not args.no_memory)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_table(results, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        for case, stage, metric, old, new in regressions:
+            print(f"REGRESSION {case} / {stage}: {metric} {old:.4g} -> {new:.4g} "
+                  f"(+{(new / old - 1) * 100:.0f}%)")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.tolerance:.0%}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""Synthetic invoice workbooks with the same header set as the real uploads."""
+import numpy as np
+import pandas as pd
+
+INVOICE_COLUMNS = [
+    "Del.Challan", "P.O #", "PO Line", "In-Bound #", "GR No.", "Part No.",
+    "Part Name", "Quantity", "Rate (PKR)", "Amount (PKR)", "Plant", "Rec. Date",
+]
+
+PART_WORDS = ["BRACKET", "HOUSING", "GASKET", "BOLT", "WASHER", "PANEL", "CLIP", "BUSH", "HINGE", "COVER"]
+
+GROUP_SIZE_DISTRIBUTIONS = ("geometric", "fixed", "uniform", "zipf", "single")
+
+
+def group_sizes(rng, n_rows: int, mean_group_size: float = 4.0, distribution: str = "geometric") -> np.ndarray:
+    """
+    Rows per Del.Challan, summing to n_rows:
+    geometric around mean_group_size (the default), fixed at it, uniform on
+    1..2*mean-1, zipf (mostly small groups, a few far taller than a page) or
+    one single group.
+    """
+    mean = max(mean_group_size, 1.0)
+    if distribution == "single":
+        return np.array([n_rows])
+    if distribution == "geometric":
+        sizes = rng.geometric(1.0 / mean, size=n_rows)
+    elif distribution == "fixed":
+        sizes = np.full(n_rows, int(round(mean)))
+    elif distribution == "uniform":
+        sizes = rng.integers(1, max(2, int(round(2 * mean))), size=n_rows)
+    elif distribution == "zipf":
+        sizes = np.minimum(rng.zipf(1.8, size=n_rows), n_rows)
+    else:
+        raise ValueError(f"unknown group size distribution {distribution!r}; use one of {GROUP_SIZE_DISTRIBUTIONS}")
+    sizes = sizes[np.cumsum(sizes) <= n_rows]
+    if sizes.sum() < n_rows:
+        sizes = np.append(sizes, n_rows - sizes.sum())
+    return sizes
+
+
+def make_invoice_frame(n_rows: int, mean_group_size: float = 4.0, seed: int = 0,
+                       distribution: str = "geometric", name_words: int = 2) -> pd.DataFrame:
+    """
+    Build a DataFrame shaped like a monthly supplier export.
+    Group sizes (rows per Del.Challan) follow distribution (see group_sizes);
+    Part Name has name_words words plus a number, so longer names exercise
+    the truncation rules.
+    """
+    rng = np.random.default_rng(seed)
+
+    sizes = group_sizes(rng, n_rows, mean_group_size, distribution)
+    n_groups = len(sizes)
+
+    challans = 100000 + np.arange(n_groups)
+    challan_col = np.repeat(challans, sizes)
+    po_col = np.repeat(4500000000 + rng.integers(0, 5000, n_groups), sizes)
+    inbound_col = np.repeat(180000000 + rng.integers(0, 10**6, n_groups), sizes)
+    gr_col = np.repeat(5000000000 + rng.integers(0, 10**6, n_groups), sizes)
+    plant_col = np.repeat(rng.choice(["P100", "P200", "P300"], n_groups), sizes)
+    dates = pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 365, n_groups), unit="D")
+    date_col = np.repeat(dates.values, sizes)
+
+    words = np.array(PART_WORDS)
+    part_names = pd.Series(words[rng.integers(0, len(words), n_rows)])
+    for _ in range(name_words - 1):
+        part_names = part_names + " " + pd.Series(words[rng.integers(0, len(words), n_rows)])
+    part_names = part_names + " " + pd.Series(rng.integers(1, 999, n_rows)).astype(str)
+    qty = rng.integers(1, 500, n_rows)
+    rate = np.round(rng.uniform(5, 2500, n_rows), 2)
+
+    return pd.DataFrame({
+        "Del.Challan": challan_col,
+        "P.O #": po_col,
+        "PO Line": rng.integers(1, 60, n_rows) * 10,
+        "In-Bound #": inbound_col,
+        "GR No.": gr_col,
+        "Part No.": ["PN-" + str(v) for v in rng.integers(10000, 99999, n_rows)],
+        "Part Name": part_names.values,
+        "Quantity": qty,
+        "Rate (PKR)": rate,
+        "Amount (PKR)": np.round(qty * rate, 2),
+        "Plant": plant_col,
+        "Rec. Date": date_col,
+    }, columns=INVOICE_COLUMNS)
+
+
+def write_workbook(path, n_rows: int, **kwargs) -> str:
+    """Write a synthetic workbook to path and return the path."""
+    make_invoice_frame(n_rows, **kwargs).to_excel(path, index=False)
+    return path
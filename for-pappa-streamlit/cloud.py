@@ -0,0 +1,61 @@
+"""
+Cloudinary configuration and upload helpers (no Streamlit import).
+
+Credentials come from CLOUDINARY_CLOUD_NAME / CLOUDINARY_API_KEY /
+CLOUDINARY_API_SECRET (a .env file is loaded if present); the Streamlit app
+passes st.secrets as a fallback. CLOUDINARY_UPLOAD_PREFIX points the SDK at
+another endpoint, e.g. the local stand-in in benchmarks/.
+"""
+import io
+import os
+
+import cloudinary
+import cloudinary.uploader
+from dotenv import load_dotenv
+
+# Load .env if present
+load_dotenv()
+
+
+def configure_cloudinary(fallback=None) -> bool:
+    """
+    Configure the SDK from the environment. fallback() is only called when a
+    variable is missing and returns a mapping with CLOUD_NAME / API_KEY / API_SECRET.
+    """
+    def setting(name):
+        value = os.getenv(f"CLOUDINARY_{name}")
+        if not value and fallback is not None:
+            value = fallback()[name]
+        if not value:
+            raise RuntimeError(f"Cloudinary is not configured: set CLOUDINARY_{name}")
+        return value
+
+    cloud_name, api_key, api_secret = setting("CLOUD_NAME"), setting("API_KEY"), setting("API_SECRET")
+    cloudinary.config(cloud_name=cloud_name, api_key=api_key, api_secret=api_secret, secure=True)
+    # Optional endpoint override, e.g. a local stand-in server for load tests
+    upload_prefix = os.getenv("CLOUDINARY_UPLOAD_PREFIX")
+    if upload_prefix:
+        cloudinary.config(upload_prefix=upload_prefix)
+    return True
+
+
+def account() -> str:
+    """The configured cloud name (and endpoint override), for keeping track of what was uploaded where."""
+    upload_prefix = cloudinary.config().upload_prefix
+    return cloudinary.config().cloud_name + (f"@{upload_prefix}" if upload_prefix else "")
+
+
+def upload_raw_to_cloudinary(file_bytes: bytes, public_id: str, folder: str = "processed-pdfs"):
+    return cloudinary.uploader.upload(
+        io.BytesIO(file_bytes),
+        resource_type="raw", folder=folder, public_id=public_id,
+        format="pdf", type="upload",
+    )
+
+
+def upload_xlsx_to_cloudinary(file_bytes: bytes, public_id: str, folder: str = "processed-xlsx"):
+    """Upload a workbook written by xlsx_export."""
+    return cloudinary.uploader.upload(
+        io.BytesIO(file_bytes), resource_type="raw", folder=folder,
+        public_id=public_id, format="xlsx", type="upload",
+    )
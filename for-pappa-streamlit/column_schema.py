@@ -0,0 +1,85 @@
+"""
+Column roles for an uploaded invoice sheet, resolved once per header set.
+
+The PDF builders used to re-scan df.columns with substring tests on every
+page (and build_table on every row). resolve_column_schema() does those
+tests once and is memoized by the header tuple, so every page of an upload
+shares the same ColumnSchema.
+"""
+from dataclasses import dataclass
+from functools import lru_cache
+
+# Columns blanked on total rows when present under these exact names
+TOTAL_ROW_BLANK_COLUMNS = ("Delivery Challan", "P.O #", "PO Line", "Plant", "Receiving Date")
+
+
+@dataclass(frozen=True)
+class ColumnSchema:
+    """Column indices (or None) for each role the builders care about."""
+    columns: tuple
+    amount_pkr: int = None
+    rate_pkr: int = None
+    part_name: int = None
+    challan: int = None
+    rec_date: int = None
+    quantity: int = None
+    inbound: int = None              # exact "In-Bound #" column (total row label)
+    total_blank: tuple = ()          # indices blanked on total rows
+    date_like: tuple = ()            # per column: formatted as a date when the value is a datetime
+    annexure: tuple = ()             # (role, column name) pairs used by build_annexure_pdf
+
+    @property
+    def annexure_columns(self) -> dict:
+        return dict(self.annexure)
+
+
+def _first_index(cleaned, test):
+    for i, col_clean in enumerate(cleaned):
+        if test(col_clean):
+            return i
+    return None
+
+
+def _annexure_mapping(columns):
+    """Role → column for the annexure; later matches win, like the original scan."""
+    col_mapping = {}
+    for col in columns:
+        col_clean = str(col).lower().strip()
+        if "challan" in col_clean or "del" in col_clean:
+            col_mapping['challan'] = col
+        elif "p.o" in col_clean or ("po" in col_clean and "#" in str(col)):
+            col_mapping['po'] = col
+        elif "in-bound" in col_clean or "inbound" in col_clean or "in bound" in col_clean:
+            col_mapping['inbound'] = col
+        elif "gr" in col_clean and ("no" in col_clean or "number" in col_clean):
+            col_mapping['gr'] = col
+        elif "plant" in col_clean:
+            col_mapping['plant'] = col
+        elif "date" in col_clean:
+            col_mapping['date'] = col
+        elif "amount" in col_clean and "pkr" in col_clean:
+            col_mapping['amount'] = col
+    return tuple(col_mapping.items())
+
+
+@lru_cache(maxsize=64)
+def _resolve(columns: tuple) -> ColumnSchema:
+    cleaned = [str(col).lower().strip() for col in columns]
+    return ColumnSchema(
+        columns=columns,
+        amount_pkr=_first_index(cleaned, lambda c: "amount" in c and "pkr" in c),
+        rate_pkr=_first_index(cleaned, lambda c: "rate" in c and "pkr" in c),
+        part_name=_first_index(cleaned, lambda c: "part" in c and "name" in c),
+        challan=_first_index(cleaned, lambda c: "challan" in c),
+        rec_date=_first_index(cleaned, lambda c: "rec" in c and "date" in c),
+        quantity=_first_index(cleaned, lambda c: "quantity" in c or "qty" in c),
+        inbound=columns.index("In-Bound #") if "In-Bound #" in columns else None,
+        total_blank=tuple(columns.index(name) for name in TOTAL_ROW_BLANK_COLUMNS if name in columns),
+        date_like=tuple("date" in c or "rec" in c for c in cleaned),
+        annexure=_annexure_mapping(columns),
+    )
+
+
+def resolve_column_schema(columns) -> ColumnSchema:
+    """Resolve (or fetch the cached) ColumnSchema for a sequence of column names."""
+    return _resolve(tuple(columns))
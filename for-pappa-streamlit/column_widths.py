@@ -0,0 +1,88 @@
+"""
+Fixed column widths for the grouped invoice tables, planned once per upload.
+
+With colWidths=None ReportLab sizes every column of every page itself,
+calling stringWidth on each cell. plan_column_widths() measures an upload's
+display strings in one pass instead: every distinct string of a column is
+mapped to cached per-character Helvetica-Bold widths, summed with one
+reduceat, and the column takes the maximum. The arithmetic is the one
+stringWidth and Table use (integer font units x 0.001 x size, plus the cell
+padding), so each page's cells fit exactly as they would have auto-sized,
+and every page of an upload gets the same columns.
+"""
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+FONT_NAME = "Helvetica-Bold"
+BODY_FONT_SIZE = 10      # data and total rows
+HEADER_FONT_SIZE = 9
+CELL_PADDING = 6 + 6     # Table's default LEFTPADDING + RIGHTPADDING
+PART_NAME_WIDTH = 80     # fixed; Part Name text is truncated to fit (formatting.py)
+
+
+@lru_cache(maxsize=None)
+def char_units(font_name: str = FONT_NAME) -> np.ndarray:
+    """Width of each Latin-1 character in font units (1/1000 of the font size)."""
+    return np.array([round(stringWidth(chr(i), font_name, 1000)) for i in range(256)], dtype=np.int64)
+
+
+@lru_cache(maxsize=4096)
+def _wide_char_units(char: str, font_name: str) -> int:
+    return round(stringWidth(char, font_name, 1000))
+
+
+def text_units(texts, font_name: str = FONT_NAME) -> np.ndarray:
+    """
+    Width of each string in font units: stringWidth(text, font_name, size)
+    equals units * 0.001 * size. Multi-line text measures its longest line.
+    """
+    texts = [str(t) for t in texts]
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+    sums = np.zeros(len(texts), dtype=np.int64)
+    if not lengths.any():
+        return sums
+
+    points = np.frombuffer("".join(texts).encode("utf-32-le"), dtype=np.uint32)
+    units = char_units(font_name)[np.minimum(points, 255)]
+    wide = np.flatnonzero(points > 255)
+    if len(wide):
+        units[wide] = [_wide_char_units(chr(p), font_name) for p in points[wide]]
+
+    # Empty strings own no characters, so the non-empty starts delimit every segment
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    nonempty = lengths > 0
+    sums[nonempty] = np.add.reduceat(units, starts[nonempty])
+
+    for i, text in enumerate(texts):
+        if "\n" in text:
+            sums[i] = text_units(text.split("\n"), font_name).max()
+    return sums
+
+
+def column_units(texts, font_name: str = FONT_NAME) -> int:
+    """Widest of texts in font units, measuring each distinct string once."""
+    uniques = pd.unique(np.asarray(texts, dtype=object))
+    return int(text_units(uniques, font_name).max()) if len(uniques) else 0
+
+
+def plan_column_widths(cells, headers, schema, extra_texts: dict = None) -> list:
+    """
+    Column widths in points for every table of an upload.
+    cells are the upload's display strings (formatting.format_cells), headers
+    the clipped header row and extra_texts {column: strings} whatever else
+    the pages print in body rows (totals, labels).
+    """
+    extra_texts = extra_texts or {}
+    widths = []
+    for col in range(len(headers)):
+        if col == schema.part_name:
+            widths.append(PART_NAME_WIDTH)
+            continue
+        body = column_units(np.concatenate([cells[:, col], np.asarray(list(extra_texts.get(col, ())), dtype=object)]))
+        header = column_units([headers[col]])
+        text_width = max(body * 0.001 * BODY_FONT_SIZE, header * 0.001 * HEADER_FONT_SIZE)
+        widths.append(text_width + CELL_PADDING)
+    return widths
@@ -0,0 +1,83 @@
+"""
+Column-wise cell formatting for the PDF builders.
+
+format_cells() turns a whole DataFrame into display strings in one pass per
+column: NaN blanking, date formatting on date columns, stringification and
+both truncation rules (80 characters everywhere, 12 on Part Name). The
+builders slice the result per page instead of formatting row by row.
+"""
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_datetime64_any_dtype, is_numeric_dtype, is_string_dtype
+
+from column_schema import resolve_column_schema
+
+MAX_CELL_LEN = 80
+PART_NAME_MAX_LEN = 12   # longer Part Name text is cut to 8 characters + ".."
+DATE_FORMAT = '%Y-%m-%d'
+
+
+def clip_text(text, part_name=False) -> str:
+    """Apply the truncation rules to a single cell (headers and total rows)."""
+    text = str(text) if text is not None else ""
+    if len(text) > MAX_CELL_LEN:
+        text = text[: MAX_CELL_LEN - 1] + "…"
+    if part_name and len(text) > PART_NAME_MAX_LEN:
+        text = text[:8] + ".."
+    return text
+
+
+def clip_row(row, schema) -> list:
+    """clip_text over a whole header/total row."""
+    return [clip_text(cell, i == schema.part_name) for i, cell in enumerate(row)]
+
+
+def _date_text(value):
+    return value.strftime(DATE_FORMAT) if hasattr(value, 'strftime') else str(value)
+
+
+def format_column(series: pd.Series, is_date_column=False, part_name=False) -> np.ndarray:
+    """Display strings for one column, as an object array."""
+    # Numbers, booleans and datetimes never render longer than MAX_CELL_LEN
+    short_text = is_numeric_dtype(series) or is_bool_dtype(series) or is_datetime64_any_dtype(series)
+    if is_date_column and is_datetime64_any_dtype(series):
+        text = series.dt.strftime(DATE_FORMAT)
+    elif is_date_column and series.dtype == object:
+        text = series.map(_date_text)
+    elif is_numeric_dtype(series) or is_bool_dtype(series) or is_string_dtype(series):
+        text = series.astype(str)
+    else:
+        text = series.map(str)   # datetimes, categoricals, ...: same text as str(value)
+
+    text = pd.Series(text.to_numpy(dtype=object), dtype=object)
+    if series.hasnans:
+        text[series.isna().to_numpy()] = ""
+
+    if short_text and not part_name:
+        return text.to_numpy()
+
+    lengths = text.str.len().to_numpy()
+    long = lengths > MAX_CELL_LEN
+    if long.any():
+        text[long] = text[long].str[: MAX_CELL_LEN - 1] + "…"
+        lengths[long] = MAX_CELL_LEN
+    if part_name:
+        long = lengths > PART_NAME_MAX_LEN
+        if long.any():
+            text[long] = text[long].str[:8] + ".."
+    return text.to_numpy()
+
+
+def format_cells(df: pd.DataFrame, schema=None) -> np.ndarray:
+    """Display strings for every cell of df, shape (rows, columns)."""
+    if schema is None:
+        schema = resolve_column_schema(df.columns)
+    cells = np.empty((len(df), len(df.columns)), dtype=object)
+    for i in range(len(df.columns)):
+        cells[:, i] = format_column(df.iloc[:, i], schema.date_like[i], i == schema.part_name)
+    return cells
+
+
+def format_rows(df: pd.DataFrame, schema=None) -> list:
+    """format_cells as a ready-to-render list of row lists."""
+    return format_cells(df, schema).tolist()
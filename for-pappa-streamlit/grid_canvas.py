@@ -0,0 +1,362 @@
+"""
+Direct-canvas drawing of an invoice page grid.
+
+The page tables are a rigid grid: fixed row heights, column widths planned
+once per upload (column_widths.py) and a style compiled once per layout
+(invoice_pdf.page_style). GridTable draws that grid straight onto the
+canvas instead of going through platypus Table: the cell strings go out in
+one text object with the CellStyles' fonts, alignment and padding, and the
+line commands are resolved to segments, merged where they touch and
+stroked as one path per line weight and colour.
+
+GridTable is a Flowable with the Table attributes draw_page_table reads
+(_width, _height after wrap), so it drops in wherever a page Table is
+drawn. Only the commands page_style emits are supported: backgrounds and
+GRID/BOX/LINEABOVE/LINEBELOW/LINEBEFORE/LINEAFTER lines.
+
+On a FormCanvas (multi-page documents) the furniture every page repeats is
+written once per document as a PDF form XObject and referenced from each
+page: the lines of each bordered block (a group's header, rows and total)
+and each header row's text. Forms are named by a digest of what they draw,
+so a block of the same shape anywhere in the document is the same form.
+draw_lines is shared with invoice_pdf.PageTable, the platypus backend's
+Table, so both backends' combined documents reuse their grid lines.
+
+A RecordingCanvas keeps what drawing one page on a FormCanvas adds to the
+document (PageDrawing): render pool workers draw the combined document's
+pages on one, and place_page writes them into the real document without
+laying out or drawing anything again.
+"""
+import hashlib
+import io
+from collections import defaultdict
+from dataclasses import dataclass
+from functools import lru_cache
+
+from reportlab.lib import colors
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+from reportlab.platypus.flowables import Flowable
+
+# Quantities, dates, rates and headers repeat across rows and pages
+_string_width = lru_cache(maxsize=65536)(stringWidth)
+
+# ReportLab tables draw lines with round caps and joins unless a command says otherwise
+LINE_CAP = LINE_JOIN = 1
+
+# Form bounding boxes reach past the block so half of a border's width is not clipped
+FORM_MARGIN = 2
+
+
+class FormCanvas(canvas.Canvas):
+    """A Canvas whose page grids define their repeated furniture once, as form XObjects."""
+    shared_forms = True
+
+
+def shared_forms(c) -> bool:
+    return getattr(c, "shared_forms", False)
+
+
+@dataclass
+class FormDrawing:
+    """A form XObject as drawn: its name and bounding box, its content and the forms it uses."""
+    name: str
+    bbox: tuple
+    code: list
+    forms_in_use: list
+
+
+@dataclass
+class PageDrawing:
+    """
+    What drawing one page added to a FormCanvas document: the page's content
+    and the forms it uses, the forms defined while drawing it (in order), the
+    document's internal names of its fonts and the PDF version it needs
+    (transparent colours raise it).
+    """
+    code: list
+    forms_in_use: list
+    forms: list
+    fonts: dict
+    pdf_version: tuple
+
+
+class RecordingCanvas(FormCanvas):
+    """A FormCanvas for one page that is never saved; page() is what was drawn on it."""
+
+    def __init__(self, **kwargs):
+        super().__init__(io.BytesIO(), **kwargs)
+        self._forms_drawn = []
+
+    def endForm(self, **extra_attributes):
+        name, *bbox = self._formData
+        self._forms_drawn.append(FormDrawing(name, tuple(bbox), list(self._code), list(self._formsinuse)))
+        super().endForm(**extra_attributes)
+
+    def page(self) -> PageDrawing:
+        return PageDrawing(list(self._code), list(self._formsinuse), self._forms_drawn, dict(self._doc.fontMapping),
+                           self._doc._pdfVersion)
+
+
+def place_page(c, drawing: PageDrawing):
+    """
+    Add a recorded page's content to FormCanvas c's current page, defining
+    the forms c's document does not have yet, as if it had been drawn on c.
+    """
+    for font, name in drawing.fonts.items():
+        if c._doc.getInternalFontName(font) != name:
+            raise ValueError(f"{font} was drawn as {name}, but this document names it differently")
+    c._doc._pdfVersion = max(c._doc._pdfVersion, drawing.pdf_version)
+    for form in drawing.forms:
+        if not c.hasForm(form.name):
+            c.beginForm(form.name, *form.bbox)
+            c._code.extend(form.code)
+            c._formsinuse.extend(form.forms_in_use)
+            c.endForm()
+    c._code.extend(drawing.code)
+    c._formsinuse.extend(drawing.forms_in_use)
+
+
+class GridTable(Flowable):
+    """
+    One page grid: data rows of strings, numeric col_widths, a fixed row_height and a compiled style.
+    header_rows are the rows drawn as shared forms on a FormCanvas.
+    """
+
+    def __init__(self, data, col_widths, row_height, cell_styles, table_style, header_rows=()):
+        super().__init__()
+        self.data = data
+        self.header_rows = frozenset(header_rows)
+        self.col_widths = list(col_widths)
+        self.row_height = row_height
+        self.cell_styles = cell_styles
+        self.commands = table_style.getCommands()
+        self._width = sum(self.col_widths)
+        self._height = row_height * len(data)
+
+    def wrap(self, availWidth, availHeight):
+        return self._width, self._height
+
+    def draw(self):
+        c = self.canv
+        n_rows, n_cols = len(self.data), len(self.col_widths)
+        col_pos = [0.0]
+        for width in self.col_widths:
+            col_pos.append(col_pos[-1] + width)
+        # Row i spans row_pos[i + 1] (bottom) to row_pos[i] (top)
+        row_pos = [self._height - i * self.row_height for i in range(n_rows + 1)]
+
+        c.saveState()
+        lines = []
+        for cmd in self.commands:
+            op, (sc, sr), (ec, er) = cmd[:3]
+            sc, ec = _clamp(sc, n_cols), _clamp(ec, n_cols)
+            sr, er = _clamp(sr, n_rows), _clamp(er, n_rows)
+            if op in ("BACKGROUND", "ROWBACKGROUNDS", "COLBACKGROUNDS"):
+                self._draw_background(c, op, cmd[3], sc, sr, ec, er, col_pos, row_pos)
+            else:
+                lines.append((op, sc, sr, ec, er, cmd[3], cmd[4]))
+        forms = shared_forms(c)
+        rows = [(r, row_pos[r + 1]) for r in range(n_rows) if not (forms and r in self.header_rows)]
+        self._draw_cells(c, rows, col_pos)
+        if forms:
+            for r in sorted(self.header_rows):
+                self._draw_header_form(c, r, col_pos, row_pos[r + 1])
+        draw_lines(c, lines, col_pos, row_pos, forms)
+        c.restoreState()
+
+    def _draw_background(self, c, op, fill, sc, sr, ec, er, col_pos, row_pos):
+        fills = [fill] if op == "BACKGROUND" else [f for f in fill if f is not None]
+        # White on the white page draws nothing, and is all the invoice styles use
+        if all(colors.toColor(f) == colors.white for f in fills):
+            return
+        if op == "BACKGROUND":
+            c.setFillColor(fill)
+            c.rect(col_pos[sc], row_pos[er + 1], col_pos[ec + 1] - col_pos[sc], row_pos[sr] - row_pos[er + 1],
+                   stroke=0, fill=1)
+        elif op == "ROWBACKGROUNDS":
+            for i, r in enumerate(range(sr, er + 1)):
+                c.setFillColor(fills[i % len(fills)])
+                c.rect(col_pos[sc], row_pos[r + 1], col_pos[ec + 1] - col_pos[sc], self.row_height, stroke=0, fill=1)
+        else:
+            for i, col in enumerate(range(sc, ec + 1)):
+                c.setFillColor(fills[i % len(fills)])
+                c.rect(col_pos[col], row_pos[er + 1], self.col_widths[col], row_pos[sr] - row_pos[er + 1],
+                       stroke=0, fill=1)
+
+    def _draw_header_form(self, c, r, col_pos, bottom):
+        """Header row r from a form holding its text, drawn at its bottom edge."""
+        row, styles = self.data[r], self.cell_styles[r]
+        name = _form_name("Head", (row, col_pos, self.row_height, [_style_key(style) for style in styles]))
+        if not c.hasForm(name):
+            c.beginForm(name, -FORM_MARGIN, -FORM_MARGIN, col_pos[-1] + FORM_MARGIN, self.row_height + FORM_MARGIN)
+            self._draw_cells(c, [(r, 0)], col_pos)
+            c.endForm()
+        _place_form(c, name, bottom)
+
+    def _draw_cells(self, c, rows, col_pos):
+        """The non-empty cells of rows ((index, bottom) pairs), placed the way Table._drawCell places a string."""
+        text = c.beginText()
+        font = color = None
+        row_height = self.row_height
+        for r, bottom in rows:
+            for col, (value, style) in enumerate(zip(self.data[r], self.cell_styles[r])):
+                value = str(value)
+                if not value:
+                    continue
+                if font != (style.fontname, style.fontsize, style.leading):
+                    font = (style.fontname, style.fontsize, style.leading)
+                    text.setFont(*font)
+                if color != style.color:
+                    color = style.color
+                    text.setFillColor(color)
+                lines = value.split("\n")
+                if style.valign == "BOTTOM":
+                    y = bottom + style.bottomPadding + len(lines) * style.leading - style.fontsize
+                elif style.valign == "TOP":
+                    y = bottom + row_height - style.topPadding - style.fontsize
+                else:
+                    y = bottom + (style.bottomPadding + row_height - style.topPadding
+                                  + len(lines) * style.leading) / 2.0 - style.fontsize
+                for line in lines:
+                    # Every line is placed by its own origin, so textLine's move down is never used
+                    # (and it skips textOut's width measurement)
+                    text.setTextOrigin(self._text_x(line, style, col_pos[col], self.col_widths[col]), y)
+                    text.textLine(line)
+                    y -= style.leading
+        c.drawText(text)
+
+    @staticmethod
+    def _text_x(line, style, left, width):
+        if style.alignment == "LEFT":
+            return left + style.leftPadding
+        line_width = _string_width(line, style.fontname, style.fontsize)
+        if style.alignment in ("CENTRE", "CENTER"):
+            return left + (width + style.leftPadding - style.rightPadding - line_width) * 0.5
+        if style.alignment == "RIGHT":
+            return left + width - style.rightPadding - line_width
+        raise ValueError(f"GridTable cannot align text {style.alignment!r}")
+
+
+def draw_lines(c, lines, col_pos, row_pos, forms: bool = False):
+    """
+    Stroke line commands (op, sc, sr, ec, er, weight, colour; cell indices
+    already clamped) as one path per weight and colour. With forms, each
+    block of touching lines is a form placed at the block's bottom edge.
+    """
+    paths = resolve_lines(lines, col_pos, row_pos)
+    if not forms:
+        stroke_paths(c, paths)
+        return
+    for bottom, top, block in split_blocks(paths):
+        name = _form_name("Grid", block)
+        if not c.hasForm(name):
+            c.beginForm(name, -FORM_MARGIN, -FORM_MARGIN, col_pos[-1] + FORM_MARGIN, top - bottom + FORM_MARGIN)
+            stroke_paths(c, block)
+            c.endForm()
+        _place_form(c, name, bottom)
+
+
+def resolve_lines(lines, col_pos, row_pos) -> dict:
+    """{(weight, rgba): (horizontal, vertical)} merged segments of line commands."""
+    horizontal, vertical = defaultdict(list), defaultdict(list)
+    for op, sc, sr, ec, er, weight, color in lines:
+        color = colors.toColor(color)
+        # Zero-alpha lines are drawn by ReportLab but never seen
+        if color.alpha == 0:
+            continue
+        key = (weight, color.rgba())
+        x0, x1, top, bottom = col_pos[sc], col_pos[ec + 1], row_pos[sr], row_pos[er + 1]
+        if op in ("GRID", "BOX", "OUTLINE"):
+            rows = range(sr, er + 2) if op == "GRID" else (sr, er + 1)
+            cols = range(sc, ec + 2) if op == "GRID" else (sc, ec + 1)
+            horizontal[key] += [(row_pos[r], x0, x1) for r in rows]
+            vertical[key] += [(col_pos[col], bottom, top) for col in cols]
+        elif op == "LINEABOVE":
+            horizontal[key] += [(row_pos[r], x0, x1) for r in range(sr, er + 1)]
+        elif op == "LINEBELOW":
+            horizontal[key] += [(row_pos[r + 1], x0, x1) for r in range(sr, er + 1)]
+        elif op == "LINEBEFORE":
+            vertical[key] += [(col_pos[col], bottom, top) for col in range(sc, ec + 1)]
+        elif op == "LINEAFTER":
+            vertical[key] += [(col_pos[col + 1], bottom, top) for col in range(sc, ec + 1)]
+        else:
+            raise ValueError(f"GridTable cannot draw {op}")
+    return {key: (merge_segments(horizontal[key]), merge_segments(vertical[key]))
+            for key in dict.fromkeys(list(horizontal) + list(vertical))}
+
+
+def split_blocks(paths) -> list:
+    """
+    (bottom, top, paths) per run of lines that touch vertically (a bordered
+    group, with spacer rows between runs), coordinates relative to bottom.
+    """
+    spans = sorted([(y, y) for horizontal, _ in paths.values() for y, _, _ in horizontal]
+                   + [(start, end) for _, vertical in paths.values() for _, start, end in vertical])
+    blocks = []
+    for start, end in spans:
+        if blocks and start <= blocks[-1][1]:
+            blocks[-1][1] = max(blocks[-1][1], end)
+        else:
+            blocks.append([start, end])
+    # Rounded so that blocks of the same shape at different heights are the same form
+    return [(bottom, top, {key: ([(round(y - bottom, 4), start, end) for y, start, end in horizontal if bottom <= y <= top],
+                                 [(x, round(start - bottom, 4), round(end - bottom, 4))
+                                  for x, start, end in vertical if bottom <= start <= top])
+                           for key, (horizontal, vertical) in paths.items()})
+            for bottom, top in blocks]
+
+
+def stroke_paths(c, paths):
+    """One stroked path per (weight, rgba) of resolve_lines' segments."""
+    c.setLineCap(LINE_CAP)
+    c.setLineJoin(LINE_JOIN)
+    for (weight, rgba), (horizontal, vertical) in paths.items():
+        if not horizontal and not vertical:
+            continue
+        c.setLineWidth(weight)
+        c.setStrokeColor(colors.Color(*rgba))
+        path = c.beginPath()
+        for y, start, end in horizontal:
+            path.moveTo(start, y)
+            path.lineTo(end, y)
+        for x, start, end in vertical:
+            path.moveTo(x, start)
+            path.lineTo(x, end)
+        c.drawPath(path, stroke=1, fill=0)
+
+
+def _form_name(prefix: str, content) -> str:
+    """A form name that is the same for the same drawing, in any document."""
+    return prefix + hashlib.blake2b(repr(content).encode(), digest_size=8).hexdigest()
+
+
+def _place_form(c, name: str, bottom: float):
+    c.saveState()
+    c.translate(0, bottom)
+    c.doForm(name)
+    c.restoreState()
+
+
+def _style_key(style) -> tuple:
+    """What of a CellStyle a header form's text depends on."""
+    return (style.fontname, style.fontsize, style.leading, repr(style.color), style.alignment, style.valign,
+            style.leftPadding, style.rightPadding, style.topPadding, style.bottomPadding)
+
+
+def merge_segments(segments) -> list:
+    """(position, start, end) segments on the same line, with overlapping or touching ones joined."""
+    merged = []
+    for position, start, end in sorted(segments):
+        if merged and merged[-1][0] == position and start <= merged[-1][2]:
+            merged[-1][2] = max(merged[-1][2], end)
+        else:
+            merged.append([position, start, end])
+    return [tuple(segment) for segment in merged]
+
+
+def _clamp(index, count) -> int:
+    """A style command's cell index (negative counts from the end) within 0..count - 1."""
+    if index < 0:
+        index += count
+    return min(max(index, 0), count - 1)
@@ -0,0 +1,75 @@
+"""
+XLSX ingest for the invoice generator.
+
+read_header() parses only the header row (openpyxl read-only mode loads
+rows lazily), so the serial column is validated before the sheet is read.
+read_invoice() then loads just the columns the chosen mode needs, with
+python-calamine when it is installed and read-only openpyxl otherwise, and
+stores the serial and plant columns as categoricals.
+"""
+import importlib.util
+
+import pandas as pd
+from pandas.api.types import is_object_dtype
+
+from column_schema import resolve_column_schema
+
+
+def excel_engine() -> str:
+    """calamine when python-calamine is installed (much faster), else openpyxl."""
+    return "calamine" if importlib.util.find_spec("python_calamine") else "openpyxl"
+
+
+def _rewind(source):
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+
+def read_header(source) -> pd.Index:
+    """Column names of the first sheet, whitespace-stripped like the full read."""
+    _rewind(source)
+    # openpyxl here even when calamine is available: calamine loads the whole sheet for one row
+    header = pd.read_excel(source, nrows=0, engine="openpyxl").columns
+    return header.str.strip()
+
+
+def find_column(columns, name: str):
+    """Exact match first, then case-insensitive and stripped; None when absent."""
+    if name in columns:
+        return name
+    wanted = name.lower().strip()
+    for col in columns:
+        if col.lower().strip() == wanted:
+            return col
+    return None
+
+
+def annexure_usecols(columns, serial_column: str) -> list:
+    """Positions of the columns build_annexure_pdf reads (plus the serial column)."""
+    needed = set(resolve_column_schema(columns).annexure_columns.values()) | {serial_column}
+    return [i for i, col in enumerate(columns) if col in needed]
+
+
+def apply_dtype_hints(df: pd.DataFrame, serial_column: str = None) -> pd.DataFrame:
+    """
+    Store text serial/plant columns as categoricals (a handful of distinct
+    values repeated on every row). Amount and Rec. Date already come back
+    numeric/datetime from the reader when the cells are; text cells in them
+    are left alone because the builders print (and the annexure parses) them as written.
+    """
+    plant = resolve_column_schema(df.columns).annexure_columns.get('plant')
+    for col in {serial_column, plant} - {None}:
+        if col in df.columns and is_object_dtype(df[col]):
+            df[col] = df[col].astype("category")
+    return df
+
+
+def read_invoice(source, usecols=None, serial_column: str = None, engine: str = None) -> pd.DataFrame:
+    """
+    Read the first sheet with stripped column names.
+    usecols: column positions to load (None loads every column).
+    """
+    _rewind(source)
+    df = pd.read_excel(source, usecols=usecols, engine=engine or excel_engine())
+    df.columns = df.columns.str.strip()
+    return apply_dtype_hints(df, serial_column)
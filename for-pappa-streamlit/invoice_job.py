@@ -0,0 +1,327 @@
+"""
+One upload processed end to end as a background job (see jobs.py):
+ingest → group → render → upload → package, without touching Streamlit.
+
+streamlit_app.py resolves the shared resources (render pool, Cloudinary
+client, page cache, upload manifest) on its script thread, submits
+process_upload() to the JobManager and polls the job. Progress goes to
+job.report(), messages for the results page to run.note(); job.check()
+between pages and while uploads drain makes a cancelled job stop
+rendering, drop its queued uploads and release its spooled files.
+"""
+import os
+import time
+from dataclasses import dataclass
+
+from artifacts import ANNEXURE_PDF_NAME, COMBINED_PDF_NAME, XLSX_WORKBOOK_NAME
+from perf import PerfHistory, Recorder, active_recorder, log_run, span
+from run_cache import RunArtifacts
+
+UPLOAD_POLL_SECONDS = 0.25
+
+
+@dataclass(frozen=True)
+class RunOptions:
+    """The sidebar's choices for one run."""
+    serial_column: str = "Del.Challan"
+    create_xlsx: bool = False
+    xlsx_mode: str = "per_group"     # a file per group or one workbook, see xlsx_export.XLSX_MODES
+    ensure_cloud: bool = True
+    generate_annexure: bool = False
+    annexure_date: object = None     # datetime.date the annexure is dated; None is the day it runs
+    reuse_pages: bool = False
+    backend: str = "platypus"        # page renderer, see invoice_pdf.BACKENDS
+    upload_workers: int = 4
+    record_perf: bool = False
+    trace_memory: bool = False
+
+
+@dataclass
+class Services:
+    """Process-wide resources the app hands to a job; None where the run does without."""
+    pool: object = None              # render_pool process pool
+    cloud: object = None             # the configured cloud module
+    cloud_error: Exception = None    # why cloud is None although the run uploads
+    page_cache: object = None        # page_cache.PageCache
+    manifest: object = None          # page_cache.UploadManifest
+
+
+def process_upload(job, source, file_name: str, key, options: RunOptions, services: Services) -> RunArtifacts:
+    """The job's work: returns the finished RunArtifacts; SerialColumnNotFound fails the job."""
+    if not options.record_perf:
+        return _process_upload(job, source, key, options, services)
+
+    from invoice_pdf import page_style
+
+    # Spans are per thread of work, so the recorder is activated on the job's thread
+    recorder = Recorder(memory=options.trace_memory)
+    styles_before = page_style.cache_info()
+    with recorder.activate():
+        run = _process_upload(job, source, key, options, services)
+    styles = page_style.cache_info()
+    plan = run.plan
+    # Table styles compiled or reused in this process (pool workers keep their own caches)
+    run.perf = recorder.record(run_id=run.timestamp, pages=plan.num_pages if plan else None,
+                               rows=len(plan.groups.positions) if plan else None, file=file_name,
+                               parallel_render=services.pool is not None, backend=options.backend,
+                               table_styles={"hits": styles.hits - styles_before.hits,
+                                             "misses": styles.misses - styles_before.misses})
+    log_run(run.perf)
+    try:
+        PerfHistory().add(run.perf)
+    except Exception as e:
+        run.note("caption", f"⏱️ Run history not saved: {e}")
+    return run
+
+
+def _process_upload(job, source, key, options: RunOptions, services: Services) -> RunArtifacts:
+    from pipeline import load_workbook
+
+    # Read the header first, then just the columns this mode needs, and plan the pages
+    job.report("Reading workbook")
+    with span("load workbook"):
+        book = load_workbook(source, options.serial_column, annexure_only=options.generate_annexure)
+    job.check()
+
+    run = RunArtifacts(key=key, timestamp=int(time.time() * 1000))
+    run.plan = book.plan
+    try:
+        # Show successful column detection
+        if book.serial_column != options.serial_column:
+            run.note("info", f"✅ Column found: Using '{book.serial_column}' (matched from input '{options.serial_column}')")
+        if services.cloud_error is not None:
+            run.note("warning", f"Cloudinary is not configured, nothing will be uploaded: {services.cloud_error}")
+
+        if options.generate_annexure:
+            _annexure(job, book, run, options, services)
+        else:
+            _pages(job, book, run, options, services)
+    except BaseException:
+        # Cancelled or failed: nothing will show this run, free its spooled files now
+        run.close()
+        raise
+    return run
+
+
+def _user_id() -> str:
+    return os.getenv("USER") or os.getenv("USERNAME") or "user"
+
+
+def _annexure(job, book, run, options: RunOptions, services: Services):
+    from invoice_pdf import build_annexure_pdf
+    from uploads import upload_with_retry
+
+    # For annexure, we use the entire dataframe as one document
+    job.report("Building annexure", done=0, total=1)
+    with span("annexure pdf"):
+        annexure_pdf_bytes = build_annexure_pdf(book.df, header_map=book.header_map, schema=book.schema,
+                                                billing_date=options.annexure_date)
+    job.check()
+
+    annexure_public_id = f"{_user_id()}_{run.timestamp}_Annexure_Billing"
+    annexure_pdf_url = None
+    if options.ensure_cloud and services.cloud is not None:
+        job.report("Uploading annexure")
+        with span("upload"):
+            upload = upload_with_retry(services.cloud.upload_raw_to_cloudinary, annexure_pdf_bytes,
+                                       public_id=annexure_public_id, cancelled=job.cancel_event,
+                                       sleep=job.cancel_event.wait)   # a cancel cuts the backoff short
+        job.check()
+        if upload.ok:
+            annexure_pdf_url = upload.url
+        else:
+            run.note("warning", f"Failed to upload Annexure PDF: {upload.error}")
+
+    run.results.append({
+        "type": "annexure",
+        "page": "Annexure",
+        "serials": ["All Data"],
+        "total_rows": len(book.df),
+        "pdf_url": annexure_pdf_url,
+        "xlsx_urls": {},
+        "file": ANNEXURE_PDF_NAME,
+    })
+    run.files.add(ANNEXURE_PDF_NAME, annexure_pdf_bytes)
+    run.annexure_url = annexure_pdf_url
+    job.report(done=1)
+
+
+def _pages(job, book, run, options: RunOptions, services: Services):
+    from pipeline import PageRenderer, page_file_name
+    from uploads import UploadPool, summarize
+    from xlsx_export import WORKBOOK, XlsxExporter
+
+    df, plan = book.df, book.plan
+    results = run.results
+    cloud = services.cloud
+    user_id, timestamp = _user_id(), run.timestamp
+
+    # Pages render in-process, or on the warm worker pool in parallel mode
+    # ...and pages unchanged since an earlier upload come from the page cache
+    job.report("Preparing pages", done=0, total=plan.num_pages)
+    with span("prepare pages"):
+        renderer = PageRenderer(book, pool=services.pool,
+                                page_cache=services.page_cache if options.reuse_pages else None,
+                                backend=options.backend)
+
+    # The group XLSX files are written on a worker (the render pool's in parallel mode) meanwhile
+    exporter = None
+    if options.create_xlsx:
+        exporter = XlsxExporter(df, plan.groups, options.xlsx_mode, pool=services.pool)
+    xlsx_names = []
+
+    # Uploads run on background threads while later pages render; cancelling the job cancels them
+    upload_pdfs = options.ensure_cloud and cloud is not None
+    upload_xlsx = options.create_xlsx and cloud is not None
+    uploads = None
+    if upload_pdfs or upload_xlsx:
+        uploads = UploadPool(max_workers=options.upload_workers, cancel_event=job.cancel_event)
+
+    # Pages and group XLSX files uploaded by earlier runs keep their URLs
+    reuse_uploads = options.reuse_pages and uploads is not None and services.manifest is not None
+    uploaded_pdfs, uploaded_xlsx = {}, {}
+    if reuse_uploads:
+        manifest, account = services.manifest, cloud.account()
+        if upload_pdfs:
+            uploaded_pdfs = manifest.lookup(account, "pdf", renderer.page_fps)
+        if upload_xlsx:
+            uploaded_xlsx = manifest.lookup(account, "xlsx", renderer.group_fps)
+    page_fps = renderer.page_fps or [None] * plan.num_pages
+    group_fps = renderer.group_fps or [None] * len(plan.groups)
+    reused_uploads = 0
+    # A group split across pages is uploaded whole, with its first page
+    first_page = {int(plan.piece_group[piece]): page_idx for page_idx in range(plan.num_pages)
+                  for piece in plan.piece_range(page_idx) if plan.piece_part[piece] == 1}
+    reused_xlsx = {}
+
+    def take_xlsx(files):
+        """Spool finished XLSX files for the ZIP and queue their uploads."""
+        nonlocal reused_uploads
+        for name, data, group_indices in files:
+            run.files.add(name, data)
+            xlsx_names.append(name)
+            if not upload_xlsx:
+                continue
+            if exporter.mode == WORKBOOK:
+                uploads.submit(("workbook",), cloud.upload_xlsx_to_cloudinary, data,
+                               public_id=f"{user_id}_{timestamp}_Serial_Groups_xlsx")
+                continue
+            group_idx = group_indices[0]
+            serial = str(plan.groups.serials[group_idx])
+            if group_fps[group_idx] in uploaded_xlsx:
+                reused_xlsx[group_idx] = uploaded_xlsx[group_fps[group_idx]]
+                reused_uploads += 1
+                continue
+            uploads.submit(("xlsx", first_page[group_idx], serial, group_idx), cloud.upload_xlsx_to_cloudinary,
+                           data, public_id=f"{user_id}_{timestamp}_Serial_{serial}_xlsx")
+
+    job.report("Rendering pages")
+    try:
+        for page_idx, page_serials, pdf_bytes in renderer:
+            job.check()
+            page_serials_list = [group['serial'] for group in page_serials]
+            page_id = f"Page_{page_idx + 1}_Serials_{'-'.join(page_serials_list)}"
+            pdf_public_id = f"{user_id}_{timestamp}_{page_id}"
+
+            pdf_url = uploaded_pdfs.get(page_fps[page_idx])
+            if pdf_url is not None:
+                reused_uploads += 1
+            elif upload_pdfs:
+                uploads.submit(("pdf", page_idx), cloud.upload_raw_to_cloudinary, pdf_bytes, public_id=pdf_public_id)
+
+            # Group XLSX files written so far go to the spool and the upload queue
+            if exporter is not None:
+                take_xlsx(exporter.ready())
+
+            # Keep the page in the run's spool, not as another bytes object in memory
+            file_name = page_file_name(page_idx + 1, page_serials_list)
+            run.files.add(file_name, pdf_bytes)
+            results.append({
+                "page": page_idx + 1,
+                "serials": page_serials_list,
+                "total_rows": sum(len(group['df']) for group in page_serials),
+                "pdf_url": pdf_url,
+                "xlsx_urls": {},
+                "file": file_name,
+            })
+            job.report(done=page_idx + 1)
+
+        if exporter is not None:
+            job.report("Writing XLSX")
+            with span("xlsx wait"):
+                take_xlsx(exporter.results())
+            for group_idx, url in reused_xlsx.items():
+                results[first_page[group_idx]]["xlsx_urls"][str(plan.groups.serials[group_idx])] = url
+            job.check()
+
+        if uploads is not None:
+            with span("upload wait"):
+                while uploads.wait(UPLOAD_POLL_SECONDS):
+                    job.check()
+                    job.report(f"Finishing {uploads.pending} upload(s)")
+            upload_results = uploads.results()
+            _collect_uploads(run, upload_results, page_fps, group_fps)
+            if reuse_uploads:
+                manifest.record(account, "pdf", {page_fps[u.key[1]]: u.url for u in upload_results
+                                                 if u.ok and u.key[0] == "pdf"})
+                manifest.record(account, "xlsx", {group_fps[u.key[3]]: u.url for u in upload_results
+                                                  if u.ok and u.key[0] == "xlsx"})
+            stats = summarize(upload_results)
+            run.note("caption", f"☁️ {stats['files']} upload(s), {stats['retried']} retried, {stats['failed']} failed "
+                                f"(slowest {stats['max_seconds']:.1f}s)"
+                                + (f", {reused_uploads} reused from earlier uploads" if options.reuse_pages else ""))
+    except BaseException:
+        renderer.close()
+        if exporter is not None:
+            exporter.cancel()
+        if uploads is not None:
+            uploads.cancel()
+        raise
+    finally:
+        if uploads is not None:
+            uploads.close()
+
+    if options.reuse_pages:
+        run.note("caption", f"♻️ {renderer.reused} page(s) reused, {renderer.rebuilt} rebuilt")
+
+    # Single multi-page PDF document with all pages as slides
+    job.report("Packaging")
+    if results and plan.num_pages:
+        with span("combined pdf"):
+            run.files.add(COMBINED_PDF_NAME, renderer.combined_pdf())
+    job.check()
+
+    # All page PDFs (and the XLSX export) as one stored ZIP, streamed from the spool when first downloaded
+    if results:
+        run.zip_members = [(r["file"], r["file"]) for r in results] + [(name, name) for name in xlsx_names]
+
+
+def _collect_uploads(run, upload_results, page_fps, group_fps):
+    """Put finished uploads' URLs on the results, noting failures."""
+    # Uploads ran on worker threads, outside any span
+    recorder = active_recorder()
+    if recorder is not None:
+        for upload in upload_results:
+            recorder.add("upload (background)", upload.seconds)
+    for upload in upload_results:
+        kind = upload.key[0]
+        if kind == "workbook":
+            # One workbook has every group's sheet
+            if upload.ok:
+                for result in run.results:
+                    result["xlsx_urls"].update(dict.fromkeys(result["serials"], upload.url))
+            else:
+                run.note("warning", f"Failed to upload {XLSX_WORKBOOK_NAME}: {upload.error}")
+            continue
+        page_idx = upload.key[1]
+        if kind == "pdf":
+            if upload.ok:
+                run.results[page_idx]["pdf_url"] = upload.url
+            else:
+                run.note("warning", f"Failed to upload PDF for page {page_idx + 1}: {upload.error}")
+        else:
+            serial = upload.key[2]
+            if upload.ok:
+                run.results[page_idx]["xlsx_urls"][serial] = upload.url
+            else:
+                run.note("warning", f"Failed to upload XLSX for {serial}: {upload.error}")
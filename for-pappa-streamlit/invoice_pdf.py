@@ -0,0 +1,806 @@
+"""
+PDF builders for the XLSX → grouped PDF flow.
+
+Everything here is plain pandas + ReportLab so it can be imported without
+Streamlit (render worker processes, scripts, benchmarks).
+"""
+import io
+import numpy as np
+import pandas as pd
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+from reportlab.lib.units import mm
+from reportlab.lib import colors
+from reportlab.platypus import Table, TableStyle
+from reportlab.platypus.tables import LINECOMMANDS
+from dataclasses import dataclass
+from datetime import date
+from functools import lru_cache
+from amounts import amount_values, fixed_point, segment_totals
+from annexure import aggregate_annexure
+from column_schema import resolve_column_schema
+from table_style import compile_borders, compile_column_aligns, compile_table_style
+from grid_canvas import FormCanvas, GridTable, RecordingCanvas, draw_lines, shared_forms
+from formatting import clip_row, clip_text, format_cells, format_rows
+from column_widths import plan_column_widths
+from pagination import MAX_ROWS_PER_PAGE, ROW_HEIGHT, one_group, plan_pages
+from perf import span
+
+SUBTOTAL_LABEL = "Subtotal c/f"        # bottom of every page of a split group but the last
+BROUGHT_FORWARD_LABEL = "Subtotal b/f"  # top of every page of a split group but the first
+
+# Page renderers: platypus Table layout, or the fixed grid drawn directly (grid_canvas.py)
+PLATYPUS, CANVAS = "platypus", "canvas"
+BACKENDS = (PLATYPUS, CANVAS)
+
+def build_table(data, df, amount_pkr_col_idx, total_row_indices, header_row_indices=None, table_end_indices=None, schema=None,
+                col_widths=None, backend: str = PLATYPUS):
+    """
+    Build a ReportLab Table with custom borders for each cell.
+    data must already be display strings, truncated (see formatting.py).
+    Pass col_widths from plan_table_widths to skip ReportLab's auto-sizing.
+    With backend=CANVAS and planned col_widths the page is a grid_canvas.GridTable
+    instead, drawn straight onto the canvas.
+    """
+    if schema is None:
+        schema = resolve_column_schema(df.columns)
+
+    # Part Name column gets a fixed width; its text was truncated to fit by formatting.py
+    part_name_col_idx = schema.part_name
+    processed_data = data
+    
+    # Define column widths - only specify Part Name width, others auto-size
+    if col_widths is None and part_name_col_idx is not None:
+        num_cols = len(data[0]) if data else 12
+        col_widths = [None] * num_cols  # None means auto-width
+        col_widths[part_name_col_idx] = 80  # Even smaller width to ensure text fits completely
+    
+    rows, cols = len(processed_data), len(processed_data[0])
+
+    # Column roles resolved once per upload (see column_schema.py)
+    rate_pkr_col_idx = schema.rate_pkr
+    delivery_challan_col_idx = schema.challan
+    receiving_date_col_idx = schema.rec_date
+    quantity_col_idx = schema.quantity
+
+    total_row_indices = _as_indices(total_row_indices)
+    header_row_indices = _as_indices(header_row_indices)
+    # table_end_indices mark each table's last row; the thick bottom border that
+    # separated tables visually was removed for a cleaner look
+
+    # Right-align Rate/Amount and center Challan/Receiving Date/Quantity on data rows.
+    # Later entries win, matching the old per-row command order.
+    column_aligns = {}
+    for col_idx, align in ((rate_pkr_col_idx, "RIGHT"), (amount_pkr_col_idx, "RIGHT"),
+                           (delivery_challan_col_idx, "CENTER"), (receiving_date_col_idx, "CENTER"),
+                           (quantity_col_idx, "CENTER")):
+        if col_idx is not None:
+            column_aligns[col_idx] = align
+    spacer_rows = [r for r in range(rows) if all(str(cell).strip() == "" for cell in processed_data[r])]
+
+    # Pages of the same shape share one compiled style (see page_style)
+    style = page_style(rows, cols, tuple(header_row_indices), tuple(total_row_indices), tuple(spacer_rows),
+                       tuple(column_aligns.items()), amount_pkr_col_idx)
+    if backend == CANVAS and col_widths is not None and None not in col_widths:
+        return GridTable(processed_data, col_widths, ROW_HEIGHT, style.cell_styles, style.table_style,
+                         header_row_indices)
+    t = PageTable(processed_data, repeatRows=1, rowHeights=[ROW_HEIGHT] * len(processed_data), colWidths=col_widths,
+              cellStyles=style.cell_styles)
+    t.setStyle(style.table_style)
+    return t
+
+class PageTable(Table):
+    """A page's platypus Table; on a FormCanvas its grid lines are shared forms (see grid_canvas)."""
+
+    def _drawLines(self):
+        # Only solid single lines with round caps and joins, which is all page_style draws
+        if not shared_forms(self.canv) or any(cmd[5:9] != (1, None, 1, 1) for cmd in self._linecmds):
+            return super()._drawLines()
+        lines = []
+        for op, (sc, sr), (ec, er), weight, color, *_ in self._linecmds:
+            sc, ec, sr, er = self.normCellRange(sc, ec, sr, er)
+            lines.append((op, sc, sr, ec, er, weight, color))
+        self.canv.saveState()
+        draw_lines(self.canv, lines, self._colpositions, self._rowpositions, forms=True)
+        self.canv.restoreState()
+
+def _as_indices(indices) -> list:
+    """Row indices given as None, a single index or a list, as a list."""
+    if indices is None:
+        return []
+    if isinstance(indices, int):
+        return [indices]
+    return indices
+
+@dataclass(frozen=True)
+class PageStyle:
+    """
+    A grouped table's style, compiled: cell_styles are ReportLab CellStyles
+    with the font/alignment/padding commands already applied, shared
+    read-only by every Table of the layout (Table(cellStyles=...)), and
+    table_style holds the background and line commands each Table applies.
+    """
+    cell_styles: list
+    table_style: TableStyle
+
+TABLE_COMMANDS = ("BACKGROUND", "ROWBACKGROUNDS", "COLBACKGROUNDS") + tuple(LINECOMMANDS)
+
+@lru_cache(maxsize=1024)
+def page_style(rows, cols, header_row_indices, total_row_indices, spacer_rows, column_aligns, amount_pkr_col_idx):
+    """
+    The PageStyle of a grouped table with this layout signature, compiled
+    once: most pages of a run have the same rows, header/total/spacer rows
+    and column roles, so they skip building the command list and applying
+    it cell by cell. Arguments must be hashable (tuples; column_aligns as
+    (col, align) pairs). page_style.cache_info() counts the hits and misses.
+    """
+    style = [
+        ("FONTNAME", (0, 0), (-1, -1), "Helvetica-Bold"),
+        ("FONTSIZE", (0, 0), (-1, -1), 10),
+        ("ALIGN", (0, 0), (-1, -1), "LEFT"),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        ("ROWBACKGROUNDS", (0, 1), (-1, -1),
+         [colors.white, colors.white]),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 9.5),
+        ("TOPPADDING", (0, 0), (-1, -1), 9.5)
+    ]
+
+    # Data rows get their column alignment, then every non-empty cell is boxed
+    # (total rows skip the label columns)
+    total_border_cols = set(range(cols)) - {0, 1, 2, 10, 11, 5, 6, 7, amount_pkr_col_idx}
+    style += compile_table_style(rows, cols, header_row_indices, total_row_indices, spacer_rows,
+                                 dict(column_aligns), total_border_cols, base_align="LEFT")
+    
+    # Apply header row styling to all header rows
+    for header_row_idx in header_row_indices:
+        style.append(("BACKGROUND", (0, header_row_idx), (-1, header_row_idx), colors.white ))
+        style.append(("TEXTCOLOR", (0, header_row_idx), (-1, header_row_idx), colors.black))
+        style.append(("FONTNAME", (0, header_row_idx), (-1, header_row_idx), "Helvetica-Bold"))
+        style.append(("FONTSIZE", (0, header_row_idx), (-1, header_row_idx), 9))
+        style.append(("ALIGN", (0, header_row_idx), (-1, header_row_idx), "CENTER"))
+    
+    # Apply total row styling to all total rows
+    for total_row_idx in total_row_indices:
+        style.append(("BACKGROUND", (0, total_row_idx), (-1, total_row_idx), colors.white))
+        style.append(("FONTNAME", (0, total_row_idx), (-1, total_row_idx), "Helvetica-Bold"))
+        style.append(("FONTSIZE", (0, total_row_idx), (-1, total_row_idx), 10))
+        style.append(("ALIGN", (amount_pkr_col_idx, total_row_idx),
+                      (amount_pkr_col_idx, total_row_idx), "RIGHT"))
+
+        # Center align the "Total" text in column 4 of total row
+        style.append(("ALIGN", (4, total_row_idx), (4, total_row_idx), "CENTER"))
+
+        # 🔻 CUSTOM: remove just certain sides
+        # 6th col (index 5) remove right border
+        style.append(("LINEAFTER", (5, total_row_idx), (5, total_row_idx), 0, colors.transparent))
+
+        # 7th col (index 6) remove left & right borders
+        style.append(("LINEBEFORE", (6, total_row_idx), (6, total_row_idx), 0, colors.transparent))
+        style.append(("LINEAFTER", (6, total_row_idx), (6, total_row_idx), 0, colors.transparent))
+
+        # 8th col (index 7) remove left & right borders
+        style.append(("LINEBEFORE", (7, total_row_idx), (7, total_row_idx), 0, colors.transparent))
+        style.append(("LINEAFTER", (7, total_row_idx), (7, total_row_idx), 0, colors.transparent))
+        style.append(("LINEBEFORE", (8, total_row_idx), (8, total_row_idx), 0, colors.transparent))
+
+        # Remove left border from Amount (PKR) column in total row
+        # if amount_pkr_col_idx is not None:
+        #     style.append(("LINEBEFORE", (amount_pkr_col_idx, total_row_idx), (amount_pkr_col_idx, total_row_idx), 0, colors.transparent))
+
+        # Add bottom and right borders to Amount (PKR) column in total row
+        if amount_pkr_col_idx is not None:
+            style.append(("LINEBELOW", (amount_pkr_col_idx, total_row_idx), (amount_pkr_col_idx, total_row_idx), 0.5, colors.black))
+            style.append(("LINEAFTER", (amount_pkr_col_idx, total_row_idx), (amount_pkr_col_idx, total_row_idx), 0.5, colors.black))
+
+        # 🔻 Add bottom borders:
+        style.append(("LINEBELOW", (5, total_row_idx), (5, total_row_idx), 0.5, colors.black))
+        style.append(("LINEBELOW", (6, total_row_idx), (6, total_row_idx), 0.5, colors.black))
+        style.append(("LINEBELOW", (7, total_row_idx), (7, total_row_idx), 0.5, colors.black))
+        style.append(("LINEBELOW", (8, total_row_idx), (8, total_row_idx), 0.5, colors.black))
+
+    # Apply the per-cell commands once, to a blank table of this shape
+    cell_commands = [cmd for cmd in style if cmd[0] not in TABLE_COMMANDS]
+    blank = Table([[""] * cols for _ in range(rows)], style=TableStyle(cell_commands))
+    return PageStyle(cell_styles=blank._cellStyles,
+                     table_style=TableStyle([cmd for cmd in style if cmd[0] in TABLE_COMMANDS]))
+
+def get_robust_header_map(df_columns):
+    """Create a robust header map that handles trailing spaces in column names."""
+    base_header_map = {
+        "Del.Challan": "Delivery Challan",
+        "P.O #": "P.O #",
+        "PO Line": "PO Line",
+        "In-Bound #": "In-Bound #",
+        "GR No.": "GR No.",
+        "Part No.": "Part no.",
+        "Part Name": "Part Name",
+        "Quantity": "Qty",
+        "Rate (PKR)": "Rate (PKR)",
+        "Amount (PKR)": "Amount (PKR)",
+        "Plant": "Plant",
+        "Rec. Date": "Receiving Date"
+    }
+    
+    # Create mapping for actual column names (including those with trailing spaces)
+    robust_map = {}
+    for actual_col in df_columns:
+        # Strip and check if it matches any base key
+        stripped_col = actual_col.strip()
+        if stripped_col in base_header_map:
+            robust_map[actual_col] = base_header_map[stripped_col]
+        else:
+            # If no match, keep original
+            robust_map[actual_col] = actual_col
+    
+    return robust_map
+
+def total_row_for(df: pd.DataFrame, schema, amount: float, label: str = "Total") -> list:
+    """A group's total row: label, last In-Bound number and the amount, clipped for display."""
+    total_row = [""] * len(df.columns)
+    if schema.inbound is not None:
+        inbound_number = df.iloc[-1, schema.inbound] if not df.empty else ""
+        total_row[schema.inbound] = str(inbound_number)
+    if len(df.columns) >= 5:
+        total_row[4] = label
+    total_row[schema.amount_pkr] = f"{amount:,.2f}"
+    for blank_idx in schema.total_blank:
+        total_row[blank_idx] = ""
+    return clip_row(total_row, schema)
+
+def build_page_table(serial_groups, header_map: dict = None, schema=None, col_widths=None, backend: str = PLATYPUS):
+    """
+    Lay out one page of serial number groups as a styled Table.
+    Each group includes header + data rows + total row.
+    Adds spacing (blank rows) between serial number groups.
+    Pass the upload's ColumnSchema as schema to skip re-detecting columns.
+    A slice of a split group (see pagination.plan_pages) opens with the
+    subtotal brought forward and closes with the running subtotal, or the
+    group total on its last page. col_widths: see plan_table_widths;
+    backend: see build_table.
+    """
+    # Get headers from the first group to apply header_map
+    first_group_df = serial_groups[0]['df']
+    headers = list(first_group_df.columns)
+    if header_map:
+        headers = [header_map.get(h, h) for h in headers]
+    
+    if schema is None:
+        schema = resolve_column_schema(first_group_df.columns)
+    amount_pkr_col_idx = schema.amount_pkr
+    headers = clip_row(headers, schema)
+    
+    combined_data = []
+    total_row_indices = []
+    header_row_indices = []
+    table_end_indices = []
+    current_row_index = 0  # keep track of current row index for styling
+    
+    for group_idx, group in enumerate(serial_groups):
+        df = group['df']
+        
+        # 🔹 Add spacing rows before each group (except the first one)
+        if group_idx > 0:
+            for _ in range(4):  # four blank rows for better margin between tables
+                combined_data.append([""] * len(headers))
+                current_row_index += 1
+        
+        # 🔹 add header row for each serial group
+        combined_data.append(headers)
+        header_row_indices.append(current_row_index)
+        current_row_index += 1
+
+        # 🔹 continued slice of a split group: subtotal brought forward
+        part, parts = group.get('part', 1), group.get('parts', 1)
+        carried = group.get('carried', 0.0)
+        if part > 1 and amount_pkr_col_idx is not None:
+            combined_data.append(total_row_for(df, schema, carried, BROUGHT_FORWARD_LABEL))
+            total_row_indices.append(current_row_index)
+            current_row_index += 1
+        
+        # 🔹 add data rows (pre-formatted for the whole upload when the page carries 'cells')
+        data_rows = group['cells'] if 'cells' in group else format_rows(df, schema)
+        combined_data.extend(data_rows)
+        current_row_index += len(data_rows)
+        
+        # 🔹 add total row (running subtotal on all but the last slice of a split group)
+        if amount_pkr_col_idx is not None:
+            if 'total' in group:
+                total_amount = group['total']   # totalled for the whole upload by plan_pages
+            else:
+                total_amount = pd.to_numeric(df.iloc[:, amount_pkr_col_idx], errors="coerce").sum()
+                if parts > 1:
+                    total_amount += carried
+            label = "Total" if part == parts else SUBTOTAL_LABEL
+            combined_data.append(total_row_for(df, schema, total_amount, label))
+            total_row_indices.append(current_row_index)
+            table_end_indices.append(current_row_index)  # Mark end of this table
+            current_row_index += 1
+    
+    with span("table style"):
+        table = build_table(combined_data, first_group_df, amount_pkr_col_idx, total_row_indices, header_row_indices,
+                            table_end_indices, schema=schema, col_widths=col_widths, backend=backend)
+    
+    return table
+
+def draw_page_table(c, table):
+    """Wrap a page table and draw it centered on the canvas's current page."""
+    side_margin, top_margin, bottom_margin = 20 * mm, 20 * mm, 20 * mm
+    page_height, page_width = A4  # A4 portrait (swap if you want landscape)
+    
+    # Wrap the table and get actual dimensions - following project specification for proper centering
+    available_width = page_width - side_margin * 2
+    available_height = page_height - top_margin - bottom_margin
+    table.wrapOn(c, available_width, available_height)
+    
+    # Get actual table dimensions after wrapping
+    table_width = table._width
+    table_height = table._height
+
+    # Perfect horizontal and vertical centering as per project specifications
+    x = (page_width - table_width) / 2.0  # center horizontally
+    y = (page_height - table_height) / 2.0  # center vertically
+    table.drawOn(c, x, y)
+
+def page_canvas(dest, shared_forms: bool = False):
+    """
+    Canvas for page tables (A4 landscape) writing to dest, a file name or file object.
+    shared_forms (for multi-page documents) writes the furniture pages repeat once (see grid_canvas).
+    """
+    page_height, page_width = A4
+    return (FormCanvas if shared_forms else canvas.Canvas)(dest, pagesize=(page_width, page_height))
+
+def tables_to_pdf(tables, shared_forms: bool = False) -> bytes:
+    """Draw already laid-out page tables (see build_page_table) into a PDF, one table per page."""
+    buffer = io.BytesIO()
+    c = page_canvas(buffer, shared_forms)
+    for table in tables:
+        with span("draw"):
+            draw_page_table(c, table)
+        c.showPage()
+    with span("pdf save"):
+        c.save()
+    buffer.seek(0)
+    return buffer.getvalue()
+
+def record_page_table(table):
+    """Draw a laid-out page table as a page of a multi-page document, kept as a grid_canvas.PageDrawing."""
+    page_height, page_width = A4
+    c = RecordingCanvas(pagesize=(page_width, page_height))
+    draw_page_table(c, table)
+    return c.page()
+
+def build_page_outputs(serial_groups, header_map: dict = None, schema=None, col_widths=None,
+                       backend: str = PLATYPUS, with_pdf: bool = True):
+    """
+    Lay one page out once and return (its own PDF, or None without with_pdf,
+    its drawing for the combined document: place with grid_canvas.place_page).
+    """
+    table = build_page_table(serial_groups, header_map, schema, col_widths, backend)
+    return (tables_to_pdf([table]) if with_pdf else None), record_page_table(table)
+
+def build_single_page_pdf(serial_groups, header_map: dict = None, schema=None, col_widths=None,
+                          backend: str = PLATYPUS) -> bytes:
+    """
+    Build a single page PDF with multiple serial number groups.
+    Maximum 25 rows per page including headers, totals and spacing.
+    """
+    return tables_to_pdf([build_page_table(serial_groups, header_map, schema, col_widths, backend)])
+
+def build_combined_pdf(serial_groups, header_map: dict = None) -> bytes:
+    """
+    Build a combined PDF with multiple serial number groups.
+    Each group includes header + data rows + total row.
+    Maximum 22 rows per page including headers and totals.
+    Adds spacing (blank rows) between serial number groups.
+    """
+    # Use the single page function for backward compatibility
+    return build_single_page_pdf(serial_groups, header_map)
+
+def build_annexure_table(data, amount_pkr_col_idx, total_row_indices, header_row_indices=None, title_row_index=None):
+    """Build a ReportLab Table specifically for Annexure format with compact borders."""
+    
+    t = Table(data, repeatRows=1, rowHeights=[20] * len(data))
+    rows, cols = len(data), len(data[0])
+
+    # Handle total_row_indices as either single index or list of indices
+    if total_row_indices is None:
+        total_row_indices = []
+    elif isinstance(total_row_indices, int):
+        total_row_indices = [total_row_indices]
+    
+    # Handle header_row_indices as either single index or list of indices
+    if header_row_indices is None:
+        header_row_indices = []
+    elif isinstance(header_row_indices, int):
+        header_row_indices = [header_row_indices]
+
+    style = [
+        ("FONTNAME", (0, 0), (-1, -1), "Helvetica"),
+        ("FONTSIZE", (0, 0), (-1, -1), 10),
+        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 3),  # Compact padding
+        ("TOPPADDING", (0, 0), (-1, -1), 3),     # Compact padding
+    ]
+    
+    # Handle title row styling if present
+    if title_row_index is not None:
+        # Title row spans across columns, bold text
+        style.append(("FONTNAME", (0, title_row_index), (-1, title_row_index), "Helvetica-Bold"))
+        style.append(("FONTSIZE", (0, title_row_index), (-1, title_row_index), 12))
+        style.append(("ALIGN", (0, title_row_index), (0, title_row_index), "LEFT"))  # Title left aligned
+        style.append(("ALIGN", (-1, title_row_index), (-1, title_row_index), "RIGHT"))  # Date right aligned
+        # Add horizontal lines above and below title
+        style.append(("LINEABOVE", (0, title_row_index), (-1, title_row_index), 0.5, colors.black))
+        style.append(("LINEBELOW", (0, title_row_index), (-1, title_row_index), 0.5, colors.black))
+        # Remove borders for other cells in title row
+        for c in range(1, cols-1):
+            style.append(("LINEBEFORE", (c, title_row_index), (c, title_row_index), 0, colors.transparent))
+            style.append(("LINEAFTER", (c, title_row_index), (c, title_row_index), 0, colors.transparent))
+
+    # Right-align amount columns (7, 8, 9) and center Del.Challan/Date on data rows
+    skip_rows = list(header_row_indices) + list(total_row_indices)
+    if title_row_index is not None:
+        skip_rows.append(title_row_index)
+    style += compile_column_aligns(rows, {7: "RIGHT", 8: "RIGHT", 9: "RIGHT", 1: "CENTER", 6: "CENTER"},
+                                   skip_rows=skip_rows)
+    
+    # Add borders to all cells; the title row only boxes its first and last cell
+    title_cols = {title_row_index: {0, cols - 1}} if title_row_index is not None else None
+    style += compile_borders(rows, cols, partial_rows=title_cols)
+    
+    # Apply header row styling
+    for header_row_idx in header_row_indices:
+        style.append(("BACKGROUND", (0, header_row_idx), (-1, header_row_idx), colors.white))
+        style.append(("TEXTCOLOR", (0, header_row_idx), (-1, header_row_idx), colors.black))
+        style.append(("FONTNAME", (0, header_row_idx), (-1, header_row_idx), "Helvetica-Bold"))
+        style.append(("FONTSIZE", (0, header_row_idx), (-1, header_row_idx), 9))
+        style.append(("ALIGN", (0, header_row_idx), (-1, header_row_idx), "CENTER"))
+    
+    # Apply total row styling
+    for total_row_idx in total_row_indices:
+        style.append(("BACKGROUND", (0, total_row_idx), (-1, total_row_idx), colors.white))
+        style.append(("FONTNAME", (0, total_row_idx), (-1, total_row_idx), "Helvetica-Bold"))
+        style.append(("FONTSIZE", (0, total_row_idx), (-1, total_row_idx), 10))
+        # Right align amount columns in total row
+        style.append(("ALIGN", (7, total_row_idx), (9, total_row_idx), "RIGHT"))
+        # Center align the "Grand Total" text
+        style.append(("ALIGN", (6, total_row_idx), (6, total_row_idx), "CENTER"))
+
+    t.setStyle(TableStyle(style))
+    return t
+
+
+def build_annexure_pdf(df: pd.DataFrame, header_map: dict = None, schema=None, billing_date: date = None) -> bytes:
+    """
+    Build Annexure of Periodic Billing PDF that exactly matches the user's attached image.
+    Creates a standalone table with title, proper columns, and automatic tax calculations.
+    billing_date is printed in the title bar (None prints today's): pass it to
+    get the same bytes when the annexure is rendered again on another day.
+    """
+    buffer = io.BytesIO()
+    
+    # Page setup: the title bar sits a fixed 60 pt from the top, the table below it
+    side_margin = 20 * mm
+    page_height, page_width = A4  # A4 portrait
+    
+    c = canvas.Canvas(buffer, pagesize=(page_width, page_height))
+    
+    # Prepare table data exactly like the image
+    headers = [
+        "S.No.", "Del.Challan", "P.O #", "In-Bound #", "GR No.", "Plant", 
+        "Date", "Amount ( PKR )", "Sales Tax @ 18%", "Amount Incl Sales Tax"
+    ]
+    
+    # Column mappings in the Excel data (resolved once per upload)
+    if schema is None:
+        schema = resolve_column_schema(df.columns)
+    col_mapping = schema.annexure_columns
+    
+    # Build table data with calculations - GROUP BY SERIAL ENDING
+    table_data = [headers]
+    
+    # Group data by serial ending (last 2 digits), sorted by smallest Del.Challan number
+    with span("annexure aggregate"):
+        annexure_groups = aggregate_annexure(df, col_mapping)
+    
+    # Build table rows from grouped data
+    total_amount = 0.0
+    total_sales_tax = 0.0
+    total_incl_tax = 0.0
+    
+    row_num = 1
+    for group in annexure_groups:
+        # Calculate taxes for this group
+        amount = group['total_amount']
+        sales_tax = amount * 0.18
+        amount_incl_tax = amount + sales_tax
+        
+        # Update running totals
+        total_amount += amount
+        total_sales_tax += sales_tax
+        total_incl_tax += amount_incl_tax
+        
+        # Build combined info strings - SHOW UNIQUE VALUES ONLY ONCE
+        # Del.Challan: Show unique value only once
+        # First-seen order: a set's order changes with the hash seed, and with it the PDF
+        unique_challans = list(dict.fromkeys(group['serial_numbers']))
+        if len(unique_challans) == 1:
+            challan_combined = unique_challans[0]  # Show single value
+        else:
+            challan_combined = ', '.join(unique_challans[:2])  # Show first 2 unique
+            if len(unique_challans) > 2:
+                challan_combined += f" (+{len(unique_challans)-2} more)"
+            
+        # P.O #: Show ONLY the first unique value (no multiple values, no +more)
+        if len(group['po_numbers']) >= 1:
+            po_combined = group['po_numbers'][0]  # Show ONLY first value
+        else:
+            po_combined = ''  # Empty if no P.O # data
+            
+        inbound_combined = ', '.join(group['inbound_numbers'][:2]) if group['inbound_numbers'] else ''
+        if len(group['inbound_numbers']) > 2:
+            inbound_combined += " (+more)"
+            
+        gr_combined = ', '.join(group['gr_numbers'][:2]) if group['gr_numbers'] else ''
+        if len(group['gr_numbers']) > 2:
+            gr_combined += " (+more)"
+            
+        plant_combined = ', '.join(group['plants']) if group['plants'] else ''
+        
+        # Date: Show the first date from the group (instead of combined)
+        if group['dates']:
+            date_combined = group['dates'][0]  # Show only the first date
+        else:
+            # If no dates found, try to get any date from the original data
+            date_combined = "No Date"  # Temporary debug text
+        
+        # Build row data for this serial ending group
+        row_data = [
+            str(row_num),  # S.No.
+            challan_combined,  # Del.Challan (combined)
+            po_combined,  # P.O # (combined)
+            inbound_combined,  # In-Bound # (combined)
+            gr_combined,  # GR No. (combined)
+            plant_combined,  # Plant (combined)
+            date_combined,  # Date (combined)
+            f"{amount:,.2f}",  # Amount (PKR) - SUMMED
+            f"{sales_tax:,.2f}",  # Sales Tax @18%
+            f"{amount_incl_tax:,.2f}"  # Amount Incl Sales Tax
+        ]
+        table_data.append(row_data)
+        row_num += 1
+    
+    # Add Grand Total row exactly like in the image
+    grand_total_row = [
+        "", "", "", "", "", "", "Grand Total",
+        f"{total_amount:,.2f}",
+        f"{total_sales_tax:,.2f}",
+        f"{total_incl_tax:,.2f}"
+    ]
+    table_data.append(grand_total_row)
+    
+    # Create table with proper styling like the image
+    table = Table(table_data, rowHeights=[24] * len(table_data))  # Increased from 20 to 24
+    
+    # Apply styling exactly like in the image
+    style_commands = [
+        # Basic formatting
+        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),  # Changed to Bold
+        ('FONTSIZE', (0, 0), (-1, -1), 11),  # Increased from 9 to 11
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 4),  # Increased padding for better spacing
+        ('TOPPADDING', (0, 0), (-1, -1), 4),     # Increased padding for better spacing
+        
+        # Header row styling
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 11),  # Increased from 9 to 11
+        ('BACKGROUND', (0, 0), (-1, 0), colors.white),
+        
+        # Apply individual cell borders (like regular mode)
+        # Grid is removed - borders applied individually with skip logic below
+        
+        # Right align amount columns (7, 8, 9) for data rows
+        ('ALIGN', (7, 1), (9, -2), 'RIGHT'),  # Data rows only
+        
+        # Center align Del.Challan and P.O # columns
+        ('ALIGN', (1, 1), (1, -2), 'CENTER'),  # Del.Challan column
+        ('ALIGN', (2, 1), (2, -2), 'CENTER'),  # P.O # column
+        
+        # Grand Total row styling
+        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, -1), (-1, -1), 12),  # Increased from 9 to 12 for total row
+        ('BACKGROUND', (0, -1), (-1, -1), colors.white),
+        ('ALIGN', (6, -1), (6, -1), 'CENTER'),  # "Grand Total" text
+        ('ALIGN', (7, -1), (9, -1), 'RIGHT'),  # Amount columns in total row
+    ]
+    
+    # Apply cell borders with skip logic (same as regular mode)
+    # For Annexure: skip columns 0,1,2,3,4,5 in Grand Total row (only show 6,7,8,9)
+    rows, cols = len(table_data), len(table_data[0])
+    style_commands += compile_borders(rows, cols, partial_rows={rows - 1: {6, 7, 8, 9}})
+    
+    table.setStyle(TableStyle(style_commands))
+    
+    # First, wrap table to get its actual dimensions
+    available_width = page_width - 2 * side_margin
+    table.wrapOn(c, available_width, page_height)
+    
+    # Get actual table dimensions after wrapping
+    table_width, table_height = table.wrap(available_width, page_height)
+    
+    # Now draw title section with same width as table
+    title_y = page_height - 60
+    
+    # Calculate table position for title bar alignment
+    table_x = (page_width - table_width) / 2.0
+    
+    # Draw title bar with borders (same width as table)
+    title_bar_height = 25
+    
+    # Draw title bar background and borders
+    c.setLineWidth(0.5)
+    c.rect(table_x, title_y - 5, table_width, title_bar_height, stroke=1, fill=0)
+    
+    # Draw title on left within the bar
+    c.setFont("Helvetica-Bold", 12)
+    title_text = "ANNEXURE OF PERIODIC BILLING"
+    c.drawString(table_x + 5, title_y + 5, title_text)
+    
+    # Draw date on right within the bar
+    date_text = f"Date : {(billing_date or date.today()).strftime('%d-%m-%y')}"
+    c.setFont("Helvetica-Bold", 10)
+    date_width = c.stringWidth(date_text, "Helvetica-Bold", 10)
+    c.drawString(table_x + table_width - date_width - 5, title_y + 5, date_text)
+    
+    # Position table on page - below the title bar
+    table_y_position = title_y - 13  # Position below title bar
+    y = table_y_position - table_height
+    
+    table.drawOn(c, table_x, y)
+    
+    c.showPage()
+    c.save()
+    buffer.seek(0)
+    return buffer.getvalue()
+
+
+def build_multi_page_pdf(page_groups, header_map: dict = None, schema=None, col_widths=None,
+                         backend: str = PLATYPUS) -> bytes:
+    """
+    Build a multi-page PDF document where each page contains one or more serial groups.
+    Each page is treated as a slide in the final document.
+    When the pages were already laid out for per-page PDFs, pass those tables
+    to tables_to_pdf instead so nothing is rendered twice.
+    """
+    return tables_to_pdf((build_page_table(page_serials, header_map, schema, col_widths, backend)
+                          for page_serials in page_groups), shared_forms=True)
+
+
+def plan_table_widths(df: pd.DataFrame, cells, plan, header_map: dict = None, schema=None, amounts=None) -> list:
+    """
+    Fixed column widths for every page of plan (see column_widths.py):
+    headers, the formatted cells and every total and subtotal row the pages print.
+    """
+    if schema is None:
+        schema = resolve_column_schema(df.columns)
+    headers = list(df.columns)
+    if header_map:
+        headers = [header_map.get(h, h) for h in headers]
+    headers = clip_row(headers, schema)
+
+    # Total rows, column by column; later entries win like in total_row_for
+    totals = {}
+    if schema.amount_pkr is not None and plan.num_pages:
+        groups = plan.groups
+        if schema.inbound is not None:
+            last_rows = groups.positions[groups.offsets[plan.piece_group] + plan.piece_stop - 1]
+            inbound = pd.unique(df.iloc[last_rows, schema.inbound].to_numpy(dtype=object))
+            totals[schema.inbound] = [clip_text(value) for value in inbound]
+        if len(df.columns) >= 5:
+            split = plan.piece_parts > 1
+            totals[4] = ["Total"] + ([SUBTOTAL_LABEL, BROUGHT_FORWARD_LABEL] if split.any() else [])
+        if plan.piece_total is not None:
+            amounts_shown = np.concatenate([plan.piece_total, plan.carried])
+        else:
+            # A plan made without amounts: total its pieces like plan_pages does
+            if amounts is None:
+                amounts = amount_values(df, schema)
+            values, scale = fixed_point(amounts)
+            amounts_shown = segment_totals(values[groups.positions],
+                                           groups.offsets[plan.piece_group] + plan.piece_start) / scale
+        totals[schema.amount_pkr] = [f"{value:,.2f}" for value in np.unique(amounts_shown)]
+        for blank_idx in schema.total_blank:
+            totals.pop(blank_idx, None)
+    return plan_column_widths(cells, headers, schema, totals)
+
+def paged_dataframe_pdf(df: pd.DataFrame, header_map: dict = None, schema=None) -> bytes:
+    """
+    A frame too tall for one page as a single group split across pages (see
+    pagination.plan_pages): header on every page, running subtotals carried
+    forward. Pages are laid out and drawn one at a time.
+    """
+    if schema is None:
+        schema = resolve_column_schema(df.columns)
+    amounts = amount_values(df, schema)
+    plan = plan_pages(one_group(len(df)), amounts=amounts)
+    cells = format_cells(df, schema)
+    col_widths = plan_table_widths(df, cells, plan, header_map, schema, amounts)
+
+    buffer = io.BytesIO()
+    c = page_canvas(buffer, shared_forms=True)
+    for page_serials in plan.iter_page_groups(df, cells):
+        draw_page_table(c, build_page_table(page_serials, header_map, schema, col_widths))
+        c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+def dataframe_to_pdf_buffer(df: pd.DataFrame, header_map: dict = None, schema=None) -> bytes:
+    """
+    Convert a DataFrame to a styled PDF buffer.
+    Pass header_map={old_name: new_name} to change headers only in the PDF.
+    Frames taller than a page are paged (see paged_dataframe_pdf).
+    """
+    if schema is None:
+        schema = resolve_column_schema(df.columns)
+    if len(df) + 2 > MAX_ROWS_PER_PAGE:
+        return paged_dataframe_pdf(df, header_map, schema)
+
+    buffer = io.BytesIO()
+
+    headers = list(df.columns)
+    if header_map:
+        headers = [header_map.get(h, h) for h in headers]
+
+    # Format data with proper date handling
+    cells = format_cells(df, schema)
+    data = [clip_row(headers, schema)] + cells.tolist()
+
+    amount_pkr_col_idx = schema.amount_pkr
+
+    # Amounts are parsed once: the plan totals them for the total row and the widths
+    plan = plan_pages(one_group(len(df)), amounts=amount_values(df, schema)) if len(df) else None
+    if amount_pkr_col_idx is not None:
+        total_amount = plan.piece_total[0] if plan is not None else 0.0
+        data.append(total_row_for(df, schema, total_amount))
+
+    has_total_row = amount_pkr_col_idx is not None and len(data) > len(df) + 1
+    total_row_idx = len(data) - 1 if has_total_row else None
+
+    # Fixed widths when the rows are styled like a page table (header row at 9 pt)
+    col_widths = None
+    if total_row_idx and len(df):
+        col_widths = plan_table_widths(df, cells, plan, header_map, schema)
+
+    table = build_table(data, df, amount_pkr_col_idx, total_row_idx, [0] if total_row_idx else None, schema=schema,
+                        col_widths=col_widths)
+
+    side_margin, top_margin, bottom_margin = 20 * mm, 20 * mm, 20 * mm
+    
+    # Use A4 page size in landscape orientation
+    page_height, page_width = A4  # Swap width and height for landscape
+
+    c = canvas.Canvas(buffer, pagesize=(page_width, page_height))
+    
+    # Lay the table out once and get its dimensions
+    tw, th = table.wrapOn(c, page_width - side_margin * 2, page_height - top_margin - bottom_margin)
+    
+    # If table is wider than A4, scale it to fit
+    if tw > page_width - side_margin * 2:
+        scale_factor = (page_width - side_margin * 2) / tw
+        table._width = tw * scale_factor
+    
+    # Get actual table dimensions after wrapping
+    table_width = table._width
+    table_height = table._height
+    
+    # Center table both horizontally and vertically
+    x = (page_width - table_width) / 2.0  # center horizontally
+    y = (page_height - table_height) / 2.0  # center vertically on entire page
+    table.drawOn(c, x, y)
+    c.showPage()
+    c.save()
+    buffer.seek(0)
+    return buffer.getvalue()
@@ -0,0 +1,234 @@
+"""
+Background jobs for long runs, queued by every session of the app.
+
+    manager = JobManager(max_workers=default_job_workers(), per_owner=1)
+    job = manager.submit(key, "invoice.xlsx", work, *args, owner=session)   # work(job, *args)
+    manager.get(job.id, owner=session).status / .done / .total / .stage
+    with manager.reading(job.id, owner=session) as job: ... job.result ...
+    job.cancel()
+
+Jobs run on a small thread pool, so a large upload no longer holds a
+Streamlit script thread: the session only keeps the job id and polls the
+job's progress. Each owner runs at most per_owner jobs at a time and the
+rest of its jobs wait, so one session's queue of large runs does not hold
+up another session's: a freed thread goes to the oldest waiting job whose
+owner is under its share. work() reports progress with
+job.report() and calls job.check() between units of work, which raises
+JobCancelled once cancel() was called; cancellation is cooperative.
+A job belongs to the session that submitted it (owner): looking it up
+with another owner finds nothing, so a job id alone does not reveal its
+results. Finished jobs stay retrievable until max_finished newer jobs have
+finished; then their result is closed, or, while a session is still
+reading it (JobManager.reading), as soon as the last reader is done.
+"""
+import os
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+JOB_WORKERS_ENV = "INVOICE_JOB_WORKERS"
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+def default_job_workers() -> int:
+    """INVOICE_JOB_WORKERS, else one thread per CPU between 2 and 4: two sessions always run side by side."""
+    configured = os.getenv(JOB_WORKERS_ENV)
+    if configured:
+        return max(1, int(configured))
+    return max(2, min(4, os.cpu_count() or 1))
+
+
+class JobCancelled(Exception):
+    """Raised by Job.check() in a job whose cancel() was called."""
+
+
+class Job:
+    """One unit of background work and its progress, safe to read from any thread."""
+
+    def __init__(self, key, label: str = "", owner: str = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.key = key
+        self.label = label
+        self.owner = owner
+        self.status = QUEUED
+        self.stage = "Queued"
+        self.done = 0
+        self.total = 0
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = self.finished = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._readers = 0
+        self._dropped = False
+
+    def report(self, stage: str = None, done: int = None, total: int = None):
+        if stage is not None:
+            self.stage = stage
+        if total is not None:
+            self.total = total
+        if done is not None:
+            self.done = done
+
+    @property
+    def fraction(self) -> float:
+        return min(self.done / self.total, 1.0) if self.total else 0.0
+
+    @property
+    def finished_ok(self) -> bool:
+        return self.status == DONE
+
+    @property
+    def active(self) -> bool:
+        return self.status not in FINISHED
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancel_event(self) -> threading.Event:
+        """Set once cancel() is called; hand it to helpers that stop on their own (e.g. UploadPool)."""
+        return self._cancel
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def check(self):
+        """Raise JobCancelled if cancel() was called."""
+        if self._cancel.is_set():
+            raise JobCancelled(self.id)
+
+    def _hold(self):
+        with self._lock:
+            self._readers += 1
+
+    def _release(self):
+        with self._lock:
+            self._readers -= 1
+            close = self._dropped and not self._readers
+        if close:
+            self._close_result()
+
+    def close(self):
+        """Release the result's resources (spooled files), now or when its last reader is done."""
+        with self._lock:
+            self._dropped = True
+            if self._readers:
+                return
+        self._close_result()
+
+    def _close_result(self):
+        close = getattr(self.result, "close", None)
+        if close is not None:
+            close()
+
+
+class JobManager:
+    """
+    Runs jobs on max_workers threads, at most per_owner of one owner's at a
+    time, and keeps the last max_finished finished ones.
+    """
+
+    def __init__(self, max_workers: int = 1, max_finished: int = 8, per_owner: int = 1):
+        self.max_workers = max_workers
+        self.max_finished = max_finished
+        self.per_owner = per_owner
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = OrderedDict()
+        self._waiting = []               # (job, work, args, kwargs) not started yet, oldest first
+        self._running = Counter()        # owner -> jobs on a thread
+        self._lock = threading.Lock()
+
+    def submit(self, key, label: str, work, *args, owner: str = None, **kwargs) -> Job:
+        """Queue work(job, *args, **kwargs) for owner; its return value becomes job.result."""
+        job = Job(key, label, owner)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._waiting.append((job, work, args, kwargs))
+            self._start_waiting()
+        return job
+
+    def _start_waiting(self):
+        """Hand free threads to the oldest waiting jobs whose owners are under their share (holding _lock)."""
+        for entry in list(self._waiting):
+            if sum(self._running.values()) >= self.max_workers:
+                break
+            job = entry[0]
+            if self._running[job.owner] >= self.per_owner and not job.cancelled:
+                continue
+            self._waiting.remove(entry)
+            self._running[job.owner] += 1
+            self._executor.submit(self._run, *entry)
+
+    def _run(self, job: Job, work, args, kwargs):
+        job.started = time.time()
+        try:
+            job.check()
+            job.status = RUNNING
+            job.result = work(job, *args, **kwargs)
+            job.status = DONE
+            job.stage = "Done"
+        except JobCancelled:
+            job.status = CANCELLED
+            job.stage = "Cancelled"
+        except Exception as e:
+            job.error = e
+            job.status = FAILED
+            job.stage = "Failed"
+        finally:
+            job.finished = time.time()
+            with self._lock:
+                self._running[job.owner] -= 1
+                self._start_waiting()
+            self._evict()
+
+    def _evict(self):
+        with self._lock:
+            finished = [job for job in self._jobs.values() if not job.active]
+            evicted = finished[:max(len(finished) - self.max_finished, 0)]
+            for job in evicted:
+                del self._jobs[job.id]
+        for job in evicted:
+            job.close()
+
+    def _find(self, job_id: str, owner: str) -> Job:
+        job = self._jobs.get(job_id)
+        return job if job is not None and job.owner == owner else None
+
+    def get(self, job_id: str, owner: str = None) -> Job:
+        """The job if it is still kept and belongs to owner, else None."""
+        with self._lock:
+            return self._find(job_id, owner)
+
+    @contextmanager
+    def reading(self, job_id: str, owner: str = None):
+        """
+        get(), with the job's result held open until the block ends: evicting
+        it meanwhile defers closing its spooled files until then.
+        """
+        with self._lock:
+            job = self._find(job_id, owner)
+            if job is not None:
+                job._hold()
+        try:
+            yield job
+        finally:
+            if job is not None:
+                job._release()
+
+    def queue_position(self, job: Job) -> int:
+        """Jobs submitted before job that have not finished (0 once it is running)."""
+        with self._lock:
+            ahead = 0
+            for other in self._jobs.values():
+                if other is job:
+                    return ahead if job.status == QUEUED else 0
+                ahead += other.active
+        return 0
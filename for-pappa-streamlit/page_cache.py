@@ -0,0 +1,198 @@
+"""
+Content fingerprints for incremental reprocessing of re-uploaded workbooks.
+
+Every serial group is fingerprinted by its rows (one hash_pandas_object pass
+over the upload) and the column names; every page by the fingerprints of the
+pieces on it plus a layout fingerprint (header map, column schema, planned
+column widths, ReportLab settings and the source of the PDF builders and
+every app module they import). A page whose fingerprint was rendered before
+is served from PageCache instead of being drawn again, and UploadManifest
+remembers which Cloudinary URL already holds the PDF (or a group's XLSX) for
+a fingerprint, so a corrected workbook only renders and uploads the pages
+whose groups changed.
+
+Column widths are planned over the whole upload (see column_widths.py): an
+edit that widens a column changes the layout, and with it every page.
+"""
+import ast
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+PAGE_CACHE_ENV = "INVOICE_PAGE_CACHE"
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".page_cache")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# The page builders: their source and that of every app module they import decides what a page looks like
+LAYOUT_ROOT = "invoice_pdf"
+
+
+def _digest(*parts) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else repr(part).encode())
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+@lru_cache(maxsize=1)
+def layout_modules() -> tuple:
+    """File names of LAYOUT_ROOT and the app modules it imports, directly or not (function-level imports too)."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    found, todo = set(), [LAYOUT_ROOT]
+    while todo:
+        name = todo.pop()
+        path = os.path.join(here, f"{name}.py")
+        if name in found or not os.path.exists(path):
+            continue   # seen already, or a library
+        found.add(name)
+        with open(path, "rb") as f:
+            tree = ast.parse(f.read())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                todo.extend(alias.name.split(".")[0] for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                todo.append(node.module.split(".")[0])
+    return tuple(sorted(f"{name}.py" for name in found))
+
+
+@lru_cache(maxsize=1)
+def builder_source_digest() -> str:
+    """Digest of the PDF builders' source, so changing the code invalidates cached pages."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    return _digest(*(open(os.path.join(here, name), "rb").read() for name in layout_modules()))
+
+
+def layout_fingerprint(header_map: dict, schema, col_widths, backend: str = "platypus") -> str:
+    """Everything besides the rows that changes a rendered page."""
+    from reportlab import Version
+    from pdf_profile import active
+    return _digest(builder_source_digest(), Version, active(),
+                   sorted((header_map or {}).items()), schema, list(col_widths or ()), backend)
+
+
+def group_fingerprints(df: pd.DataFrame, groups) -> list:
+    """One fingerprint per serial group (pagination.SerialGroups) of df, from its rows' content."""
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    columns = _digest(list(df.columns), [str(dtype) for dtype in df.dtypes])
+    grouped = row_hashes[groups.positions]
+    return [_digest(columns, grouped[start:stop].tobytes())
+            for start, stop in zip(groups.offsets[:-1], groups.offsets[1:])]
+
+
+def page_fingerprints(plan, group_fps: list, layout_fp: str) -> list:
+    """One fingerprint per page of plan: its pieces (group, slice, part) and the layout."""
+    carried = plan.carried if plan.carried is not None else np.zeros(len(plan.piece_group))
+    fingerprints = []
+    for page_idx in range(plan.num_pages):
+        pieces = [(group_fps[plan.piece_group[i]], int(plan.piece_start[i]), int(plan.piece_stop[i]),
+                   int(plan.piece_part[i]), int(plan.piece_parts[i]), float(carried[i]))
+                  for i in plan.piece_range(page_idx)]
+        fingerprints.append(_digest(layout_fp, pieces))
+    return fingerprints
+
+
+def document_fingerprint(page_fps: list) -> str:
+    """Fingerprint of the combined document of these pages."""
+    return _digest("document", page_fps)
+
+
+class PageCache:
+    """
+    Rendered PDFs on disk, one file per fingerprint, shared by every session
+    and process. Least recently used files are removed past max_bytes.
+    """
+
+    def __init__(self, directory: str = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory or os.getenv(PAGE_CACHE_ENV) or DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, fingerprint: str) -> str:
+        return os.path.join(self.directory, f"{fingerprint}.pdf")
+
+    def __contains__(self, fingerprint: str) -> bool:
+        return os.path.exists(self._path(fingerprint))
+
+    def get(self, fingerprint: str) -> bytes:
+        """The cached PDF, or None (also when another process just pruned it)."""
+        path = self._path(fingerprint)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)   # mark as recently used
+        except OSError:
+            return None
+        return data
+
+    def put(self, fingerprint: str, pdf_bytes: bytes):
+        path = self._path(fingerprint)
+        # Per process and thread: jobs of two sessions may store the same page at once
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(pdf_bytes)
+        os.replace(tmp, path)
+
+    def prune(self) -> int:
+        """Remove least recently used PDFs until the cache fits max_bytes; returns files removed."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".pdf"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+
+class UploadManifest:
+    """Fingerprint -> uploaded URL, per kind ("pdf", "xlsx") and Cloudinary account, in SQLite."""
+
+    def __init__(self, path: str = None):
+        if path is None:
+            directory = os.getenv(PAGE_CACHE_ENV) or DEFAULT_CACHE_DIR
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, "manifest.sqlite3")
+        self.path = path
+        with self._connect() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS uploads ("
+                       "account TEXT, kind TEXT, fingerprint TEXT, url TEXT, uploaded REAL, "
+                       "PRIMARY KEY (account, kind, fingerprint))")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    def lookup(self, account: str, kind: str, fingerprints) -> dict:
+        """{fingerprint: url} for the fingerprints already uploaded."""
+        fingerprints = list(set(fingerprints))
+        found = {}
+        with self._connect() as db:
+            # Stay under SQLite's bound-parameter limit
+            for i in range(0, len(fingerprints), 500):
+                chunk = fingerprints[i:i + 500]
+                rows = db.execute(f"SELECT fingerprint, url FROM uploads WHERE account = ? AND kind = ? "
+                                  f"AND fingerprint IN ({','.join('?' * len(chunk))})", [account, kind, *chunk])
+                found.update(rows.fetchall())
+        return found
+
+    def record(self, account: str, kind: str, urls: dict):
+        """Remember {fingerprint: url} uploads."""
+        now = time.time()
+        with self._connect() as db:
+            db.executemany("INSERT OR REPLACE INTO uploads VALUES (?, ?, ?, ?, ?)",
+                           [(account, kind, fp, url, now) for fp, url in urls.items()])
@@ -0,0 +1,204 @@
+"""
+Grouping and page planning for the XLSX → grouped PDF flow.
+
+Rows are grouped by serial with one factorize pass, and pages are planned as
+ranges of pieces: a piece is a whole group, or one page-sized slice of a group
+too tall for a page. No per-group DataFrame is created until a page is
+actually rendered (see PagePlan.page_groups), so even a single group of tens
+of thousands of rows is materialized one page at a time.
+
+Every table row is ROW_HEIGHT points tall (build_table sets fixed rowHeights;
+the cell padding sits inside them), so a page's height budget is a row count.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from amounts import fixed_point, segment_totals
+
+ROW_HEIGHT = 20
+PAGE_TABLE_HEIGHT = 500   # points; leaves ~17 mm above and below on A4 landscape (595 pt)
+MAX_ROWS_PER_PAGE = PAGE_TABLE_HEIGHT // ROW_HEIGHT
+GROUP_SPACING_ROWS = 4  # blank rows between groups on the same page
+
+
+@dataclass(frozen=True)
+class SerialGroups:
+    """Rows of a DataFrame grouped by serial, in first-appearance order."""
+    serials: np.ndarray       # serial label per group
+    sizes: np.ndarray         # row count per group
+    offsets: np.ndarray       # group g owns positions[offsets[g]:offsets[g + 1]]
+    positions: np.ndarray     # row positions, grouped and in original order
+
+    def __len__(self):
+        return len(self.serials)
+
+    def rows_of(self, group_idx: int) -> np.ndarray:
+        """Row positions (iloc) belonging to one group."""
+        return self.positions[self.offsets[group_idx]:self.offsets[group_idx + 1]]
+
+
+@dataclass(frozen=True)
+class PagePlan:
+    """
+    Pages as contiguous runs of pieces: page p holds pieces page_offsets[p]:page_offsets[p + 1].
+    Piece i is rows piece_start[i]:piece_stop[i] of group piece_group[i], part
+    piece_part[i] of piece_parts[i]; carried[i] is the group's amount total
+    before the piece and piece_total[i] the total through its last row, which
+    the piece's total row prints (both None when the plan was made without
+    amounts).
+    """
+    groups: SerialGroups
+    page_offsets: np.ndarray
+    piece_group: np.ndarray
+    piece_start: np.ndarray
+    piece_stop: np.ndarray
+    piece_part: np.ndarray
+    piece_parts: np.ndarray
+    carried: np.ndarray = None
+    piece_total: np.ndarray = None
+
+    @property
+    def num_pages(self) -> int:
+        return len(self.page_offsets) - 1
+
+    def piece_range(self, page_idx: int) -> range:
+        return range(self.page_offsets[page_idx], self.page_offsets[page_idx + 1])
+
+    def serials_on(self, page_idx: int) -> list:
+        return [str(self.groups.serials[self.piece_group[i]]) for i in self.piece_range(page_idx)]
+
+    def rows_on(self, page_idx: int) -> int:
+        pieces = slice(self.page_offsets[page_idx], self.page_offsets[page_idx + 1])
+        return int((self.piece_stop[pieces] - self.piece_start[pieces]).sum())
+
+    def page_groups(self, df: pd.DataFrame, page_idx: int, cells=None) -> list:
+        """
+        Materialize one page as the list of {'serial', 'df', 'row_indices'} dicts the PDF builders take.
+        Pass the upload's formatted cells (formatting.format_cells) to attach each group's display rows.
+        A slice of a split group also carries 'group' (its index), 'part' and
+        'parts' (1-based) and, when the plan has amounts, 'carried'. With
+        amounts every group also carries the 'total' its total row prints.
+        """
+        page = []
+        for i in self.piece_range(page_idx):
+            g = self.piece_group[i]
+            rows = self.groups.rows_of(g)[self.piece_start[i]:self.piece_stop[i]]
+            group_df = df.iloc[rows].copy()
+            group = {
+                'serial': str(self.groups.serials[g]),
+                'df': group_df,
+                'row_indices': list(group_df.index),
+            }
+            if cells is not None:
+                group['cells'] = cells[rows].tolist()
+            if self.piece_total is not None:
+                group['total'] = float(self.piece_total[i])
+            if self.piece_parts[i] > 1:
+                group.update(group=int(g), part=int(self.piece_part[i]), parts=int(self.piece_parts[i]))
+                if self.carried is not None:
+                    group['carried'] = float(self.carried[i])
+            page.append(group)
+        return page
+
+    def iter_page_groups(self, df: pd.DataFrame, cells=None):
+        """Yield materialized pages one at a time."""
+        for page_idx in range(self.num_pages):
+            yield self.page_groups(df, page_idx, cells)
+
+
+def group_by_serial(df: pd.DataFrame, serial_column: str) -> SerialGroups:
+    """
+    Group row positions by the stripped string value of serial_column.
+    Empty serials are dropped; groups keep first-appearance order.
+    """
+    serial_values = df[serial_column].astype(str).fillna("").str.strip()
+    codes, uniques = pd.factorize(serial_values, sort=False)
+    uniques = np.asarray(uniques, dtype=object)
+
+    # Drop the empty-string group (if any) by marking its rows as missing
+    empty = np.flatnonzero(uniques == "")
+    if len(empty):
+        empty_code = empty[0]
+        codes = np.where(codes == empty_code, -1, np.where(codes > empty_code, codes - 1, codes))
+        uniques = np.delete(uniques, empty_code)
+
+    valid = codes >= 0
+    positions = np.flatnonzero(valid)
+    order = np.argsort(codes[valid], kind="stable")
+    sizes = np.bincount(codes[valid], minlength=len(uniques))
+    offsets = np.concatenate(([0], np.cumsum(sizes)))
+
+    return SerialGroups(serials=uniques, sizes=sizes, offsets=offsets, positions=positions[order])
+
+
+def one_group(n_rows: int, serial: str = "") -> SerialGroups:
+    """All rows of a frame as a single group (for paging a plain table)."""
+    return SerialGroups(serials=np.array([serial], dtype=object), sizes=np.array([n_rows]),
+                        offsets=np.array([0, n_rows]), positions=np.arange(n_rows))
+
+
+def split_group(n_rows: int, max_rows_per_page: int = MAX_ROWS_PER_PAGE) -> list:
+    """
+    (start, stop) row slices of a group too tall for one page. Each slice gets a
+    page with the header and a subtotal row; every slice after the first also
+    has a brought-forward row.
+    """
+    first, more = max_rows_per_page - 2, max_rows_per_page - 3
+    bounds = [0] + list(range(first, n_rows, more)) + [n_rows]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def plan_pages(groups: SerialGroups, max_rows_per_page: int = MAX_ROWS_PER_PAGE,
+               amounts=None, split: bool = True) -> PagePlan:
+    """
+    Greedily pack consecutive groups onto pages.
+    Each group needs header + data rows + total row, plus spacing rows when it
+    is not the first group on its page. A group taller than a page is split
+    into page-sized pieces, one page each (with split=False it gets one
+    overflowing page, the old layout). Pass amounts (numeric, one per row of
+    the frame, see amounts.amount_values) to total every piece in one pass,
+    with its brought-forward subtotal.
+    """
+    needed = (groups.sizes + 2).tolist()
+    page_offsets = [0]
+    pieces = []   # (group, start, stop, part, parts)
+    current_rows = 0
+    for g, group_rows in enumerate(needed):
+        if split and group_rows > max_rows_per_page:
+            # Close the current page, then one page per slice
+            if current_rows:
+                page_offsets.append(len(pieces))
+            slices = split_group(group_rows - 2, max_rows_per_page)
+            for part, (start, stop) in enumerate(slices, start=1):
+                pieces.append((g, start, stop, part, len(slices)))
+                page_offsets.append(len(pieces))
+            current_rows = 0
+            continue
+        spacing = GROUP_SPACING_ROWS if current_rows else 0
+        if current_rows and current_rows + group_rows + spacing > max_rows_per_page:
+            page_offsets.append(len(pieces))
+            current_rows = 0
+            spacing = 0
+        pieces.append((g, 0, group_rows - 2, 1, 1))
+        current_rows += group_rows + spacing
+    if current_rows:
+        page_offsets.append(len(pieces))
+
+    columns = np.asarray(pieces, dtype=np.int64).reshape(-1, 5).T
+    carried = piece_total = None
+    if amounts is not None:
+        # Pieces tile the grouped rows in order: one segmented sum totals them all
+        values, scale = fixed_point(amounts)
+        sums = segment_totals(values[groups.positions], groups.offsets[columns[0]] + columns[1])
+        # A split group's slices carry the sum of the slices before them
+        carried = np.zeros_like(sums)
+        for i in np.flatnonzero(columns[3] > 1):
+            carried[i] = carried[i - 1] + sums[i - 1]
+        piece_total = (carried + sums) / scale
+        carried = carried / scale
+
+    return PagePlan(groups=groups, page_offsets=np.asarray(page_offsets, dtype=np.int64),
+                    piece_group=columns[0], piece_start=columns[1], piece_stop=columns[2],
+                    piece_part=columns[3], piece_parts=columns[4], carried=carried, piece_total=piece_total)
@@ -0,0 +1,53 @@
+"""
+PDF rendering profiles: how the builders' canvases write their bytes.
+
+    compact    page streams compressed and ReportLab's invariant mode (a
+               fixed creation date and document ID), so the same input
+               always gives the same bytes: PDFs can be deduplicated by
+               content hash and compared against golden files
+    reportlab  ReportLab's shipped defaults: every file carries its
+               creation time and a document ID derived from it
+
+A profile is applied to reportlab.rl_config, which every Canvas reads when
+it is created, so use() once per process covers every builder (page
+tables, multi-page documents, annexure, dataframe PDFs). render_pool hands
+the parent's active() profile to its workers and page_cache fingerprints
+include it, so cached pages never mix profiles.
+
+A profile only fixes what ReportLab writes; what a builder prints is its
+input. The annexure prints a billing date (today's unless the caller
+passes one), so it reproduces across days only when the date is given.
+"""
+from dataclasses import dataclass
+
+DEFAULT_PROFILE = "compact"
+
+
+@dataclass(frozen=True)
+class PdfProfile:
+    page_compression: bool = True
+    invariant: bool = True
+
+
+PROFILES = {
+    "compact": PdfProfile(page_compression=True, invariant=True),
+    "reportlab": PdfProfile(page_compression=True, invariant=False),
+}
+
+
+def use(profile=DEFAULT_PROFILE) -> PdfProfile:
+    """Make profile (a PdfProfile or a PROFILES name) the one this process renders with."""
+    from reportlab import rl_config
+    if isinstance(profile, str):
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown PDF profile {profile!r}, expected one of {', '.join(PROFILES)}")
+        profile = PROFILES[profile]
+    rl_config.pageCompression = int(profile.page_compression)
+    rl_config.invariant = int(profile.invariant)
+    return profile
+
+
+def active() -> PdfProfile:
+    """The profile new canvases in this process are created with."""
+    from reportlab import rl_config
+    return PdfProfile(page_compression=bool(rl_config.pageCompression), invariant=bool(rl_config.invariant))
@@ -0,0 +1,196 @@
+"""
+Per-stage timing (and optional memory) for one run of the generator.
+
+    recorder = Recorder(memory=True)
+    with recorder.activate():
+        with span("read"):
+            ...
+
+span() is called at fixed points in the app, pipeline and PDF builders.
+With no recorder active in the current context it returns one shared no-op
+context manager, so instrumented code costs a ContextVar lookup per call.
+Spans with the same name are aggregated (calls, total and slowest time);
+nested spans are counted in their parent's time too, and keep their depth.
+With memory=True each top-level span also records its tracemalloc peak.
+
+A finished run is logged as one JSON line (logger "invoice.perf", or the
+file in INVOICE_PERF_LOG) and kept in a small SQLite history (PerfHistory)
+for trend charts. Work on other threads or processes (uploads, render pool)
+is not traced; callers add it with Recorder.add().
+"""
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+import tracemalloc
+from contextvars import ContextVar
+
+PERF_LOG_ENV = "INVOICE_PERF_LOG"
+PERF_DB_ENV = "INVOICE_PERF_DB"
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".perf_history.sqlite3")
+
+_current = ContextVar("perf_recorder", default=None)
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+def active_recorder():
+    """The Recorder span() reports to in this context, or None."""
+    return _current.get()
+
+
+def span(name: str):
+    """Time a block under name in the active recorder; a no-op when none is active."""
+    recorder = _current.get()
+    if recorder is None:
+        return NULL_SPAN
+    return _Span(recorder, name)
+
+
+class _Span:
+    __slots__ = ("recorder", "name", "start", "top_level")
+
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self):
+        recorder = self.recorder
+        self.top_level = recorder._depth == 0
+        recorder._stat(self.name, recorder._depth)   # list stages in the order they start
+        recorder._depth += 1
+        if self.top_level and recorder.memory:
+            tracemalloc.reset_peak()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        recorder = self.recorder
+        recorder._depth -= 1
+        peak = tracemalloc.get_traced_memory()[1] if self.top_level and recorder.memory else None
+        recorder.add(self.name, seconds, peak_bytes=peak, depth=recorder._depth)
+        return False
+
+
+class Recorder:
+    """Aggregated spans of one run, in first-seen order."""
+
+    def __init__(self, memory: bool = False):
+        self.memory = memory
+        self.stats = {}   # name -> {"depth", "calls", "seconds", "max_seconds", "peak_bytes"}
+        self._depth = 0
+        self.started = None
+        self.seconds = None
+
+    def activate(self):
+        """Context manager making this the recorder span() reports to (starts tracemalloc with memory=True)."""
+        return _Activation(self)
+
+    def _stat(self, name: str, depth: int) -> dict:
+        stat = self.stats.get(name)
+        if stat is None:
+            stat = self.stats[name] = {"depth": depth, "calls": 0, "seconds": 0.0, "max_seconds": 0.0,
+                                       "peak_bytes": None}
+        return stat
+
+    def add(self, name: str, seconds: float, calls: int = 1, peak_bytes: int = None, depth: int = 0):
+        """Count calls of name taking seconds in total; depth > 0 means it ran inside another span."""
+        stat = self._stat(name, depth)
+        stat["calls"] += calls
+        stat["seconds"] += seconds
+        stat["max_seconds"] = max(stat["max_seconds"], seconds / max(calls, 1))
+        if peak_bytes is not None:
+            stat["peak_bytes"] = max(stat["peak_bytes"] or 0, peak_bytes)
+
+    def rows(self) -> list:
+        """One dict per span name, for a table."""
+        return [{"stage": name, **stat} for name, stat in self.stats.items()]
+
+    def record(self, **meta) -> dict:
+        """JSON-ready summary of the run."""
+        return {"started": self.started, "seconds": self.seconds, "memory": self.memory,
+                **meta, "spans": self.rows()}
+
+
+class _Activation:
+    def __init__(self, recorder):
+        self.recorder = recorder
+
+    def __enter__(self):
+        recorder = self.recorder
+        self._token = _current.set(recorder)
+        self._started_tracing = recorder.memory and not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start()
+        recorder.started = time.time()
+        self._start = time.perf_counter()
+        return recorder
+
+    def __exit__(self, *exc):
+        recorder = self.recorder
+        recorder.seconds = time.perf_counter() - self._start
+        if self._started_tracing:
+            tracemalloc.stop()
+        _current.reset(self._token)
+        return False
+
+
+def perf_logger() -> logging.Logger:
+    """The "invoice.perf" logger: JSON lines to INVOICE_PERF_LOG if set, else stderr."""
+    logger = logging.getLogger("invoice.perf")
+    if not logger.handlers:
+        path = os.getenv(PERF_LOG_ENV)
+        handler = logging.FileHandler(path) if path else logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+def log_run(record: dict):
+    perf_logger().info(json.dumps(record, default=str))
+
+
+class PerfHistory:
+    """The last max_runs run records in a local SQLite file."""
+
+    def __init__(self, path: str = None, max_runs: int = 50):
+        self.path = path or os.getenv(PERF_DB_ENV) or DEFAULT_DB_PATH
+        self.max_runs = max_runs
+        with self._connect() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS runs ("
+                       "id INTEGER PRIMARY KEY AUTOINCREMENT, started REAL, seconds REAL, record TEXT)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    def add(self, record: dict):
+        with self._connect() as db:
+            db.execute("INSERT INTO runs (started, seconds, record) VALUES (?, ?, ?)",
+                       (record.get("started"), record.get("seconds"), json.dumps(record, default=str)))
+            db.execute("DELETE FROM runs WHERE id NOT IN (SELECT id FROM runs ORDER BY id DESC LIMIT ?)",
+                       (self.max_runs,))
+
+    def recent(self, limit: int = None) -> list:
+        """Run records, oldest first."""
+        with self._connect() as db:
+            rows = db.execute("SELECT record FROM runs ORDER BY id DESC LIMIT ?", (limit or self.max_runs,)).fetchall()
+        return [json.loads(row[0]) for row in reversed(rows)]
+
+    def stage_seconds(self, limit: int = None) -> list:
+        """[{"run": started, stage: seconds, ...}] per run, for a line chart."""
+        return [{"run": record["started"], **{s["stage"]: s["seconds"] for s in record["spans"]}}
+                for record in self.recent(limit)]
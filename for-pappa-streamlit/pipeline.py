@@ -0,0 +1,224 @@
+"""
+The XLSX → grouped PDF pipeline, without any UI.
+
+load_workbook() reads and plans one workbook; PageRenderer renders its pages
+in order (in-process or on a render pool) and then the combined document.
+streamlit_app.py drives these page by page for its progress bar and
+uploads; batch.py runs whole workbooks on a process pool.
+"""
+import io
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from amounts import amount_values
+from column_schema import ColumnSchema, resolve_column_schema
+from formatting import format_cells
+from ingest import annexure_usecols, find_column, read_header, read_invoice
+from grid_canvas import place_page
+from invoice_pdf import (
+    PLATYPUS, build_page_table, draw_page_table, get_robust_header_map, page_canvas, plan_table_widths,
+    tables_to_pdf,
+)
+from page_cache import document_fingerprint, group_fingerprints, layout_fingerprint, page_fingerprints
+from pagination import PagePlan, group_by_serial, plan_pages
+from perf import span
+from render_pool import render_page_outputs, render_pages
+
+
+class SerialColumnNotFound(KeyError):
+    """The requested serial column is not in the sheet; columns lists what is."""
+
+    def __init__(self, serial_column: str, columns):
+        super().__init__(serial_column)
+        self.serial_column = serial_column
+        self.columns = columns
+
+
+@dataclass
+class Workbook:
+    """One parsed upload, planned and ready to render."""
+    df: pd.DataFrame
+    serial_column: str       # actual column name (may differ in case/spacing from the request)
+    plan: PagePlan
+    header_map: dict
+    schema: ColumnSchema
+    amounts: np.ndarray = None   # Amount (PKR) per row, parsed once (see amounts.py)
+
+
+def load_workbook(source, serial_column: str = "Del.Challan", annexure_only: bool = False) -> Workbook:
+    """
+    Read, group and plan one workbook. With annexure_only, just the columns
+    the annexure uses are loaded. Raises SerialColumnNotFound.
+    """
+    with span("read header"):
+        columns = read_header(source)
+    actual_serial_column = find_column(columns, serial_column)
+    if actual_serial_column is None:
+        raise SerialColumnNotFound(serial_column, columns)
+
+    usecols = annexure_usecols(columns, actual_serial_column) if annexure_only else None
+    with span("read"):
+        df = read_invoice(source, usecols=usecols, serial_column=actual_serial_column)
+    schema = resolve_column_schema(df.columns)
+    with span("group"):
+        groups = group_by_serial(df, actual_serial_column)
+    with span("amounts"):
+        amounts = amount_values(df, schema)
+    with span("plan pages"):
+        # Every total and running subtotal is summed here, once
+        plan = plan_pages(groups, amounts=amounts)
+    return Workbook(
+        df=df,
+        serial_column=actual_serial_column,
+        plan=plan,
+        header_map=get_robust_header_map(df.columns),
+        schema=schema,
+        amounts=amounts,
+    )
+
+
+def page_file_name(page_number: int, serials) -> str:
+    return f"Page_{page_number}_Serials_{'-'.join(serials)}.pdf"
+
+
+class PageRenderer:
+    """
+    Iterate (page_idx, page_serials, pdf_bytes) in page order, then call
+    combined_pdf(). Each page is laid out once and drawn both into its own
+    PDF and onto the combined document's canvas, so no table outlives its
+    page. With a render pool both happen on the workers: they send back the
+    page's PDF and its drawing, which is placed on the combined canvas here
+    without drawing it again (grid_canvas.place_page).
+
+    close() stops early: queued pool work is cancelled and the combined
+    document is abandoned. backend picks the page renderer (invoice_pdf.BACKENDS).
+
+    With a page_cache.PageCache, pages (and the combined document) whose
+    fingerprint was rendered before are read from it instead; reused and
+    rebuilt count the pages of each kind, and group_fps / page_fps are the
+    fingerprints (see page_cache.py).
+    """
+
+    def __init__(self, book: Workbook, pool=None, page_cache=None, backend: str = PLATYPUS):
+        self.book = book
+        self.pool = pool
+        self.backend = backend
+        self.page_cache = page_cache
+        self.reused = self.rebuilt = 0
+        self._page_pdfs = None
+        self._stopped = False
+        self._combined_buffer = io.BytesIO()
+        self._combined_canvas = page_canvas(self._combined_buffer, shared_forms=True)
+        # Format every cell once; pages slice their rows from it
+        with span("format cells"):
+            self._cells = format_cells(book.df, book.schema)
+        # ...and size the columns once, so no page auto-sizes its table
+        with span("column widths"):
+            self.col_widths = plan_table_widths(book.df, self._cells, book.plan, book.header_map, book.schema)
+
+        self.group_fps = self.page_fps = None
+        self._cached = [False] * book.plan.num_pages
+        self._combined_cached = None
+        if page_cache is not None:
+            with span("fingerprints"):
+                self.group_fps = group_fingerprints(book.df, book.plan.groups)
+                layout_fp = layout_fingerprint(book.header_map, book.schema, self.col_widths, backend)
+                self.page_fps = page_fingerprints(book.plan, self.group_fps, layout_fp)
+                self._cached = [fp in page_cache for fp in self.page_fps]
+                self._document_fp = document_fingerprint(self.page_fps)
+                if all(self._cached):
+                    self._combined_cached = page_cache.get(self._document_fp)
+
+    def _pages(self):
+        for page in self.book.plan.iter_page_groups(self.book.df, self._cells):
+            if self._stopped:
+                return
+            yield page
+
+    def close(self):
+        """Stop rendering (from the thread iterating, e.g. on cancel)."""
+        self._stopped = True
+        if self._page_pdfs is not None:
+            self._page_pdfs.close()   # cancels the pool's queued pages
+
+    def _cached_page(self, page_idx: int) -> bytes:
+        if not self._cached[page_idx]:
+            return None
+        with span("page cache read"):
+            return self.page_cache.get(self.page_fps[page_idx])
+
+    def _store_page(self, page_idx: int, pdf_bytes: bytes):
+        if self.page_cache is not None:
+            with span("page cache write"):
+                self.page_cache.put(self.page_fps[page_idx], pdf_bytes)
+
+    def __iter__(self):
+        book = self.book
+        build_combined = self._combined_cached is None
+        # Which pages the pool renders is fixed here: _cached changes as pruned pages are rebuilt below
+        sent_to_pool = tuple(not cached for cached in self._cached)
+        if self.pool is not None:
+            render = dict(header_map=book.header_map, schema=book.schema, col_widths=self.col_widths,
+                          backend=self.backend)
+            if build_combined:
+                # Every page is drawn for the combined document; only uncached ones get their own PDF
+                self._page_pdfs = render_page_outputs(self.pool, zip(self._pages(), sent_to_pool), **render)
+            else:
+                uncached = (p for sent, p in zip(sent_to_pool, self._pages()) if sent)
+                self._page_pdfs = render_pages(self.pool, uncached, **render)
+            page_pdfs = self._page_pdfs
+
+        for page_idx, page_serials in enumerate(self._pages()):
+            pdf_bytes = self._cached_page(page_idx)
+            if self.pool is not None:
+                if build_combined or sent_to_pool[page_idx]:
+                    with span("render pool wait"):
+                        rendered = next(page_pdfs)
+                    if build_combined:
+                        rendered, drawing = rendered
+                        with span("combined draw"):
+                            place_page(self._combined_canvas, drawing)
+                            self._combined_canvas.showPage()
+                    if sent_to_pool[page_idx]:
+                        pdf_bytes = rendered
+                if pdf_bytes is None:
+                    # Pruned since it was looked up: the pool did not render this page's PDF
+                    pdf_bytes = tables_to_pdf([build_page_table(page_serials, book.header_map, book.schema,
+                                                                self.col_widths, self.backend)])
+                    self._cached[page_idx] = False
+            elif pdf_bytes is None or build_combined:
+                # Lay out this page once; the table is drawn into both documents
+                with span("page layout"):
+                    table = build_page_table(page_serials, header_map=book.header_map, schema=book.schema,
+                                             col_widths=self.col_widths, backend=self.backend)
+                if pdf_bytes is None:
+                    with span("page pdf"):
+                        pdf_bytes = tables_to_pdf([table])
+                    self._cached[page_idx] = False
+                if build_combined:
+                    with span("combined draw"):
+                        draw_page_table(self._combined_canvas, table)
+                        self._combined_canvas.showPage()
+            if self._cached[page_idx]:
+                self.reused += 1
+            else:
+                self.rebuilt += 1
+                self._store_page(page_idx, pdf_bytes)
+            yield page_idx, page_serials, pdf_bytes
+
+    def combined_pdf(self) -> bytes:
+        """All pages in one document (after iterating)."""
+        if self._combined_cached is not None:
+            return self._combined_cached
+        combined = self._combined_pdf()
+        if self.page_cache is not None:
+            self.page_cache.put(self._document_fp, combined)
+            self.page_cache.prune()
+        return combined
+
+    def _combined_pdf(self) -> bytes:
+        with span("combined save"):
+            self._combined_canvas.save()
+        return self._combined_buffer.getvalue()
@@ -0,0 +1,99 @@
+"""
+Parallel page rendering on a warm process pool.
+
+Workers are spawned (not forked from the Streamlit server), import ReportLab
+and the builders once in the initializer, and render with the parent's PDF
+profile (pdf_profile.py) so their PDFs are byte-for-byte what the serial
+path produces. Results are
+yielded in page order. ReportLab is only imported once a pool is started, so
+the app can import this module (for default_workers) before it needs one.
+"""
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+
+def default_workers() -> int:
+    return max(1, (os.cpu_count() or 2) - 1)
+
+
+def _warm_worker(profile):
+    # Import the builders and load font metrics before the first page arrives
+    import invoice_pdf  # noqa: F401
+    import pdf_profile
+    from reportlab.pdfbase import pdfmetrics
+    pdfmetrics.getFont("Helvetica-Bold")
+    pdfmetrics.getFont("Helvetica")
+    pdf_profile.use(profile)
+
+
+def _noop(_):
+    return None
+
+
+def make_render_pool(workers: int = None) -> ProcessPoolExecutor:
+    """Start a pool of render workers, warmed up before it is returned."""
+    import pdf_profile
+    workers = workers or default_workers()
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_warm_worker,
+        initargs=(pdf_profile.active(),),
+    )
+    list(pool.map(_noop, range(workers)))
+    return pool
+
+
+def _render_page(task):
+    from invoice_pdf import build_single_page_pdf
+    page_serials, header_map, schema, col_widths, backend = task
+    return build_single_page_pdf(page_serials, header_map, schema=schema, col_widths=col_widths, backend=backend)
+
+
+def _render_page_outputs(task):
+    from invoice_pdf import build_page_outputs
+    page_serials, with_pdf, header_map, schema, col_widths, backend = task
+    return build_page_outputs(page_serials, header_map, schema=schema, col_widths=col_widths, backend=backend,
+                              with_pdf=with_pdf)
+
+
+def render_pages(pool: ProcessPoolExecutor, pages, header_map: dict = None, schema=None, col_widths=None,
+                 backend: str = "platypus", window: int = None):
+    """
+    Render each page (a list of serial groups) to PDF bytes on the pool, yielding in page order.
+    At most window pages (default two per worker) are in flight: pages are
+    only taken from the iterator as the consumer catches up, so neither the
+    page frames nor the finished PDFs pile up in memory. Closing the
+    generator cancels the pages still queued.
+    """
+    tasks = ((page_serials, header_map, schema, col_widths, backend) for page_serials in pages)
+    return _in_order(pool, _render_page, tasks, window)
+
+
+def render_page_outputs(pool: ProcessPoolExecutor, pages, header_map: dict = None, schema=None, col_widths=None,
+                        backend: str = "platypus", window: int = None):
+    """
+    Like render_pages, for a combined document as well: pages yields
+    (page_serials, with_pdf) and each result is (the page's PDF bytes, or
+    None without with_pdf, its grid_canvas.PageDrawing). Each page is laid
+    out once on its worker, which also draws it for the combined document.
+    """
+    tasks = ((page_serials, with_pdf, header_map, schema, col_widths, backend) for page_serials, with_pdf in pages)
+    return _in_order(pool, _render_page_outputs, tasks, window)
+
+
+def _in_order(pool, fn, tasks, window):
+    window = window or 2 * (getattr(pool, "_max_workers", None) or default_workers())
+    pending = deque()
+    try:
+        for task in tasks:
+            pending.append(pool.submit(fn, task))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
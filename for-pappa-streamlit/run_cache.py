@@ -0,0 +1,78 @@
+"""
+Finished runs, kept across Streamlit reruns.
+
+Streamlit reruns the whole script on every widget interaction, download
+clicks included. Each run is a background job (see jobs.py, invoice_job.py);
+the session remembers its job id under the uploaded file's content hash plus
+the options that change its output, so a rerun with the same inputs polls
+or serves that job's PDFs, ZIP and URLs instead of parsing, rendering and
+uploading again. The PDFs and ZIP live in spooled temp files (see
+artifacts.py), which the JobManager closes when it drops the finished job;
+the ZIP is only assembled the first time someone asks for it.
+"""
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from artifacts import SpooledArtifacts, spooled_zip
+
+STATE_KEY = "run_jobs"
+
+
+def run_key(file_bytes: bytes, **options) -> tuple:
+    """Content hash of the upload plus the output-affecting options."""
+    return (hashlib.sha256(file_bytes).hexdigest(),) + tuple(sorted(options.items()))
+
+
+@dataclass
+class RunArtifacts:
+    """Everything the download section needs from one processed upload."""
+    key: tuple
+    timestamp: int
+    plan: object = None              # pagination.PagePlan
+    results: list = field(default_factory=list)     # per page; "file" names its PDF in files
+    files: SpooledArtifacts = field(default_factory=SpooledArtifacts)
+    zip_members: list = field(default_factory=list)  # (arcname, name in files) of the ZIP
+    zip_file: object = None          # spooled temp file holding the ZIP, once requested
+    annexure_url: str = None
+    messages: list = field(default_factory=list)   # (st function name, text), shown on every rerun
+    perf: dict = None                # perf.Recorder.record() when the run was recorded
+
+    def note(self, level: str, text: str):
+        self.messages.append((level, text))
+
+    def zip_bytes(self) -> bytes:
+        if self.zip_file is None:
+            self.zip_file = spooled_zip(self.files, self.zip_members)
+        self.zip_file.seek(0)
+        return self.zip_file.read()
+
+    def close(self):
+        self.files.close()
+        if self.zip_file is not None:
+            self.zip_file.close()
+
+
+class RunCache:
+    """Job ids of the most recent runs of a session, stored in a mapping such as st.session_state."""
+
+    def __init__(self, state, max_runs: int = 3):
+        self.max_runs = max_runs
+        if STATE_KEY not in state:
+            state[STATE_KEY] = OrderedDict()
+        self._runs = state[STATE_KEY]
+
+    def get(self, key: tuple) -> str:
+        job_id = self._runs.get(key)
+        if job_id is not None:
+            self._runs.move_to_end(key)
+        return job_id
+
+    def put(self, key: tuple, job_id: str):
+        self._runs[key] = job_id
+        self._runs.move_to_end(key)
+        while len(self._runs) > self.max_runs:
+            self._runs.popitem(last=False)
+
+    def forget(self, key: tuple):
+        self._runs.pop(key, None)
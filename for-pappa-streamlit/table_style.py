@@ -0,0 +1,92 @@
+"""
+TableStyle compiler: turns a logical table layout into range commands.
+
+The table builders used to emit one BOX per cell and one ALIGN per column per
+row. GRID over a rectangle draws exactly the same line segments as a BOX on
+each of its cells, and ALIGN over a column span sets the same cell property as
+one ALIGN per row, so the compiled commands render the same page with a small
+fraction of the commands.
+"""
+from reportlab.lib import colors
+
+
+def coalesce(indices):
+    """Collapse integers into sorted (start, end) runs, inclusive."""
+    runs = []
+    for i in sorted(set(indices)):
+        if runs and i == runs[-1][1] + 1:
+            runs[-1][1] = i
+        else:
+            runs.append([i, i])
+    return [tuple(run) for run in runs]
+
+
+def compile_borders(n_rows, n_cols, skip_rows=(), partial_rows=None, weight=0.5, color=colors.black):
+    """
+    GRID commands boxing every cell, except rows in skip_rows (no borders) and
+    rows in partial_rows ({row: bordered columns}). Consecutive rows with the
+    same bordered columns share one command per column run.
+    """
+    partial_rows = partial_rows or {}
+    skip_rows = set(skip_rows)
+    all_cols = tuple(range(n_cols))
+
+    bands = []  # [start_row, end_row, cols]
+    for r in range(n_rows):
+        if r in skip_rows:
+            continue
+        cols = tuple(sorted(c for c in partial_rows[r] if 0 <= c < n_cols)) if r in partial_rows else all_cols
+        if bands and bands[-1][1] == r - 1 and bands[-1][2] == cols:
+            bands[-1][1] = r
+        else:
+            bands.append([r, r, cols])
+
+    commands = []
+    for start_row, end_row, cols in bands:
+        for start_col, end_col in coalesce(cols):
+            commands.append(("GRID", (start_col, start_row), (end_col, end_row), weight, color))
+    return commands
+
+
+def compile_column_aligns(n_rows, column_aligns, skip_rows=(), base_align=None):
+    """
+    ALIGN commands applying column_aligns ({col: "RIGHT"/"CENTER"/...}) to
+    every row not in skip_rows. Adjacent columns with the same alignment are
+    merged; alignments equal to base_align are dropped.
+    """
+    column_aligns = {c: a for c, a in column_aligns.items() if c is not None and a != base_align}
+    if not column_aligns:
+        return []
+
+    col_spans = []  # [start_col, end_col, align]
+    for c in sorted(column_aligns):
+        align = column_aligns[c]
+        if col_spans and col_spans[-1][1] == c - 1 and col_spans[-1][2] == align:
+            col_spans[-1][1] = c
+        else:
+            col_spans.append([c, c, align])
+
+    skip_rows = set(skip_rows)
+    commands = []
+    for start_row, end_row in coalesce(r for r in range(n_rows) if r not in skip_rows):
+        for start_col, end_col, align in col_spans:
+            commands.append(("ALIGN", (start_col, start_row), (end_col, end_row), align))
+    return commands
+
+
+def compile_table_style(n_rows, n_cols, header_rows=(), total_rows=(), spacer_rows=(),
+                        column_aligns=None, total_border_cols=None, base_align="LEFT",
+                        weight=0.5, color=colors.black):
+    """
+    Data-row alignment and cell borders for a grouped invoice table.
+
+    column_aligns apply to data rows. Header rows are left in the runs because
+    the builders restyle them afterwards, and spacer rows are blank, so runs
+    only break at total rows. Spacer rows get no borders; total rows are
+    bordered only on total_border_cols (all columns when None).
+    """
+    commands = compile_column_aligns(n_rows, column_aligns or {}, skip_rows=total_rows, base_align=base_align)
+    partial = {} if total_border_cols is None else {r: total_border_cols for r in total_rows}
+    commands += compile_borders(n_rows, n_cols, skip_rows=spacer_rows, partial_rows=partial,
+                                weight=weight, color=color)
+    return commands
@@ -0,0 +1,10 @@
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(HERE)
+
+# The app's modules sit flat beside streamlit_app.py; the synthetic workbooks
+# and legacy reference loops live with the benchmarks
+sys.path.insert(0, APP_DIR)
+sys.path.insert(0, os.path.join(APP_DIR, "benchmarks"))
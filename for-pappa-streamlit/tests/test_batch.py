@@ -0,0 +1,45 @@
+import os
+
+from artifacts import COMBINED_PDF_NAME, ZIP_NAME
+from batch import name_collisions, output_names, run_batch
+from synthetic import write_workbook
+
+
+def test_unique_stems_keep_their_name():
+    assert output_names(["x/a.xlsx", "x/b.xlsx", "y/c.xlsx"]) == ["a", "b", "c"]
+
+
+def test_shared_stems_are_named_by_their_folder():
+    paths = ["in/x/a.xlsx", "in/y/a.xlsx", "in/x/b.xlsx"]
+    names = output_names(paths)
+    assert names == ["x_a", "y_a", "b"]
+    assert name_collisions(paths, names) == ["in/x/a.xlsx -> x_a", "in/y/a.xlsx -> y_a"]
+
+
+def test_shared_stems_differing_in_case_collide():
+    assert output_names(["x/A.xlsx", "y/a.xlsx"]) == ["x_A", "y_a"]
+
+
+def test_names_still_taken_get_a_suffix():
+    # x/a.xlsx and y/a.xlsx would become x_a, which another input already is
+    assert output_names(["x_a.xlsx", "x/a.xlsx", "y/a.xlsx"]) == ["x_a", "x_a_2", "y_a"]
+
+
+def test_workbooks_sharing_a_name_get_their_own_folders(tmp_path):
+    paths = []
+    for folder, rows in (("x", 40), ("y", 120)):
+        os.makedirs(tmp_path / folder)
+        paths.append(write_workbook(str(tmp_path / folder / "a.xlsx"), rows, seed=rows))
+    out = tmp_path / "out"
+    logged = []
+
+    summary = run_batch(paths, str(out), workers=1, log=logged.append)
+
+    assert summary["failed"] == 0
+    assert "x_a" in logged[0] and "y_a" in logged[0]
+    dirs = [file["output_dir"] for file in summary["files"]]
+    assert dirs == [str(out / "x_a"), str(out / "y_a")]
+    for file in summary["files"]:
+        written = set(os.listdir(file["output_dir"]))
+        assert written == set(file["page_pdfs"]) | {COMBINED_PDF_NAME, ZIP_NAME}
+    assert summary["files"][0]["pages"] != summary["files"][1]["pages"]
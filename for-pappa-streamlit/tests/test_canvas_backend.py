@@ -0,0 +1,51 @@
+"""
+Visual regression of the page renderers (see benchmarks/check_canvas_backend.py):
+every backend's combined document, page furniture forms included, must draw
+the same lines, fills and words as plainly drawn platypus tables, and
+rasterize like them.
+"""
+import pytest
+
+import invoice_pdf
+from check_canvas_backend import (MAX_CHANGED, MAX_DIFF, drawing_differences, merge_segments, page_difference,
+                                  page_drawings, rasterize, render_all)
+
+DPI = 100
+BLACK = (0.0, 0.0, 0.0)
+
+
+@pytest.fixture(scope="module")
+def rendered():
+    return render_all(400, seed=0)
+
+
+@pytest.mark.parametrize("backend", invoice_pdf.BACKENDS)
+def test_backend_pages_draw_like_platypus(rendered, backend):
+    reference, pages = page_drawings(rendered["plain"]), page_drawings(rendered[backend])
+    assert len(pages) == len(reference)
+    for page_number, (expected, actual) in enumerate(zip(reference, pages), start=1):
+        assert not drawing_differences(expected, actual), f"page {page_number}"
+
+
+@pytest.mark.parametrize("backend", invoice_pdf.BACKENDS)
+def test_backend_pages_look_like_platypus(rendered, backend):
+    reference, pages = rasterize(rendered["plain"], DPI), rasterize(rendered[backend], DPI)
+    assert len(pages) == len(reference)
+    for page_number, (expected, actual) in enumerate(zip(reference, pages), start=1):
+        assert actual.shape == expected.shape, f"page {page_number}"
+        largest, changed = page_difference(expected, actual)
+        assert largest <= MAX_DIFF, f"page {page_number}: a pixel differs by {largest} gray levels"
+        assert changed <= MAX_CHANGED, f"page {page_number}: {changed:.3%} of its pixels changed"
+
+
+def test_touching_pieces_are_one_line():
+    per_cell = [(0.5, BLACK, 10, 5, 20, 5), (0.5, BLACK, 30, 5, 20, 5), (0.5, BLACK, 7, 0, 7, 9)]
+    assert merge_segments(per_cell) == [(0.5, BLACK, 7, 0, 7, 9), (0.5, BLACK, 10, 5, 30, 5)]
+
+
+def test_a_missing_border_is_a_difference():
+    whole = ([(0.5, BLACK, 10, 5, 30, 5)], [], [])
+    broken = (merge_segments([(0.5, BLACK, 10, 5, 20, 5), (0.5, BLACK, 21, 5, 30, 5)]), [], [])
+    assert drawing_differences(whole, whole) == []
+    assert drawing_differences(whole, broken) == [
+        "1 line(s) missing, 2 extra, e.g. (0.5, (0.0, 0.0, 0.0), 10, 5, 30, 5)"]
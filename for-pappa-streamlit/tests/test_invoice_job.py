@@ -0,0 +1,68 @@
+import io
+import threading
+import time
+import zipfile
+from types import SimpleNamespace
+
+import pytest
+
+from invoice_job import RunOptions, Services, process_upload
+from jobs import CANCELLED, DONE, JobManager
+from synthetic import make_invoice_frame
+
+
+@pytest.fixture(scope="module")
+def workbook() -> bytes:
+    buf = io.BytesIO()
+    make_invoice_frame(60).to_excel(buf, index=False)
+    return buf.getvalue()
+
+
+def test_cancel_during_a_failing_annexure_upload_skips_the_backoff(workbook):
+    manager = JobManager(max_workers=1)
+    cancelled_at = []
+    attempts = []
+    holder = {}
+
+    def failing_upload(file_bytes, public_id):
+        attempts.append(public_id)
+        # The user cancels while the first attempt fails; the retry would wait 0.5s, then 1s, ...
+        holder["job"].cancel()
+        cancelled_at.append(time.time())
+        raise ConnectionError("upload failed")
+
+    started = threading.Event()
+    options = RunOptions(generate_annexure=True, ensure_cloud=True)
+    services = Services(cloud=SimpleNamespace(upload_raw_to_cloudinary=failing_upload))
+
+    def work(job, *args):
+        holder["job"] = job
+        started.set()
+        return process_upload(job, *args)
+
+    job = manager.submit("key", "invoice.xlsx", work, io.BytesIO(workbook), "invoice.xlsx", "key", options,
+                         services, owner="a")
+    started.wait(10)
+    deadline = time.monotonic() + 10
+    while job.active and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert job.status == CANCELLED
+    assert len(attempts) == 1
+    assert job.finished - cancelled_at[0] < 0.25
+
+
+def test_the_zip_is_built_when_first_downloaded(workbook):
+    manager = JobManager(max_workers=1)
+    job = manager.submit("key", "invoice.xlsx", process_upload, io.BytesIO(workbook), "invoice.xlsx", "key",
+                         RunOptions(), Services(), owner="a")
+    deadline = time.monotonic() + 30
+    while job.active and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert job.status == DONE
+    run = job.result
+    assert run.zip_file is None
+    with zipfile.ZipFile(io.BytesIO(run.zip_bytes())) as zf:
+        assert zf.namelist() == [r["file"] for r in run.results]
+        assert [zf.read(r["file"]) for r in run.results] == [run.files.read(r["file"]) for r in run.results]
+    run.close()
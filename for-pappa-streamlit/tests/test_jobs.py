@@ -0,0 +1,108 @@
+import threading
+import time
+
+import pytest
+
+from jobs import CANCELLED, DONE, QUEUED, RUNNING, JobManager
+
+
+class Result:
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def finished_job(manager, owner):
+    job = manager.submit("key", "label", lambda job: Result(), owner=owner)
+    manager._executor.submit(lambda: None).result()   # one worker: the job ran first
+    assert job.status == DONE
+    return job
+
+
+@pytest.fixture
+def manager():
+    manager = JobManager(max_workers=1, max_finished=2)
+    yield manager
+    manager._executor.shutdown()
+
+
+def test_jobs_are_only_found_by_their_owner(manager):
+    job = finished_job(manager, "session-a")
+    assert manager.get(job.id, "session-a") is job
+    assert manager.get(job.id, "session-b") is None
+    assert manager.get(job.id) is None
+    with manager.reading(job.id, "session-b") as found:
+        assert found is None
+
+
+def test_evicted_results_are_closed(manager):
+    first = finished_job(manager, "a")
+    finished_job(manager, "a")
+    finished_job(manager, "b")
+    assert manager.get(first.id, "a") is None
+    assert first.result.closed
+
+
+def test_results_being_read_are_closed_after_the_reader(manager):
+    first = finished_job(manager, "a")
+    with manager.reading(first.id, "a") as job:
+        finished_job(manager, "b")
+        finished_job(manager, "b")
+        # Evicted, but still open for the session reading it
+        assert manager.get(first.id, "a") is None
+        assert not job.result.closed
+    assert first.result.closed
+
+
+def test_cancel_before_start(manager):
+    started = threading.Event()
+    release = threading.Event()
+    blocker = manager.submit("k", "blocker", lambda job: started.set() or release.wait(), owner="a")
+    started.wait()
+    queued = manager.submit("k", "queued", lambda job: Result(), owner="a")
+    assert manager.queue_position(queued) == 1
+    queued.cancel()
+    release.set()
+    manager._executor.submit(lambda: None).result()
+    assert blocker.status == DONE
+    assert queued.status == CANCELLED
+
+
+def test_two_owners_run_side_by_side():
+    manager = JobManager(max_workers=2, per_owner=1)
+    running = threading.Barrier(2, timeout=5)
+
+    def work(job):
+        running.wait()   # only returns once both owners' jobs are running
+        return Result()
+
+    a = manager.submit("k", "a", work, owner="a")
+    b = manager.submit("k", "b", work, owner="b")
+    deadline = time.monotonic() + 5
+    while (a.active or b.active) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert a.status == DONE and b.status == DONE
+    manager._executor.shutdown()
+
+
+def test_an_owner_waits_for_its_own_jobs_not_everyone_elses():
+    manager = JobManager(max_workers=2, per_owner=1)
+    release = threading.Event()
+    first = manager.submit("k", "a1", lambda job: release.wait(5) and Result(), owner="a")
+    second = manager.submit("k", "a2", lambda job: Result(), owner="a")
+    other = manager.submit("k", "b", lambda job: Result(), owner="b")
+
+    deadline = time.monotonic() + 5
+    while other.active and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # b's job ran on the free thread while a's second job waited for a's first
+    assert other.status == DONE
+    assert first.status == RUNNING and second.status == QUEUED
+    assert manager.queue_position(second) == 1
+    release.set()
+    deadline = time.monotonic() + 5
+    while second.active and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert first.status == DONE and second.status == DONE
+    manager._executor.shutdown()
@@ -0,0 +1,11 @@
+from page_cache import layout_modules
+
+
+def test_layout_covers_every_module_the_builders_import():
+    modules = layout_modules()
+    # Printed totals and column roles, pagination and the grid renderer all reach the page bytes
+    for name in ("invoice_pdf.py", "amounts.py", "column_schema.py", "pagination.py", "formatting.py",
+                 "table_style.py", "grid_canvas.py", "column_widths.py"):
+        assert name in modules
+    # Libraries are fingerprinted by version, not by source
+    assert not any(name.startswith(("reportlab", "pandas", "numpy")) for name in modules)
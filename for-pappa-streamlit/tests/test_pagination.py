@@ -0,0 +1,174 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import invoice_pdf
+from amounts import amount_values
+from bench_pagination import legacy_plan
+from column_schema import resolve_column_schema
+from ingest import read_invoice
+from pagination import MAX_ROWS_PER_PAGE, PAGE_TABLE_HEIGHT, group_by_serial, plan_pages, split_group
+from synthetic import make_invoice_frame
+
+
+def page_contents(pages):
+    """[(serial, row indices) per group] per page, from either planner."""
+    return [[(group['serial'], list(group['row_indices'])) for group in page] for page in pages]
+
+
+def test_blank_serials_are_dropped():
+    df = pd.DataFrame({"Del.Challan": ["A", "", "  ", "B", "A", ""]})
+    groups = group_by_serial(df, "Del.Challan")
+    assert list(groups.serials) == ["A", "B"]
+    assert [list(groups.rows_of(g)) for g in range(len(groups))] == [[0, 4], [3]]
+
+
+def test_serials_are_stripped():
+    df = pd.DataFrame({"Del.Challan": [" A", "A ", "B"]})
+    groups = group_by_serial(df, "Del.Challan")
+    assert list(groups.serials) == ["A", "B"]
+    assert list(groups.sizes) == [2, 1]
+
+
+def test_nan_serials_group_like_the_old_loop():
+    df = pd.DataFrame({"Del.Challan": [101.0, np.nan, 102.0, np.nan, 101.0], "Amount (PKR)": range(5)})
+    plan = plan_pages(group_by_serial(df, "Del.Challan"), split=False)
+    assert page_contents(plan.iter_page_groups(df)) == page_contents(legacy_plan(df, "Del.Challan"))
+
+
+def test_groups_keep_first_appearance_order():
+    df = pd.DataFrame({"Del.Challan": ["C", "A", "C", "B", "A", "C"]})
+    groups = group_by_serial(df, "Del.Challan")
+    assert list(groups.serials) == ["C", "A", "B"]
+    assert list(groups.positions) == [0, 2, 5, 1, 4, 3]
+    assert list(groups.offsets) == [0, 3, 5, 6]
+
+
+def test_group_larger_than_a_page_gets_pages_of_its_own():
+    sizes = [3, MAX_ROWS_PER_PAGE * 2, 3]
+    df = pd.DataFrame({"Del.Challan": np.repeat(["A", "B", "C"], sizes)})
+    plan = plan_pages(group_by_serial(df, "Del.Challan"))
+
+    assert plan.serials_on(0) == ["A"]
+    assert plan.serials_on(plan.num_pages - 1) == ["C"]
+    middle = range(1, plan.num_pages - 1)
+    assert len(middle) > 1
+    assert all(plan.serials_on(p) == ["B"] for p in middle)
+    assert sum(plan.rows_on(p) for p in middle) == sizes[1]
+
+
+def test_group_larger_than_a_page_unsplit_overflows_one_page():
+    df = pd.DataFrame({"Del.Challan": np.repeat(["A", "B"], [3, MAX_ROWS_PER_PAGE * 2])})
+    plan = plan_pages(group_by_serial(df, "Del.Challan"), split=False)
+    assert [plan.serials_on(p) for p in range(plan.num_pages)] == [["A"], ["B"]]
+    assert page_contents(plan.iter_page_groups(df)) == page_contents(legacy_plan(df, "Del.Challan"))
+
+
+@pytest.fixture
+def fixture_workbook(tmp_path):
+    """A synthetic upload with blank and missing serials and a group taller than a page."""
+    df = make_invoice_frame(600, seed=3).astype({"Del.Challan": object})
+    df.loc[[5, 17, 230], "Del.Challan"] = ""
+    df.loc[[40, 41, 300], "Del.Challan"] = np.nan
+    df.loc[400:460, "Del.Challan"] = "BIG"
+    path = tmp_path / "invoice.xlsx"
+    df.to_excel(path, index=False)
+    return path
+
+
+def test_plan_matches_the_old_loop_on_a_workbook(fixture_workbook):
+    df = read_invoice(str(fixture_workbook), serial_column="Del.Challan")
+    # The old loop never split groups taller than a page
+    plan = plan_pages(group_by_serial(df, "Del.Challan"), split=False)
+    legacy = legacy_plan(df, "Del.Challan")
+
+    assert plan.num_pages == len(legacy)
+    assert page_contents(plan.iter_page_groups(df)) == page_contents(legacy)
+    for page, legacy_page in zip(plan.iter_page_groups(df), legacy):
+        for group, legacy_group in zip(page, legacy_page):
+            pd.testing.assert_frame_equal(group['df'], legacy_group['df'])
+
+
+def test_split_group_slices_fill_the_page_budget():
+    slices = split_group(1000, MAX_ROWS_PER_PAGE)
+    sizes = [stop - start for start, stop in slices]
+    # Header and subtotal rows on the first slice, a brought-forward row on the rest
+    assert sizes[0] == MAX_ROWS_PER_PAGE - 2
+    assert all(size == MAX_ROWS_PER_PAGE - 3 for size in sizes[1:-1])
+    assert 0 < sizes[-1] <= MAX_ROWS_PER_PAGE - 3
+    assert slices[0][0] == 0 and slices[-1][1] == 1000
+    assert all(stop == start for (_, stop), (start, _) in zip(slices, slices[1:]))
+
+
+@pytest.fixture(scope="module")
+def large_group():
+    """One challan of 20,000 rows between two small ones, planned with amounts."""
+    df = make_invoice_frame(20_006)
+    df["Del.Challan"] = np.repeat([1, 2, 3], [3, 20_000, 3])
+    amounts = amount_values(df, resolve_column_schema(df.columns))
+    return df, amounts, plan_pages(group_by_serial(df, "Del.Challan"), amounts=amounts)
+
+
+def cents(values) -> int:
+    return int(np.round(np.asarray(values) * 100).astype(np.int64).sum())
+
+
+def test_large_group_pages_fit(large_group):
+    df, _, plan = large_group
+    split = plan.piece_parts > 1
+    assert split.sum() == plan.num_pages - 2
+    sizes = (plan.piece_stop - plan.piece_start)[split]
+    assert sizes[0] == MAX_ROWS_PER_PAGE - 2
+    assert (sizes[1:] <= MAX_ROWS_PER_PAGE - 3).all()
+    assert sizes.sum() == 20_000
+    for page_idx in range(plan.num_pages):
+        part = plan.piece_part[plan.page_offsets[page_idx]]
+        # data rows + header and total rows (+ brought forward)
+        assert plan.rows_on(page_idx) + 2 + (part > 1) <= MAX_ROWS_PER_PAGE
+
+
+def test_split_pages_fit_the_table_height(large_group):
+    df, _, plan = large_group
+    schema = resolve_column_schema(df.columns)
+    for page_idx in (1, 2, plan.num_pages - 2):
+        table = invoice_pdf.build_page_table(plan.page_groups(df, page_idx), schema=schema)
+        table.wrap(0, 0)
+        assert table._height <= PAGE_TABLE_HEIGHT
+
+
+def test_brought_forward_is_the_previous_carried_forward(large_group):
+    _, _, plan = large_group
+    split = np.flatnonzero(plan.piece_parts > 1)
+    assert plan.carried[split[0]] == 0
+    for previous, piece in zip(split, split[1:]):
+        assert plan.carried[piece] == plan.piece_total[previous]
+
+
+def test_group_totals_are_the_exact_cent_sums(large_group):
+    df, amounts, plan = large_group
+    groups = plan.groups
+    last_piece = np.flatnonzero(plan.piece_part == plan.piece_parts)
+    assert len(last_piece) == len(groups)
+    for g, piece in enumerate(last_piece):
+        assert round(plan.piece_total[piece] * 100) == cents(amounts[groups.rows_of(g)])
+    # Every subtotal is the cent sum of the group's rows up to it
+    big = groups.rows_of(1)
+    for piece in np.flatnonzero(plan.piece_group == 1):
+        assert round(plan.piece_total[piece] * 100) == cents(amounts[big[:plan.piece_stop[piece]]])
+
+
+def test_printed_subtotals_carry_over(large_group):
+    df, amounts, plan = large_group
+    schema = resolve_column_schema(df.columns)
+    split_pages = [p for p in range(plan.num_pages) if plan.piece_parts[plan.page_offsets[p]] > 1]
+
+    def amount_rows(page_idx):
+        table = invoice_pdf.build_page_table(plan.page_groups(df, page_idx), schema=schema)
+        return [(row[4], row[schema.amount_pkr]) for row in table._cellvalues
+                if row[4] in (invoice_pdf.SUBTOTAL_LABEL, invoice_pdf.BROUGHT_FORWARD_LABEL, "Total")]
+
+    first, second, last = amount_rows(split_pages[0]), amount_rows(split_pages[1]), amount_rows(split_pages[-1])
+    assert [label for label, _ in first] == [invoice_pdf.SUBTOTAL_LABEL]
+    assert second[0] == (invoice_pdf.BROUGHT_FORWARD_LABEL, first[0][1])
+    assert second[1][0] == invoice_pdf.SUBTOTAL_LABEL
+    assert last[-1] == ("Total", f"{cents(amounts[plan.groups.rows_of(1)]) / 100:,.2f}")
@@ -0,0 +1,33 @@
+from datetime import date
+
+import pytest
+
+import invoice_pdf
+import pdf_profile
+from synthetic import make_invoice_frame
+
+
+@pytest.fixture
+def compact():
+    previous = pdf_profile.active()
+    yield pdf_profile.use("compact")
+    pdf_profile.use(previous)
+
+
+def test_annexure_bytes_depend_only_on_input_and_date(compact):
+    df = make_invoice_frame(200)
+    first = invoice_pdf.build_annexure_pdf(df, billing_date=date(2025, 1, 31))
+    assert invoice_pdf.build_annexure_pdf(df, billing_date=date(2025, 1, 31)) == first
+    assert invoice_pdf.build_annexure_pdf(df, billing_date=date(2025, 2, 1)) != first
+
+
+def test_annexure_defaults_to_today(compact, monkeypatch):
+    df = make_invoice_frame(50)
+
+    class FixedDay(date):
+        @classmethod
+        def today(cls):
+            return date(2025, 2, 1)
+
+    monkeypatch.setattr(invoice_pdf, "date", FixedDay)
+    assert invoice_pdf.build_annexure_pdf(df) == invoice_pdf.build_annexure_pdf(df, billing_date=date(2025, 2, 1))
@@ -0,0 +1,92 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import invoice_pdf
+import pdf_profile
+from page_cache import PageCache
+from pipeline import PageRenderer, load_workbook
+from render_pool import make_render_pool
+from synthetic import write_workbook
+
+
+@pytest.fixture(scope="module")
+def book(tmp_path_factory):
+    pdf_profile.use("compact")
+    path = write_workbook(str(tmp_path_factory.mktemp("upload") / "invoice.xlsx"), 240)
+    return load_workbook(path)
+
+
+@pytest.fixture(scope="module")
+def reference(book):
+    """Every page's PDF and the combined document, rendered without cache or pool."""
+    renderer = PageRenderer(book)
+    pages = [pdf_bytes for _, _, pdf_bytes in renderer]
+    return pages, renderer.combined_pdf()
+
+
+def test_parallel_pages_match_serial(book, reference):
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        renderer = PageRenderer(book, pool=pool)
+        assert [pdf_bytes for _, _, pdf_bytes in renderer] == reference[0]
+        assert renderer.combined_pdf() == reference[1]
+
+
+@pytest.mark.parametrize("backend", invoice_pdf.BACKENDS)
+def test_render_pool_builds_the_combined_document(book, backend):
+    serial = PageRenderer(book, backend=backend)
+    pages = [pdf_bytes for _, _, pdf_bytes in serial]
+    pool = make_render_pool(2)
+    try:
+        renderer = PageRenderer(book, pool=pool, backend=backend)
+        assert [pdf_bytes for _, _, pdf_bytes in renderer] == pages
+        # Placed from the workers' drawings, not drawn again here
+        assert renderer.combined_pdf() == serial.combined_pdf()
+    finally:
+        pool.shutdown()
+
+
+def test_closing_stops_the_combined_document_too(book, monkeypatch):
+    laid_out = []
+    build_page_table = invoice_pdf.build_page_table
+    monkeypatch.setattr(invoice_pdf, "build_page_table", lambda *args, **kwargs: laid_out.append(1) or
+                        build_page_table(*args, **kwargs))
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        renderer = PageRenderer(book, pool=pool)
+        pages = iter(renderer)
+        next(pages)
+        renderer.close()
+    # The window of pages in flight, and nothing after it
+    assert len(laid_out) <= 1 + 2
+    assert book.plan.num_pages > 10
+
+
+def test_page_pruned_after_lookup_keeps_pages_in_line(book, reference, tmp_path):
+    pages, combined = reference
+    assert len(pages) >= 18
+    cache = PageCache(str(tmp_path))
+    warm = PageRenderer(book, page_cache=cache)
+    list(warm)
+    fps = warm.page_fps
+
+    # Later pages changed since the last run, so they go to the pool...
+    changed = range(5, len(pages), 2)
+    for page_idx in changed:
+        os.remove(cache._path(fps[page_idx]))
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        renderer = PageRenderer(book, pool=pool, page_cache=cache)
+        # ...and two of the cached ones are pruned between the lookup and the render,
+        # one before the pool's first page is even requested
+        for page_idx in (2, 10):
+            os.remove(cache._path(fps[page_idx]))
+        rendered = [(page_idx, pdf_bytes) for page_idx, _, pdf_bytes in renderer]
+        assert renderer.combined_pdf() == combined
+
+    assert [page_idx for page_idx, _ in rendered] == list(range(len(pages)))
+    assert [pdf_bytes for _, pdf_bytes in rendered] == pages
+    assert renderer.page_fps == fps
+    # Every page is cached under its own fingerprint
+    assert [cache.get(fp) for fp in fps] == pages
+    assert renderer.rebuilt == len(changed) + 2
+    assert renderer.reused == len(pages) - renderer.rebuilt
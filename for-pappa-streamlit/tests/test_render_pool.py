@@ -0,0 +1,78 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from reportlab import rl_config
+
+import invoice_pdf
+from formatting import format_cells
+from pagination import group_by_serial, plan_pages
+from render_pool import render_pages
+from synthetic import make_invoice_frame
+
+
+@pytest.fixture
+def pages(monkeypatch):
+    monkeypatch.setattr(rl_config, "invariant", 1)
+    df = make_invoice_frame(300)
+    schema = invoice_pdf.resolve_column_schema(df.columns)
+    plan = plan_pages(group_by_serial(df, "Del.Challan"))
+    return list(plan.iter_page_groups(df, format_cells(df, schema))), schema
+
+
+def test_pages_come_back_in_order(pages):
+    pages, schema = pages
+    serial = [invoice_pdf.build_single_page_pdf(p, schema=schema) for p in pages]
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        assert list(render_pages(pool, pages, schema=schema)) == serial
+
+
+def test_only_a_window_of_pages_is_in_flight(pages):
+    pages, schema = pages
+    taken = []
+
+    def page_source():
+        for page in pages:
+            taken.append(page)
+            yield page
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        results = render_pages(pool, page_source(), schema=schema, window=3)
+        for received in range(1, len(pages) + 1):
+            next(results)
+            assert len(taken) <= received + 3
+        results.close()
+    assert len(taken) == len(pages)
+
+
+class GatedPool(ThreadPoolExecutor):
+    """Runs the first task, then holds the rest until gate is set."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.gate = threading.Event()
+        self.futures = []
+
+    def submit(self, fn, *args):
+        first = not self.futures
+
+        def task():
+            if not first:
+                self.gate.wait()
+            return fn(*args)
+
+        future = super().submit(task)
+        self.futures.append(future)
+        return future
+
+
+def test_closing_cancels_queued_pages(pages):
+    pages, schema = pages
+    with GatedPool(max_workers=1) as pool:
+        results = render_pages(pool, pages, schema=schema, window=4)
+        next(results)
+        results.close()
+        pool.gate.set()
+    assert len(pool.futures) == 4
+    # The second page had started; the two behind it never ran
+    assert [future.cancelled() for future in pool.futures] == [False, False, True, True]
@@ -0,0 +1,79 @@
+import threading
+import time
+
+import cloudinary
+import pytest
+
+from cloud import upload_raw_to_cloudinary
+from cloudinary_standin import StandinServer
+from uploads import UploadCancelled, UploadPool, upload_with_retry
+
+PAYLOAD = b"%PDF-1.4\n" + b"0" * 1_000
+
+
+@pytest.fixture
+def server():
+    """The stand-in Cloudinary endpoint, with the SDK pointed at it; set fail_first per test."""
+    server = StandinServer().start()
+    cloudinary.config(cloud_name="test", api_key="key", api_secret="secret", secure=True, upload_prefix=server.url)
+    yield server
+    server.stop()
+
+
+def test_retries_until_the_upload_succeeds(server):
+    server.fail_first = 2
+    sleeps = []
+    result = upload_with_retry(upload_raw_to_cloudinary, PAYLOAD, public_id="page_1", retries=3, backoff=0.5,
+                               sleep=sleeps.append)
+    assert result.ok
+    assert result.attempts == 3
+    assert sleeps == [0.5, 1.0]
+    assert result.url.endswith("processed-pdfs/page_1.pdf")
+    assert server.stored["processed-pdfs/page_1"]
+
+
+def test_gives_up_after_the_retry_limit(server):
+    server.fail_first = 10
+    sleeps = []
+    result = upload_with_retry(upload_raw_to_cloudinary, PAYLOAD, public_id="page_1", retries=3, backoff=4.0,
+                               max_backoff=6.0, sleep=sleeps.append)
+    assert not result.ok
+    assert result.attempts == 4
+    assert server.attempts["processed-pdfs/page_1"] == 4
+    # Exponential, capped at max_backoff
+    assert sleeps == [4.0, 6.0, 6.0]
+    assert "processed-pdfs/page_1" not in server.stored
+
+
+def test_cancelling_during_backoff_stops_retrying(server):
+    server.fail_first = 10
+    cancelled = threading.Event()
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        cancelled.set()     # the user cancels while the upload waits to retry
+
+    result = upload_with_retry(upload_raw_to_cloudinary, PAYLOAD, public_id="page_1", sleep=sleep,
+                               cancelled=cancelled)
+    assert isinstance(result.error, UploadCancelled)
+    assert result.attempts == 1
+    assert len(sleeps) == 1
+    assert server.attempts["processed-pdfs/page_1"] == 1
+
+
+def test_pool_cancel_interrupts_the_backoff(server):
+    server.fail_first = 10
+    with UploadPool(max_workers=2, retries=3, backoff=60.0, max_backoff=60.0) as uploads:
+        for i in range(2):
+            uploads.submit(i, upload_raw_to_cloudinary, PAYLOAD, public_id=f"page_{i}")
+        deadline = time.monotonic() + 10
+        while len(server.attempts) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        start = time.monotonic()
+        uploads.cancel()
+        results = uploads.results()
+    # The pool sleeps on its cancel event, so nobody waits out the minute of backoff
+    assert time.monotonic() - start < 5
+    assert [type(r.error) for r in results] == [UploadCancelled, UploadCancelled]
+    assert [r.attempts for r in results] == [1, 1]
@@ -0,0 +1,138 @@
+"""
+Background uploads with bounded concurrency and retries.
+
+The page loop submits each finished PDF (and per-group XLSX) to an
+UploadPool and moves on to the next page; a fixed number of worker threads
+upload while later pages render. Failed uploads are retried with exponential
+backoff, and every file gets an UploadResult with its attempts and timing.
+Setting the pool's cancel event stops queued uploads and further retries.
+"""
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+
+
+@dataclass
+class UploadResult:
+    key: object                  # caller's identifier, e.g. ("pdf", page_idx)
+    url: str = None
+    error: Exception = None
+    attempts: int = 0
+    seconds: float = 0.0         # wall time including retries and backoff
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class UploadCancelled(Exception):
+    """The upload was not (re)tried because its pool was cancelled."""
+
+
+def upload_with_retry(upload_fn, *args, retries: int = 3, backoff: float = 0.5, max_backoff: float = 8.0,
+                      sleep=time.sleep, key=None, cancelled: threading.Event = None, **kwargs) -> UploadResult:
+    """
+    Call upload_fn(*args, **kwargs) until it succeeds or retries run out,
+    sleeping backoff, 2*backoff, 4*backoff... (capped at max_backoff) between attempts.
+    upload_fn returns the Cloudinary response dict. Once cancelled is set no
+    further attempt is made and the result's error is UploadCancelled.
+    """
+    result = UploadResult(key=key)
+    start = time.perf_counter()
+    for attempt in range(retries + 1):
+        if cancelled is not None and cancelled.is_set():
+            result.error = UploadCancelled()
+            break
+        result.attempts = attempt + 1
+        try:
+            response = upload_fn(*args, **kwargs)
+            result.url = response.get("secure_url")
+            result.error = None
+            break
+        except Exception as e:
+            result.error = e
+            if attempt < retries:
+                sleep(min(backoff * 2 ** attempt, max_backoff))
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+class UploadPool:
+    """
+    Upload queue drained by max_workers threads.
+
+        with UploadPool(max_workers=4) as uploads:
+            uploads.submit(("pdf", 0), upload_raw_to_cloudinary, pdf_bytes, public_id=...)
+            ...
+        for r in uploads.results():
+            ...
+    """
+
+    def __init__(self, max_workers: int = 4, retries: int = 3, backoff: float = 0.5, max_backoff: float = 8.0,
+                 cancel_event: threading.Event = None):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.cancel_event = cancel_event or threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="upload")
+        self._futures = []
+        self._lock = threading.Lock()
+
+    def submit(self, key, upload_fn, *args, **kwargs):
+        """Queue one upload and return its Future (resolving to an UploadResult)."""
+        future = self._executor.submit(
+            upload_with_retry, upload_fn, *args, retries=self.retries, backoff=self.backoff,
+            max_backoff=self.max_backoff, key=key, cancelled=self.cancel_event,
+            sleep=self.cancel_event.wait, **kwargs,
+        )
+        with self._lock:
+            self._futures.append(future)
+        return future
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return sum(not f.done() for f in self._futures)
+
+    def wait(self, timeout: float = None) -> int:
+        """Block until an upload finishes or timeout passes; returns how many are still pending."""
+        with self._lock:
+            futures = [f for f in self._futures if not f.done()]
+        if futures:
+            wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+        return self.pending
+
+    def cancel(self):
+        """Drop queued uploads and stop retrying; uploads already in flight finish."""
+        self.cancel_event.set()
+        with self._lock:
+            for future in self._futures:
+                future.cancel()
+
+    def results(self) -> list:
+        """Wait for every queued upload; results come back in submission order (cancelled ones left out)."""
+        with self._lock:
+            futures = list(self._futures)
+        return [f.result() for f in futures if not f.cancelled()]
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def summarize(results) -> dict:
+    """Counts and timings for a batch of UploadResults."""
+    seconds = [r.seconds for r in results]
+    return {
+        "files": len(results),
+        "failed": sum(not r.ok for r in results),
+        "retried": sum(r.attempts > 1 for r in results),
+        "total_seconds": sum(seconds),
+        "max_seconds": max(seconds, default=0.0),
+    }
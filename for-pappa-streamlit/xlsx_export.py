@@ -0,0 +1,223 @@
+"""
+Per-group XLSX export: one workbook per serial group, or one workbook with a
+sheet per group.
+
+    exporter = XlsxExporter(df, groups, mode=PER_GROUP)    # starts writing
+    for name, data, group_indices in exporter.ready(): ...  # finished so far
+    for name, data, group_indices in exporter.results(): ...  # the rest
+
+Workbooks are written with a streaming writer: XlsxWriter in constant_memory
+mode when it is installed (much faster), else openpyxl's write-only mode.
+Both flush each row as it is written instead of keeping a cell object per
+value, so memory does not grow with the sheet. (A group file of at most
+IN_MEMORY_ROWS rows is small enough that XlsxWriter builds it in memory:
+spooling it through temp files would halve the groups per second.) Cells hold the frame's
+values the way DataFrame.to_excel writes them: a bold, bordered header row,
+blanks for missing values and dates in DATE_FORMAT.
+
+XlsxExporter writes on an executor (its own thread, or the render pool's
+processes in parallel mode) while the pages render, a chunk of groups per
+task with at most max_pending chunks sliced out of the frame at a time.
+"""
+import importlib.util
+import io
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from artifacts import XLSX_WORKBOOK_NAME
+
+PER_GROUP, WORKBOOK = "per_group", "workbook"
+XLSX_MODES = (PER_GROUP, WORKBOOK)
+
+XLSX_DIR = "xlsx"                          # per-group files, also their folder in the ZIP
+DATE_FORMAT = "yyyy-mm-dd hh:mm:ss"        # what to_excel writes datetimes with
+# Groups up to this many rows are assembled in memory; only larger sheets are worth spooling
+IN_MEMORY_ROWS = 5_000
+
+SHEET_NAME_MAX = 31
+_SHEET_NAME_INVALID = str.maketrans({c: "_" for c in "[]:*?/\\"})
+
+
+def writer_engine() -> str:
+    """xlsxwriter when XlsxWriter is installed (much faster), else openpyxl."""
+    return "xlsxwriter" if importlib.util.find_spec("xlsxwriter") else "openpyxl"
+
+
+def group_file_name(serial) -> str:
+    return f"{XLSX_DIR}/Serial_{serial}.xlsx"
+
+
+def sheet_names(serials) -> list:
+    """Excel-safe sheet names for serials: invalid characters replaced, 31 characters, unique."""
+    names, used = [], set()
+    for serial in serials:
+        base = str(serial).translate(_SHEET_NAME_INVALID).strip("'")[:SHEET_NAME_MAX] or "Group"
+        name, n = base, 1
+        # Excel compares sheet names case-insensitively
+        while name.lower() in used:
+            n += 1
+            suffix = f" ({n})"
+            name = base[:SHEET_NAME_MAX - len(suffix)] + suffix
+        used.add(name.lower())
+        names.append(name)
+    return names
+
+
+def cell_values(df: pd.DataFrame) -> np.ndarray:
+    """df's values as Python objects with None for missing ones (NaN, NaT, None)."""
+    return df.astype(object).where(df.notna(), None).to_numpy()
+
+
+def write_workbook(out, sheets, engine: str = None, constant_memory: bool = True):
+    """
+    Write (sheet name, header, rows) triples to out, a path or binary file,
+    rows being lists of cell_values. constant_memory=False lets XlsxWriter
+    keep a small workbook in memory instead of spooling each sheet to a
+    temp file.
+    """
+    engine = engine or writer_engine()
+    if engine == "xlsxwriter":
+        _write_xlsxwriter(out, sheets, constant_memory)
+    elif engine == "openpyxl":
+        _write_openpyxl(out, sheets)
+    else:
+        raise ValueError(f"Unknown XLSX writer {engine!r}")
+
+
+def _write_xlsxwriter(out, sheets, constant_memory: bool):
+    import xlsxwriter
+    options = {"constant_memory": True} if constant_memory else {"in_memory": True}
+    workbook = xlsxwriter.Workbook(out, {**options, "default_date_format": DATE_FORMAT, "nan_inf_to_errors": True})
+    header_format = workbook.add_format({"bold": True, "border": 1, "align": "center", "valign": "top"})
+    for name, header, rows in sheets:
+        sheet = workbook.add_worksheet(name)
+        sheet.write_row(0, 0, header, header_format)
+        for r, row in enumerate(rows, start=1):
+            sheet.write_row(r, 0, row)
+    workbook.close()
+
+
+def _write_openpyxl(out, sheets):
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Border, Font, Side
+
+    workbook = Workbook(write_only=True)
+    thin = Side(style="thin")
+    for name, header, rows in sheets:
+        sheet = workbook.create_sheet(title=name)
+        cells = []
+        for value in header:
+            cell = WriteOnlyCell(sheet, value=value)
+            cell.font = Font(bold=True)
+            cell.border = Border(left=thin, right=thin, top=thin, bottom=thin)
+            cell.alignment = Alignment(horizontal="center", vertical="top")
+            cells.append(cell)
+        sheet.append(cells)
+        for row in rows:
+            sheet.append([_openpyxl_value(sheet, value) for value in row])
+    workbook.save(out)
+
+
+def _openpyxl_value(sheet, value):
+    # openpyxl picks its own date format; match the one to_excel and XlsxWriter use
+    if isinstance(value, pd.Timestamp):
+        from openpyxl.cell import WriteOnlyCell
+        cell = WriteOnlyCell(sheet, value=value.to_pydatetime())
+        cell.number_format = DATE_FORMAT
+        return cell
+    return value
+
+
+def group_xlsx(df: pd.DataFrame, engine: str = None) -> bytes:
+    """One group's rows as a single-sheet workbook."""
+    return _single_sheet([str(column) for column in df.columns], cell_values(df).tolist(), engine)
+
+
+def _single_sheet(header, rows, engine: str = None) -> bytes:
+    out = io.BytesIO()
+    write_workbook(out, [("Sheet1", header, rows)], engine, constant_memory=len(rows) > IN_MEMORY_ROWS)
+    return out.getvalue()
+
+
+def write_chunk(mode: str, df: pd.DataFrame, serials, bounds, group_indices, engine: str = None) -> list:
+    """
+    Groups g of df (rows bounds[g]:bounds[g + 1]) as [(name, bytes, group indices)]:
+    a file per group, or one workbook with a sheet per group.
+    """
+    # Converted once for the chunk: per group, pandas' overhead would outweigh the rows
+    header, values = [str(column) for column in df.columns], cell_values(df)
+    groups = [values[start:stop].tolist() for start, stop in zip(bounds[:-1], bounds[1:])]
+    if mode == WORKBOOK:
+        out = io.BytesIO()
+        write_workbook(out, ((name, header, rows) for name, rows in zip(sheet_names(serials), groups)), engine)
+        return [(XLSX_WORKBOOK_NAME, out.getvalue(), list(group_indices))]
+    return [(group_file_name(serial), _single_sheet(header, rows, engine), [g])
+            for serial, rows, g in zip(serials, groups, group_indices)]
+
+
+class XlsxExporter:
+    """A run's XLSX export, written on an executor; results come back in group order."""
+
+    def __init__(self, df: pd.DataFrame, groups, mode: str = PER_GROUP, pool=None, chunk_groups: int = 32,
+                 max_pending: int = 4):
+        if mode not in XLSX_MODES:
+            raise ValueError(f"Unknown XLSX export mode {mode!r}")
+        self.mode = mode
+        self._df = df
+        self._groups = groups
+        self._own_executor = pool is None
+        self._executor = pool or ThreadPoolExecutor(max_workers=1, thread_name_prefix="xlsx")
+        # Engine chosen here, so pool workers write with what this process found installed
+        self._engine = writer_engine()
+        n_groups = len(groups)
+        # One workbook is one task: its sheets are streamed into a single file
+        step = (n_groups or 1) if mode == WORKBOOK else max(chunk_groups, 1)
+        self._chunks = deque(range(g, min(g + step, n_groups)) for g in range(0, n_groups, step))
+        self._max_pending = max(max_pending, 1)
+        self._pending = deque()
+        self._submit()
+
+    def _submit(self):
+        groups = self._groups
+        while self._chunks and len(self._pending) < self._max_pending:
+            chunk = self._chunks.popleft()
+            start, stop = groups.offsets[chunk.start], groups.offsets[chunk.stop]
+            # Only this chunk's rows travel to the worker
+            rows = self._df.iloc[groups.positions[start:stop]]
+            bounds = [int(offset - start) for offset in groups.offsets[chunk.start:chunk.stop + 1]]
+            serials = [str(serial) for serial in groups.serials[chunk.start:chunk.stop]]
+            self._pending.append(self._executor.submit(write_chunk, self.mode, rows, serials, bounds,
+                                                       list(chunk), self._engine))
+
+    def ready(self):
+        """Yield the files finished so far, in order, without waiting."""
+        while self._pending and self._pending[0].done():
+            yield from self._pending.popleft().result()
+            self._submit()
+
+    def results(self):
+        """Yield the remaining files in order, waiting for each."""
+        while self._pending:
+            yield from self._pending.popleft().result()
+            self._submit()
+        self.close()
+
+    @property
+    def finished(self) -> bool:
+        return not self._pending and not self._chunks
+
+    def cancel(self):
+        """Drop the chunks not written yet."""
+        self._chunks.clear()
+        for future in self._pending:
+            future.cancel()
+        self._pending.clear()
+        self.close()
+
+    def close(self):
+        if self._own_executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)